@@ -2,24 +2,41 @@ import sys
 import os
 import time
 import threading
+import asyncio
+import queue
+import heapq
+import bisect
+import itertools
+import functools
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
 import json
 import random
+import re
 import platform
+import ctypes
+import ctypes.util
+import shutil
+import subprocess
+import argparse
+import tempfile
 import psutil
 import numpy as np
-from datetime import datetime
+from collections import deque, OrderedDict
+from datetime import datetime, timedelta
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                             QLabel, QComboBox, QSpinBox, QPushButton, QGroupBox,
                             QLineEdit, QCheckBox, QTabWidget, QTextEdit, QFileDialog,
                             QSystemTrayIcon, QMenu, QAction, QMessageBox, QScrollArea,
                             QDoubleSpinBox, QTimeEdit, QColorDialog, QProgressBar, QInputDialog,
-                            QStyle)
-from PyQt5.QtCore import Qt, QSettings, QTimer, QTime, QSize, QByteArray, QPoint
-from PyQt5.QtGui import QIcon, QColor, QPixmap, QImage,QPainter, QPen
+                            QStyle, QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView)
+from PyQt5.QtCore import (Qt, QSettings, QTimer, QTime, QSize, QByteArray, QPoint, QPointF, QEvent, QEventLoop,
+                          pyqtSignal)
+from PyQt5.QtGui import QIcon, QColor, QPixmap, QImage,QPainter, QPen, QMouseEvent
 import pyautogui
 import keyboard
 import cv2
-from pynput.mouse import Controller as MouseController
+from pynput.mouse import Controller as MouseController, Listener as MouseListener
 from pynput.keyboard import GlobalHotKeys, Key, Listener as KeyboardListener
 from screeninfo import get_monitors
 from PIL import ImageGrab, Image
@@ -34,6 +51,13 @@ import hashlib
 import logging
 from logging.handlers import RotatingFileHandler
 
+try:
+    # python-xlib 仅在 Linux/X11 下可用（pyautogui 在 Linux 上本身就依赖它）
+    from Xlib import X, display as xdisplay
+    from Xlib.ext import xtest
+except ImportError:
+    X = xdisplay = xtest = None
+
 # 设置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -44,46 +68,4190 @@ logging.basicConfig(
     ]
 )
 
-class ProjectInfo:
-    """项目信息元数据（集中管理所有项目相关信息）"""
-    VERSION = "2.10.0"
-    BUILD_DATE = "2025-06-01"
-    # BUILD_DATE = datetime.now().strftime("%Y-%m-%d")  # 修改为动态获取当前日期
-    AUTHOR = "杜玛"
-    LICENSE = "MIT"
-    COPYRIGHT = "© 永久 杜玛"
-    URL = "https://github.com/duma520"
-    MAINTAINER_EMAIL = "不提供"
-    NAME = "高级鼠标点击模拟器"
-    DESCRIPTION = "高级鼠标点击模拟器，支持多种触发方式和脚本功能，适用于游戏辅助、自动化测试等场景。"
-    VERSION_HISTORY = {
-        "2.8.0": "fix: 修复了多坐标循环模式下的点击位置问题，优化了脚本执行速度。",
-        "2.9.0": "fix: 修复了QStyle相关的显示问题",
-        "2.10.0": "fix: 修复了托盘图标加载失败的情况，优化了系统图标获取方式。"
+class ProjectInfo:
+    """项目信息元数据（集中管理所有项目相关信息）"""
+    VERSION = "2.10.0"
+    BUILD_DATE = "2025-06-01"
+    # BUILD_DATE = datetime.now().strftime("%Y-%m-%d")  # 修改为动态获取当前日期
+    AUTHOR = "杜玛"
+    LICENSE = "MIT"
+    COPYRIGHT = "© 永久 杜玛"
+    URL = "https://github.com/duma520"
+    MAINTAINER_EMAIL = "不提供"
+    NAME = "高级鼠标点击模拟器"
+    DESCRIPTION = "高级鼠标点击模拟器，支持多种触发方式和脚本功能，适用于游戏辅助、自动化测试等场景。"
+    VERSION_HISTORY = {
+        "2.8.0": "fix: 修复了多坐标循环模式下的点击位置问题，优化了脚本执行速度。",
+        "2.9.0": "fix: 修复了QStyle相关的显示问题",
+        "2.10.0": "fix: 修复了托盘图标加载失败的情况，优化了系统图标获取方式。"
+    }
+    HELP_TEXT = """
+使用说明:
+
+"""
+
+
+    @classmethod
+    def get_metadata(cls) -> dict:
+        """获取主要元数据字典"""
+        return {
+            'version': cls.VERSION,
+            'author': cls.AUTHOR,
+            'license': cls.LICENSE,
+            'url': cls.URL
+        }
+
+
+    @classmethod
+    def get_header(cls) -> str:
+        """生成标准化的项目头信息"""
+        return f"{cls.NAME} {cls.VERSION} | {cls.LICENSE} License | {cls.URL}"
+
+
+class InputBackend:
+    """输入注入后端基类（点击引擎只通过该接口发送鼠标事件）"""
+    name = "base"
+    supports_failsafe = True  # 是否可以用真实鼠标位置做屏幕角落保护
+
+    def move_to(self, x, y):
+        raise NotImplementedError
+
+    def move_rel(self, dx, dy):
+        x, y = self.position()
+        self.move_to(x + dx, y + dy)
+
+    def mouse_down(self, button):
+        raise NotImplementedError
+
+    def mouse_up(self, button):
+        raise NotImplementedError
+
+    def click(self, button, clicks=1, interval=0.0):
+        for i in range(clicks):
+            self.mouse_down(button)
+            self.mouse_up(button)
+            if interval and i < clicks - 1:
+                time.sleep(interval)
+
+    def position(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PyAutoGUIBackend(InputBackend):
+    """通过 pyautogui 注入事件（默认后端）"""
+    name = "pyautogui"
+
+    def move_to(self, x, y):
+        pyautogui.moveTo(x, y)
+
+    def move_rel(self, dx, dy):
+        pyautogui.moveRel(dx, dy)
+
+    def mouse_down(self, button):
+        pyautogui.mouseDown(button=button)
+
+    def mouse_up(self, button):
+        pyautogui.mouseUp(button=button)
+
+    def click(self, button, clicks=1, interval=0.0):
+        pyautogui.click(button=button, clicks=clicks, interval=interval)
+
+    def position(self):
+        x, y = pyautogui.position()
+        return x, y
+
+
+class RawPyAutoGUIBackend(InputBackend):
+    """原始注入模式：直接调用 pyautogui 的平台层，跳过每次调用的 PAUSE 等待和 failsafe 检查
+
+    平台层函数（_moveTo、_mouseDown 等）不是 pyautogui 的公开接口，创建时先检查它们是否存在，
+    调用时签名不符也会被发现；这两种情况下都改用公开接口并传入 _pause=False
+    （只对这一次调用相当于 PAUSE=0，不修改全局设置）。
+    按下/松开和相对移动都以实时读取的鼠标位置为准，用户或其他会话移动鼠标后不会跳回旧位置。
+    """
+    name = "pyautogui-raw"
+    PLATFORM_FUNCTIONS = ("_moveTo", "_mouseDown", "_mouseUp", "_position")
+
+    def __init__(self):
+        self.platform = getattr(pyautogui, "platformModule", None)
+        missing = [name for name in self.PLATFORM_FUNCTIONS if not callable(getattr(self.platform, name, None))]
+        if missing:
+            logging.warning(f"pyautogui {getattr(pyautogui, '__version__', '?')} 缺少平台层函数 "
+                            f"{', '.join(missing)}，原始注入模式改用公开接口（不等待 PAUSE）")
+            self.platform = None
+
+    def _fallback(self, error):
+        logging.warning(f"调用 pyautogui 平台层失败，原始注入模式改用公开接口（不等待 PAUSE）: {str(error)}")
+        self.platform = None
+
+    def move_to(self, x, y):
+        if self.platform is not None:
+            try:
+                self.platform._moveTo(x, y)
+                return
+            except TypeError as e:
+                self._fallback(e)
+        pyautogui.moveTo(x, y, _pause=False)
+
+    def move_rel(self, dx, dy):
+        x, y = self.position()
+        self.move_to(x + dx, y + dy)
+
+    def mouse_down(self, button):
+        if self.platform is not None:
+            try:
+                x, y = self.platform._position()
+                self.platform._mouseDown(x, y, button)
+                return
+            except TypeError as e:
+                self._fallback(e)
+        pyautogui.mouseDown(button=button, _pause=False)
+
+    def mouse_up(self, button):
+        if self.platform is not None:
+            try:
+                x, y = self.platform._position()
+                self.platform._mouseUp(x, y, button)
+                return
+            except TypeError as e:
+                self._fallback(e)
+        pyautogui.mouseUp(button=button, _pause=False)
+
+    def position(self):
+        if self.platform is not None:
+            try:
+                x, y = self.platform._position()
+                return x, y
+            except TypeError as e:
+                self._fallback(e)
+        x, y = pyautogui.position()
+        return x, y
+
+
+class PynputBackend(InputBackend):
+    """通过 pynput 的鼠标控制器注入事件"""
+    name = "pynput"
+
+    def __init__(self):
+        from pynput.mouse import Button
+        self.controller = MouseController()
+        self.buttons = {
+            "left": Button.left,
+            "middle": Button.middle,
+            "right": Button.right
+        }
+
+    def move_to(self, x, y):
+        self.controller.position = (x, y)
+
+    def move_rel(self, dx, dy):
+        self.controller.move(dx, dy)
+
+    def mouse_down(self, button):
+        self.controller.press(self.buttons[button])
+
+    def mouse_up(self, button):
+        self.controller.release(self.buttons[button])
+
+    def position(self):
+        x, y = self.controller.position
+        return int(x), int(y)
+
+
+class XTestBackend(InputBackend):
+    """通过 X11 XTest 扩展直接注入事件（仅 Linux）"""
+    name = "xtest"
+    BUTTONS = {"left": 1, "middle": 2, "right": 3}
+
+    def __init__(self):
+        if xdisplay is None:
+            raise RuntimeError("未安装 python-xlib，无法使用 XTest 后端")
+        self.display = xdisplay.Display()
+        self.root = self.display.screen().root
+
+    def move_to(self, x, y):
+        xtest.fake_input(self.display, X.MotionNotify, x=int(x), y=int(y))
+        self.display.flush()
+
+    def move_rel(self, dx, dy):
+        # detail=True 表示相对移动
+        xtest.fake_input(self.display, X.MotionNotify, detail=True, x=int(dx), y=int(dy))
+        self.display.flush()
+
+    def mouse_down(self, button):
+        xtest.fake_input(self.display, X.ButtonPress, self.BUTTONS[button])
+        self.display.flush()
+
+    def mouse_up(self, button):
+        xtest.fake_input(self.display, X.ButtonRelease, self.BUTTONS[button])
+        self.display.flush()
+
+    def position(self):
+        pointer = self.root.query_pointer()
+        return pointer.root_x, pointer.root_y
+
+    def close(self):
+        self.display.close()
+
+
+class RecordingBackend(InputBackend):
+    """内存记录后端：不触碰真实桌面，只为每个事件打上时间戳（用于无显示环境下的测试和基准）"""
+    name = "recording"
+    supports_failsafe = False
+
+    def __init__(self, start_position=(0, 0)):
+        self.x, self.y = start_position
+        self.events = []  # (perf_counter_ns, 类型, x, y, 按键)
+
+    def _record(self, kind, button=None):
+        self.events.append((time.perf_counter_ns(), kind, self.x, self.y, button))
+
+    def move_to(self, x, y):
+        self.x, self.y = x, y
+        self._record("move")
+
+    def move_rel(self, dx, dy):
+        self.x += dx
+        self.y += dy
+        self._record("move")
+
+    def mouse_down(self, button):
+        self._record("down", button)
+
+    def mouse_up(self, button):
+        self._record("up", button)
+
+    def position(self):
+        return self.x, self.y
+
+    def clear(self):
+        self.events = []
+
+    def count(self, kind):
+        """统计指定类型的事件数量"""
+        return sum(1 for event in self.events if event[1] == kind)
+
+
+INPUT_BACKENDS = {
+    "pyautogui": PyAutoGUIBackend,
+    "pynput": PynputBackend,
+    "xtest": XTestBackend,
+    "recording": RecordingBackend
+}
+
+
+def create_input_backend(name, raw=False):
+    """按名称创建输入后端，创建失败时回退到 pyautogui
+
+    raw=True 时 pyautogui 后端换成跳过内置暂停的原始版本，其余后端本身就没有额外暂停。
+    """
+    backend_class = INPUT_BACKENDS.get(name, PyAutoGUIBackend)
+    if raw and backend_class is PyAutoGUIBackend:
+        backend_class = RawPyAutoGUIBackend
+    try:
+        return backend_class()
+    except Exception as e:
+        logging.warning(f"创建输入后端 {name} 失败，回退到 pyautogui: {str(e)}")
+        return PyAutoGUIBackend()
+
+
+class InjectionStopped(Exception):
+    """原始注入模式下的安全保护被触发"""
+
+
+class GuardedBackend(InputBackend):
+    """原始注入模式的安全包装
+
+    pyautogui 的 failsafe 在每次调用时都要查询一次鼠标位置，这里改为：
+    每个事件之前只检查紧急停止事件，屏幕角落检测按固定间隔低频进行。
+    """
+
+    def __init__(self, backend, stop_event, corner_check_interval=0.25):
+        self.backend = backend
+        self.name = f"{backend.name}+guard"
+        self.stop_event = stop_event
+        self.corner_check_interval_ns = int(corner_check_interval * 1e9)
+        self.next_corner_check_ns = 0
+        self.pressed = set()
+        self.corners = set()
+        if backend.supports_failsafe:
+            width, height = pyautogui.size()
+            self.corners = {(0, 0), (width - 1, 0), (0, height - 1), (width - 1, height - 1)}
+
+    def check(self):
+        if self.stop_event.is_set():
+            raise InjectionStopped("紧急停止")
+        if self.corners:
+            now = time.perf_counter_ns()
+            if now >= self.next_corner_check_ns:
+                self.next_corner_check_ns = now + self.corner_check_interval_ns
+                if tuple(self.backend.position()) in self.corners:
+                    self.stop_event.set()
+                    raise InjectionStopped("鼠标移动到屏幕角落")
+
+    def move_to(self, x, y):
+        self.check()
+        self.backend.move_to(x, y)
+
+    def move_rel(self, dx, dy):
+        self.check()
+        self.backend.move_rel(dx, dy)
+
+    def mouse_down(self, button):
+        self.check()
+        self.backend.mouse_down(button)
+        self.pressed.add(button)
+
+    def mouse_up(self, button):
+        # 松开按键不做检查，保证停止时不会留下按住的按键
+        self.backend.mouse_up(button)
+        self.pressed.discard(button)
+
+    def position(self):
+        return self.backend.position()
+
+    def release_all(self):
+        """松开所有仍处于按下状态的按键"""
+        for button in list(self.pressed):
+            self.mouse_up(button)
+
+    def close(self):
+        self.backend.close()
+
+
+class DeadlineTimer:
+    """基于绝对截止时间的间隔调度器
+
+    下一次截止时间由上一次截止时间累加得到（而不是从点击结束时刻重新计时），
+    所以点击、移动和触发器检查本身的耗时不会累积成速率漂移。
+    等待时先用可被停止事件唤醒的粗睡眠，剩余不足 spin_threshold 时改为自旋，
+    避免 time.sleep 的调度粒度把间隔向上取整。
+    """
+    # Windows 的默认计时器粒度约 15.6ms，自旋窗口需要相应放大
+    DEFAULT_SPIN_THRESHOLD = 0.016 if platform.system() == "Windows" else 0.002
+
+    def __init__(self, spin_threshold=None):
+        if spin_threshold is None:
+            spin_threshold = self.DEFAULT_SPIN_THRESHOLD
+        self.spin_threshold_ns = int(spin_threshold * 1e9)
+        self.deadline_ns = time.perf_counter_ns()
+        self.resyncs = 0
+
+    def reset(self):
+        """以当前时刻作为下一次截止时间"""
+        self.deadline_ns = time.perf_counter_ns()
+
+    def advance(self, interval):
+        """把截止时间向后推进一个间隔（秒）"""
+        interval_ns = int(interval * 1e9)
+        self.deadline_ns += interval_ns
+        now_ns = time.perf_counter_ns()
+        if now_ns - self.deadline_ns > interval_ns:
+            # 落后超过一个完整周期（例如长按时间大于间隔）时重新对齐，避免连续补点
+            self.deadline_ns = now_ns
+            self.resyncs += 1
+
+    def wait(self, stop_event):
+        """等待到截止时间，返回迟到的纳秒数；等待期间收到停止信号时返回 None"""
+        deadline_ns = self.deadline_ns
+        while True:
+            remaining_ns = deadline_ns - time.perf_counter_ns()
+            if remaining_ns <= 0:
+                return -remaining_ns
+            if stop_event.is_set():
+                return None
+            if remaining_ns > self.spin_threshold_ns:
+                stop_event.wait((remaining_ns - self.spin_threshold_ns) / 1e9)
+            else:
+                while time.perf_counter_ns() < deadline_ns:
+                    pass
+
+
+def spin_until(deadline_ns):
+    """自旋到截止时间；每次检查之间 sleep(0) 让出 GIL，多个同时自旋的注入线程不会互相挤占，
+    也不会拖慢事件循环和界面线程"""
+    while time.perf_counter_ns() < deadline_ns:
+        time.sleep(0)
+
+
+class ClickSessionStats:
+    """点击会话统计：实际点击速率与配置间隔的对比，以及每次点击相对截止时间的迟到量"""
+
+    def __init__(self, target_interval, lateness_history=10000):
+        self.target_interval = target_interval  # 秒，随机间隔时取平均值
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns = None
+        self.iterations = 0
+        self.clicks = 0
+        self.first_click_ns = None
+        self.last_click_ns = None
+        self.lateness_ns = deque(maxlen=lateness_history)
+        self.max_lateness_ns = 0
+        self.resyncs = 0
+
+    def record(self, clicks):
+        now_ns = time.perf_counter_ns()
+        if self.first_click_ns is None:
+            self.first_click_ns = now_ns
+        self.last_click_ns = now_ns
+        self.iterations += 1
+        self.clicks += clicks
+
+    def record_lateness(self, lateness_ns):
+        self.lateness_ns.append(lateness_ns)
+        if lateness_ns > self.max_lateness_ns:
+            self.max_lateness_ns = lateness_ns
+
+    def lateness_percentiles(self, percentiles=(50, 99)):
+        """返回迟到量的百分位数（毫秒）"""
+        if not self.lateness_ns:
+            return [0.0 for _ in percentiles]
+        # list(deque) 在 C 层一次完成，界面线程读取时不会和点击线程的 append 冲突
+        values = np.percentile(np.array(list(self.lateness_ns), dtype=np.int64), percentiles)
+        return [float(v) / 1e6 for v in values]
+
+    def finish(self):
+        self.end_ns = time.perf_counter_ns()
+
+    def elapsed(self):
+        end_ns = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+        return (end_ns - self.start_ns) / 1e9
+
+    def target_rate(self):
+        """配置的循环速率（次/秒）"""
+        return 1.0 / self.target_interval if self.target_interval > 0 else 0.0
+
+    def achieved_rate(self):
+        """实际循环速率（次/秒），按第一次到最后一次点击之间的间隔数计算"""
+        if self.iterations < 2:
+            return 0.0
+        span = (self.last_click_ns - self.first_click_ns) / 1e9
+        return (self.iterations - 1) / span if span > 0 else 0.0
+
+    def achieved_cps(self):
+        """实际点击速率（按计数的点击数，次/秒）"""
+        if not self.iterations:
+            return 0.0
+        return self.achieved_rate() * self.clicks / self.iterations
+
+    def summary(self):
+        target = self.target_rate()
+        achieved = self.achieved_rate()
+        ratio = 100.0 * achieved / target if target > 0 else 0.0
+        p50, p99 = self.lateness_percentiles()
+        return (f"实际速率: {achieved:.1f} 次/秒 (目标 {target:.1f} 次/秒, 达成 {ratio:.1f}%), "
+                f"点击速率: {self.achieved_cps():.1f} CPS, "
+                f"迟到 p50/p99/max: {p50:.2f}/{p99:.2f}/{self.max_lateness_ns / 1e6:.2f}ms, "
+                f"重新对齐: {self.resyncs}次")
+
+
+class JitterSource:
+    """预生成随机数的环形缓冲区
+
+    随机数用 NumPy 按块批量生成并转换成 Python 列表，由后台线程提前填满一个有界队列；
+    点击线程每次只做一次列表下标读取，块用完时直接换下一块，RNG 的开销不在点击的关键路径上。
+    指定种子时数值序列完全可复现。
+    """
+    DISTRIBUTIONS = ("uniform", "gaussian", "clipped_normal")
+
+    def __init__(self, low, high, distribution="uniform", integer=False, seed=None,
+                 block_size=4096, depth=3):
+        self.low = low
+        self.high = high
+        self.distribution = distribution if distribution in self.DISTRIBUTIONS else "uniform"
+        self.integer = integer
+        self.block_size = block_size
+        self.rng = np.random.default_rng(seed)
+        self.ready = queue.Queue(maxsize=depth)
+        self.closed = False
+        self.values = self._generate()
+        self.index = 0
+        self.thread = threading.Thread(target=self._refill, daemon=True)
+        self.thread.start()
+
+    def _generate(self):
+        low, high, n = self.low, self.high, self.block_size
+        if self.distribution == "uniform":
+            if self.integer:
+                values = self.rng.integers(low, high + 1, n)
+            else:
+                values = self.rng.uniform(low, high, n)
+        else:
+            # 均值取区间中点，3σ 覆盖整个区间
+            sigma = (high - low) / 6 or 1e-9
+            values = self.rng.normal((low + high) / 2, sigma, n)
+            if self.distribution == "clipped_normal":
+                values = np.clip(values, low, high)
+            elif low >= 0:
+                values = np.maximum(values, 0)  # 间隔不能为负
+        if self.integer:
+            values = np.rint(values).astype(np.int64)
+        return values.tolist()
+
+    def _refill(self):
+        while not self.closed:
+            block = self._generate()
+            self.ready.put(block)
+
+    def next_value(self):
+        """取出下一个随机数"""
+        try:
+            value = self.values[self.index]
+        except IndexError:
+            self.values = self.ready.get()
+            self.index = 0
+            value = self.values[0]
+        self.index += 1
+        return value
+
+    def close(self):
+        self.closed = True
+        # 取走一块，让可能阻塞在 put 上的后台线程退出
+        try:
+            self.ready.get_nowait()
+        except queue.Empty:
+            pass
+
+
+JITTER_DISTRIBUTION_NAMES = {"均匀分布": "uniform", "高斯分布": "gaussian", "截断正态分布": "clipped_normal"}
+
+
+class FrozenRecord:
+    """不可变记录基类：子类在 __slots__ 中声明字段，创建后不能再修改"""
+    __slots__ = ()
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            object.__setattr__(self, name, fields[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} 是不可变对象")
+
+    def replace(self, **changes):
+        """返回修改了部分字段的新副本"""
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields.update(changes)
+        return type(self)(**fields)
+
+
+BUTTON_NAMES = {"左键": "left", "中键": "middle", "右键": "right"}
+COMBO_BUTTONS = (("left", "right"), ("left", "middle"), ("right", "middle"))
+
+
+class ClickPlan(FrozenRecord):
+    """编译后的不可变点击计划
+
+    开始模拟时把界面上的设置一次性解析成普通 Python 数据：按键名、点击模式对应的
+    事件时间轴、坐标数组和压枪数组。点击循环只需要按下标遍历这些数组，
+    不再每次循环都查按键表、走点击模式的 if 分支。
+
+    时间轴是 (相对循环开始的秒数, 事件, 按键) 序列，事件为 move（移动到目标坐标）、
+    down、up 和 recoil（压枪偏移）。双击、三连击、长按和组合键的等待都体现在时间戳里，
+    由调度器到点执行，不在循环中阻塞。
+    """
+    __slots__ = (
+        "button", "click_mode", "timeline", "clicks_per_cycle",
+        "interval", "random_interval", "min_interval", "max_interval",
+        "click_limit", "follow_cursor", "positions", "recoil", "random_offset",
+        "jitter_distribution", "jitter_seed", "test_loop", "test_loop_limit", "verify_area", "generate_report"
+    )
+
+    @property
+    def mean_interval(self):
+        """平均间隔（秒），用于统计目标速率"""
+        if self.random_interval:
+            return (self.min_interval + self.max_interval) / 2
+        return self.interval
+
+    @staticmethod
+    def compile_timeline(button, click_mode, hold_time, combo_buttons,
+                         double_click_interval=0.0, triple_click_interval=0.1, combo_hold=0.05):
+        """把点击模式编译成按下/松开事件的时间轴，返回 (时间轴, 每次循环计入的点击数)"""
+        if click_mode == 0 and combo_buttons:  # 组合键
+            events = [(0.0, "down", btn) for btn in combo_buttons]
+            events += [(combo_hold, "up", btn) for btn in reversed(combo_buttons)]
+            return tuple(events), len(combo_buttons)
+        if click_mode == 3:  # 长按
+            return ((0.0, "down", button), (hold_time, "up", button)), 1
+
+        if click_mode == 1:  # 双击
+            count, gap = 2, double_click_interval
+        elif click_mode == 2:  # 三连击
+            count, gap = 3, triple_click_interval
+        else:
+            count, gap = 1, 0.0
+        events = []
+        for i in range(count):
+            events += [(i * gap, "down", button), (i * gap, "up", button)]
+        return tuple(events), count
+
+    @classmethod
+    def compile(cls, button="左键", click_mode=0, hold_time=0.1,
+                double_click_interval=0.0, triple_click_interval=0.1, combo_hold=0.05,
+                interval=0.1, random_interval=False, min_interval=0.05, max_interval=0.2,
+                click_limit=None, position_mode=0, fixed_position=(0, 0), positions=(),
+                combo_key=False, combo_key_type=0, recoil_pattern=(),
+                anti_detect=False, random_offset=0, jitter_distribution="uniform", jitter_seed=None,
+                test_loop=1, test_loop_enabled=False, verify_area=None, generate_report=False):
+        """由界面设置编译点击计划（时间单位均为秒）"""
+        if button not in BUTTON_NAMES.values():
+            button = BUTTON_NAMES.get(button, "left")
+        combo_buttons = COMBO_BUTTONS[combo_key_type] if combo_key and 0 <= combo_key_type < len(COMBO_BUTTONS) else ()
+        timeline, clicks_per_cycle = cls.compile_timeline(
+            button, click_mode, hold_time, combo_buttons,
+            double_click_interval, triple_click_interval, combo_hold
+        )
+        # 循环开始时移动到目标位置，压枪偏移放在最后一个按键事件之后
+        timeline = ((0.0, "move", None),) + timeline
+        if recoil_pattern:
+            timeline += ((timeline[-1][0], "recoil", None),)
+
+        if position_mode == 1:  # 固定坐标
+            positions = (tuple(fixed_position),)
+        elif position_mode == 2:  # 多坐标循环
+            positions = tuple(tuple(pos) for pos in positions)
+        else:  # 当前鼠标位置
+            positions = ()
+
+        return cls(
+            button=button,
+            click_mode=click_mode,
+            timeline=timeline,
+            clicks_per_cycle=clicks_per_cycle,
+            interval=interval,
+            random_interval=random_interval,
+            min_interval=min_interval,
+            max_interval=max_interval,
+            click_limit=click_limit,
+            follow_cursor=not positions,
+            positions=positions,
+            recoil=tuple(tuple(step) for step in recoil_pattern),
+            random_offset=random_offset if anti_detect else 0,
+            jitter_distribution=jitter_distribution,
+            jitter_seed=jitter_seed,
+            test_loop=test_loop,
+            test_loop_limit=test_loop if test_loop_enabled else 0,
+            verify_area=tuple(verify_area) if verify_area and len(verify_area) == 4 else None,
+            generate_report=generate_report
+        )
+
+
+class ClickPlanRunner:
+    """按点击计划的时间轴逐个执行事件：只在预先计算好的数组上步进，后端方法在创建时就绑定好
+
+    时间轴中同一按键零间隔的 down/up 合并为一次 click 调用；按下但尚未松开的按键会被记录，
+    会话中途停止时由 release_all 松开。
+    """
+    __slots__ = ("plan", "backend", "events", "event_index", "pressed",
+                 "position_index", "recoil_index", "offsets", "intervals")
+
+    def __init__(self, plan, backend):
+        self.plan = plan
+        self.backend = backend
+        self.event_index = 0
+        self.pressed = set()
+        self.position_index = 0
+        self.recoil_index = 0
+
+        actions = {
+            "move": self.aim,
+            "recoil": self.recoil,
+            "click": backend.click,
+            "down": self.press,
+            "up": self.release
+        }
+        events = []
+        timeline = plan.timeline
+        i = 0
+        while i < len(timeline):
+            offset, kind, btn = timeline[i]
+            if kind == "down" and i + 1 < len(timeline) and timeline[i + 1] == (offset, "up", btn):
+                kind = "click"
+                i += 1
+            events.append((int(offset * 1e9), actions[kind], btn))
+            i += 1
+        self.events = tuple(events)
+
+        # 偏移和随机间隔各用一个独立的随机流，固定种子时两者都可复现
+        if plan.jitter_seed is not None:
+            offset_seed, interval_seed = np.random.SeedSequence(plan.jitter_seed).spawn(2)
+        else:
+            offset_seed = interval_seed = None
+        self.offsets = None
+        if plan.random_offset:
+            self.offsets = JitterSource(-plan.random_offset, plan.random_offset,
+                                        plan.jitter_distribution, integer=True, seed=offset_seed)
+        self.intervals = None
+        if plan.random_interval:
+            self.intervals = JitterSource(plan.min_interval, plan.max_interval,
+                                          plan.jitter_distribution, seed=interval_seed)
+
+    def aim(self, _button=None):
+        """移动到本次循环的目标坐标（多坐标循环、随机偏移）"""
+        plan = self.plan
+        backend = self.backend
+
+        if plan.follow_cursor:
+            x, y = backend.position()
+        else:
+            x, y = plan.positions[self.position_index]
+            self.position_index += 1
+            if self.position_index == len(plan.positions):
+                self.position_index = 0
+
+        offsets = self.offsets
+        if offsets is not None:
+            x += offsets.next_value()
+            y += offsets.next_value()
+
+        backend.move_to(x, y)
+
+    def recoil(self, _button=None):
+        dx, dy = self.plan.recoil[self.recoil_index]
+        self.backend.move_rel(dx, dy)
+        self.recoil_index += 1
+        if self.recoil_index == len(self.plan.recoil):
+            self.recoil_index = 0
+
+    def press(self, button):
+        self.backend.mouse_down(button)
+        self.pressed.add(button)
+
+    def release(self, button):
+        self.backend.mouse_up(button)
+        self.pressed.discard(button)
+
+    def fire_due(self):
+        """执行当前到期的事件（时间戳相同的连续事件一起执行）
+
+        返回下一个事件相对循环开始的纳秒数；本次循环的事件全部执行完时返回 None。
+        """
+        events = self.events
+        i = self.event_index
+        offset_ns = events[i][0]
+        while i < len(events) and events[i][0] == offset_ns:
+            _, action, button = events[i]
+            action(button)
+            i += 1
+        if i == len(events):
+            self.event_index = 0
+            return None
+        self.event_index = i
+        return events[i][0]
+
+    def run_cycle(self):
+        """不等待地执行完整一次循环（仅用于基准测试），返回本次计入的点击数"""
+        while self.fire_due() is not None:
+            pass
+        return self.plan.clicks_per_cycle
+
+    def release_all(self):
+        """松开中途停止时仍处于按下状态的按键"""
+        for button in list(self.pressed):
+            try:
+                self.release(button)
+            except Exception as e:
+                logging.error(f"松开按键 {button} 时出错: {str(e)}")
+
+    def next_interval(self):
+        """本次循环之后的等待间隔（秒）"""
+        if self.intervals is not None:
+            return self.intervals.next_value()
+        return self.plan.interval
+
+    def close(self):
+        """停止随机数的后台填充线程"""
+        for source in (self.offsets, self.intervals):
+            if source is not None:
+                source.close()
+
+
+class ClickSession:
+    """由 ClickScheduler 驱动的一个独立点击会话（计划、后端、统计和截止时间）"""
+    TRIGGER_RETRY_INTERVAL = 0.1  # 触发条件不满足时的重试间隔（秒）
+
+    def __init__(self, name, plan, backend, trigger_check=None, on_finish=None, stop_event=None, verifier=None,
+                 trigger_retry=None, trigger_state=None, latency=None):
+        self.name = name
+        self.plan = plan
+        self.backend = backend
+        self.stop_event = stop_event if stop_event is not None else threading.Event()
+        self.runner = ClickPlanRunner(plan, backend)
+        self.stats = ClickSessionStats(plan.mean_interval)
+        self.timer = DeadlineTimer()
+        self.trigger_check = trigger_check
+        # 触发器引擎会在条件满足时立即唤醒会话，此时重试间隔只是兜底
+        self.trigger_retry = self.TRIGGER_RETRY_INTERVAL if trigger_retry is None else trigger_retry
+        self.waiting_trigger = False
+        # trigger_state() 返回触发器的锁存状态；两者都提供时记录触发点击的端到端延迟
+        self.trigger_state = trigger_state
+        self.latency = latency
+        self.latency_start = None
+        self.on_finish = on_finish
+        self.verifier = verifier
+        self.iterations = 0
+        self.after_click = False
+        self.cycle_start_ns = None
+        self.event_deadline_ns = None
+        self.heap_seq = None
+        # 以下两项由调度器维护：会话是否正在注入线程中执行，以及执行期间收到的重新调度请求
+        self.in_flight = False
+        self.reschedule = False
+        self.finished = False
+        self.finish_reason = None
+
+    @property
+    def deadline_ns(self):
+        """下一次需要调度的时间：循环内的下一个事件，或下一次循环的开始"""
+        if self.event_deadline_ns is not None:
+            return self.event_deadline_ns
+        return self.timer.deadline_ns
+
+    def fire(self, now_ns):
+        """执行到期的事件并推进截止时间，返回 False 表示会话已结束
+
+        停止请求在任意两个事件之间生效；触发条件、迟到统计和点击次数限制只在循环开始时检查。
+        """
+        if self.stop_event.is_set():
+            return self.finish("已停止")
+
+        plan = self.plan
+        stats = self.stats
+        if self.cycle_start_ns is None:
+            if self.trigger_check is not None and not self.trigger_check():
+                self.after_click = False
+                self.waiting_trigger = True
+                self.timer.reset()
+                self.timer.advance(self.trigger_retry)
+                return True
+            if self.waiting_trigger and self.latency is not None and self.trigger_state is not None:
+                self.latency_start = (self.trigger_state(), now_ns)
+            self.waiting_trigger = False
+
+            if self.after_click:
+                stats.record_lateness(max(0, now_ns - self.timer.deadline_ns))
+
+            if plan.click_limit is not None and stats.clicks >= plan.click_limit:
+                return self.finish(f"达到点击次数限制: {stats.clicks}/{plan.click_limit}")
+            self.cycle_start_ns = now_ns
+
+        try:
+            next_offset_ns = self.runner.fire_due()
+        except InjectionStopped as e:
+            return self.finish(f"原始注入模式安全保护触发: {str(e)}")
+        if self.latency_start is not None:
+            self.latency.record(*self.latency_start, time.perf_counter_ns())
+            self.latency_start = None
+
+        if next_offset_ns is not None:
+            # 循环内还有事件（双击间隔、长按、组合键按住），到点再由调度器唤醒
+            self.event_deadline_ns = self.cycle_start_ns + next_offset_ns
+            return True
+        self.cycle_start_ns = self.event_deadline_ns = None
+        stats.record(plan.clicks_per_cycle)
+        if self.verifier is not None:
+            self.verifier.check()
+
+        self.iterations += 1
+        if plan.test_loop_limit and self.iterations >= plan.test_loop_limit:
+            return self.finish(f"完成测试循环: {self.iterations}/{plan.test_loop_limit}")
+
+        self.timer.advance(self.runner.next_interval())
+        stats.resyncs = self.timer.resyncs
+        self.after_click = True
+        return True
+
+    def finish(self, reason):
+        """结束会话：松开按键、停止随机数线程并回调 on_finish（在注入线程中调用）"""
+        if self.finished:
+            return False
+        self.finished = True
+        self.finish_reason = reason
+        self.runner.release_all()
+        if isinstance(self.backend, GuardedBackend):
+            self.backend.release_all()
+        self.runner.close()
+        self.stats.finish()
+        logging.info(f"会话 {self.name} 结束 ({reason}) - {self.stats.summary()}")
+        if self.verifier is not None:
+            logging.info(f"会话 {self.name} 结果验证 - {self.verifier.summary()}")
+        if self.on_finish is not None:
+            self.on_finish(self)
+        return False
+
+
+class AsyncCore:
+    """异步核心：在一个后台线程中运行 asyncio 事件循环，与 Qt 界面线程并存
+
+    点击调度、触发器评估、远程控制服务和宏录制/回放都作为任务运行在这个循环上，
+    没有任务时线程阻塞在事件循环中，不产生空闲唤醒。所有计时统一使用 time.perf_counter_ns，
+    等待一律换算成相对时长（asyncio.sleep），不混用不同的时钟。
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name="AsyncCore", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            # 取消停止时仍未结束的任务，让它们的 finally 得以执行
+            pending = asyncio.all_tasks(self.loop)
+            for task in pending:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self.loop.close()
+
+    def submit(self, coro):
+        """从任意线程提交协程，返回 concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call_soon(self, callback, *args):
+        """从任意线程把回调放到事件循环中执行"""
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    async def run_blocking(self, func, *args):
+        """在线程池中执行阻塞调用（截图、图像匹配、注入等）"""
+        return await self.loop.run_in_executor(None, func, *args)
+
+    def stop(self):
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=1)
+
+
+class TriggerState(FrozenRecord):
+    """触发器的锁存状态
+
+    satisfied/timestamp_ns 为最近一次评估的结果和完成时刻；changed_ns 为最近一次状态翻转（边沿）
+    的时刻，capture_ns 为导致这次翻转的那次评估所依据画面的采集时刻，用于端到端延迟统计。
+    """
+    __slots__ = ("satisfied", "timestamp_ns", "changed_ns", "capture_ns", "edges")
+
+    @classmethod
+    def initial(cls, satisfied, now_ns=0):
+        return cls(satisfied=satisfied, timestamp_ns=now_ns, changed_ns=now_ns, capture_ns=now_ns, edges=0)
+
+    def update(self, satisfied, now_ns, capture_ns=None):
+        if satisfied == self.satisfied:
+            return self.replace(timestamp_ns=now_ns)
+        return TriggerState(satisfied=satisfied, timestamp_ns=now_ns, changed_ns=now_ns,
+                            capture_ns=now_ns if capture_ns is None else capture_ns, edges=self.edges + 1)
+
+
+class TriggerChannel:
+    """触发器引擎中的一个工作者：按自己的频率评估一类触发器，并锁存结果"""
+
+    def __init__(self, key, name, check, is_enabled, interval, wake_after=None):
+        self.key = key
+        self.name = name
+        self.check = check
+        self.is_enabled = is_enabled
+        self.interval = interval
+        # wake_after() 返回距离结果可能变化还有多少秒（例如定时计划的下一次变化），代替固定间隔
+        self.wake_after = wake_after
+        self.next_wait = None
+        self.state = TriggerState.initial(True)
+        self.evaluations = 0
+        self.eval_ms = None
+        self.changed = None
+        self.task = None
+
+    def summary(self, now_ns):
+        if not self.is_enabled():
+            return f"{self.name}: 未启用"
+        eval_text = f"{self.eval_ms:.2f}ms" if self.eval_ms is not None else "-"
+        age_ms = (now_ns - self.state.timestamp_ns) / 1e6
+        if self.wake_after is not None and self.next_wait is not None:
+            rate_text = f"{self.next_wait:.0f}s 后再检查"
+        else:
+            rate_text = f"每 {self.interval * 1000:.0f}ms 检查"
+        return (f"{self.name}: {'满足' if self.state.satisfied else '不满足'} "
+                f"({rate_text}, 耗时 {eval_text}, {age_ms:.0f}ms 前)")
+
+
+class TriggerEngine:
+    """事件驱动的触发器引擎
+
+    每类触发器（定时、颜色类、图像类）是异步核心上的一个独立工作者任务，按各自的频率在
+    线程池中评估，结果锁存为带时间戳的 TriggerState；所有通道都满足时合并状态为满足。
+    点击会话只读取合并状态（普通属性读取，不等待截图或匹配）。合并状态翻转时立即调用
+    监听者（调度器据此唤醒等待触发的会话），并在条件变量上 notify_all，供其他线程 wait_for。
+    未启用的通道挂起等待设置变化，不做周期唤醒。
+
+    通道的 check 返回是否满足，或 (是否满足, 所依据画面的采集时刻 perf_counter_ns)。
+    """
+    EDGE_FALLBACK_INTERVAL = 1.0  # 等待边沿的会话的兜底重试间隔（秒）
+
+    def __init__(self, core):
+        self.core = core
+        self.channels = []
+        self.listeners = []
+        self.condition = threading.Condition()
+        self.state = TriggerState.initial(True)
+        self.users = 0
+
+    # 按计划唤醒的通道最长睡眠时间，防止系统休眠或调整时钟后错过变化
+    MAX_SCHEDULED_WAIT = 600.0
+
+    def add_channel(self, key, name, check, is_enabled, interval, wake_after=None):
+        channel = TriggerChannel(key, name, check, is_enabled, interval, wake_after)
+        self.channels.append(channel)
+        return channel
+
+    def add_listener(self, callback):
+        """callback(state) 在合并状态翻转时于事件循环线程中调用"""
+        self.listeners.append(callback)
+
+    def set_interval(self, key, interval):
+        """修改某个通道的检查间隔（秒），立即按新频率重新开始"""
+        for channel in self.channels:
+            if channel.key == key:
+                channel.interval = interval
+        self.notify_changed()
+
+    def acquire(self):
+        """有会话开始使用触发结果（任意线程）"""
+        self.core.call_soon(self._acquire)
+
+    def release(self):
+        """会话结束，不再需要触发结果（任意线程）"""
+        self.core.call_soon(self._release)
+
+    def notify_changed(self):
+        """触发器设置已变化，所有通道立即重新评估（任意线程）"""
+        self.core.call_soon(self._notify_changed)
+
+    def _acquire(self):
+        self.users += 1
+        if self.users > 1:
+            return
+        now_ns = time.perf_counter_ns()
+        for channel in self.channels:
+            # 第一次评估完成前不放行点击
+            enabled = channel.is_enabled()
+            channel.state = TriggerState.initial(not enabled, now_ns)
+            if channel.changed is None:
+                channel.changed = asyncio.Event()
+            if channel.task is None:
+                channel.task = self.core.loop.create_task(self.run_channel(channel))
+        self._combine(now_ns)
+
+    def _release(self):
+        self.users -= 1
+        if self.users <= 0:
+            self._notify_changed()
+
+    def _notify_changed(self):
+        for channel in self.channels:
+            if channel.changed is not None:
+                channel.changed.set()
+
+    def is_satisfied(self):
+        return self.state.satisfied
+
+    def wait_for(self, satisfied=True, timeout=None):
+        """阻塞等待合并状态变为 satisfied（任意非事件循环线程），超时返回 False"""
+        with self.condition:
+            return self.condition.wait_for(lambda: self.state.satisfied == satisfied, timeout)
+
+    async def run_channel(self, channel):
+        try:
+            while self.users > 0:
+                channel.changed.clear()
+                if channel.is_enabled():
+                    # 在评估之前取得下一次变化的时刻，评估期间越过边界时不会错过这次变化
+                    wake_after = channel.wake_after() if channel.wake_after is not None else None
+                    start_ns = time.perf_counter_ns()
+                    capture_ns = start_ns
+                    try:
+                        result = await self.core.run_blocking(channel.check)
+                        if isinstance(result, tuple):
+                            result, capture_ns = result
+                        satisfied = bool(result)
+                    except Exception as e:
+                        logging.error(f"评估{channel.name}触发器时出错: {str(e)}")
+                        satisfied = False
+                    now_ns = time.perf_counter_ns()
+                    elapsed_ms = (now_ns - start_ns) / 1e6
+                    channel.eval_ms = elapsed_ms if channel.eval_ms is None else channel.eval_ms * 0.8 + elapsed_ms * 0.2
+                    channel.evaluations += 1
+                    if wake_after is not None:
+                        # 一直睡到结果可能变化的时刻（稍微晚一点，确保已经越过边界）
+                        timeout = min(max(0.0, wake_after - elapsed_ms / 1000) + 0.001, self.MAX_SCHEDULED_WAIT)
+                    else:
+                        # 间隔从本次评估开始算起，评估耗时不拖慢检查频率
+                        timeout = max(0.0, channel.interval - elapsed_ms / 1000)
+                    channel.next_wait = timeout
+                else:
+                    satisfied = True
+                    now_ns = capture_ns = time.perf_counter_ns()
+                    timeout = None
+                channel.state = channel.state.update(satisfied, now_ns, capture_ns)
+                self._combine(now_ns, capture_ns)
+                try:
+                    await asyncio.wait_for(channel.changed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            channel.task = None
+
+    def _combine(self, now_ns, capture_ns=None):
+        previous = self.state
+        satisfied = all(channel.state.satisfied for channel in self.channels)
+        self.state = previous.update(satisfied, now_ns, capture_ns)
+        if satisfied == previous.satisfied:
+            return
+        with self.condition:
+            self.condition.notify_all()
+        for listener in self.listeners:
+            try:
+                listener(self.state)
+            except Exception as e:
+                logging.error(f"触发器状态监听者出错: {str(e)}")
+
+    def summary(self):
+        now_ns = time.perf_counter_ns()
+        parts = [f"触发器: {'满足' if self.state.satisfied else '不满足'} (翻转 {self.state.edges} 次)"]
+        parts += [channel.summary(now_ns) for channel in self.channels]
+        return " | ".join(parts)
+
+
+class LatencyRecorder:
+    """触发点击的端到端延迟统计
+
+    每次会话因触发条件满足而点击时记录四个时刻：采集（所依据画面的采集时刻）、
+    匹配（触发器评估完成、状态翻转）、决策（会话读取到满足状态）、注入（第一个事件发送完成），
+    按阶段给出分位数和直方图。
+    """
+    STAGES = (("采集→匹配", 0, 1), ("匹配→决策", 1, 2), ("决策→注入", 2, 3), ("总计", 0, 3))
+    HISTOGRAM_EDGES_MS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, float("inf"))
+
+    def __init__(self, max_samples=1000):
+        self.lock = threading.Lock()
+        self.samples = deque(maxlen=max_samples)  # (采集, 匹配, 决策, 注入) perf_counter_ns
+
+    def record(self, state, decision_ns, injected_ns):
+        """state 为决策时读取到的 TriggerState"""
+        with self.lock:
+            self.samples.append((state.capture_ns, state.changed_ns, decision_ns, injected_ns))
+
+    def clear(self):
+        with self.lock:
+            self.samples.clear()
+
+    def stage_ms(self):
+        """返回 {阶段名: 毫秒数组}"""
+        with self.lock:
+            samples = np.array(self.samples, dtype=np.int64).reshape(-1, 4)
+        return {name: (samples[:, end] - samples[:, start]) / 1e6 for name, start, end in self.STAGES}
+
+    @classmethod
+    def histogram(cls, values_ms):
+        counts, _ = np.histogram(np.clip(values_ms, 0, None), bins=cls.HISTOGRAM_EDGES_MS)
+        return counts
+
+    @classmethod
+    def histogram_labels(cls):
+        edges = cls.HISTOGRAM_EDGES_MS
+        return [f"<{edges[i + 1]:g}ms" if i == 0 else (f"≥{edges[i]:g}ms" if edges[i + 1] == float("inf")
+                                                        else f"{edges[i]:g}-{edges[i + 1]:g}ms")
+                for i in range(len(edges) - 1)]
+
+    def report(self):
+        """各阶段的样本数、分位数和直方图（可序列化为 JSON）"""
+        report = {}
+        for name, values in self.stage_ms().items():
+            if len(values) == 0:
+                continue
+            report[name] = {
+                "count": int(len(values)),
+                "p50_ms": float(np.percentile(values, 50)),
+                "p99_ms": float(np.percentile(values, 99)),
+                "max_ms": float(values.max()),
+                "histogram": dict(zip(self.histogram_labels(), (int(c) for c in self.histogram(values))))
+            }
+        return report
+
+
+class ClickScheduler:
+    """多会话中央调度器
+
+    所有会话由异步核心上的一个调度任务驱动：会话按下一次截止时间放在最小堆里，
+    任务只等待堆顶，粗等待可被添加/移除会话立即唤醒。到期前最后一小段的自旋和会话的执行
+    （注入、结果验证截图等阻塞调用）交给注入线程池，事件循环线程只负责计时，
+    一个会话的阻塞调用不会推迟其他会话、触发器通道和远程控制服务。
+    同一会话同时最多只有一次执行；堆只在事件循环线程中修改；没有会话时任务结束，不产生空闲唤醒。
+    """
+    MAX_WORKERS = 8
+
+    def __init__(self, core, spin_threshold=None, max_workers=MAX_WORKERS):
+        if spin_threshold is None:
+            spin_threshold = DeadlineTimer.DEFAULT_SPIN_THRESHOLD
+        self.core = core
+        self.spin_threshold_ns = int(spin_threshold * 1e9)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ClickInject")
+        self.lock = threading.Lock()  # 保护 sessions，界面线程会读取
+        self.heap = []
+        self.sessions = {}
+        self.sequence = itertools.count()
+        self.task = None
+        self.wakeup = None
+
+    def _push(self, session, deadline_ns):
+        # 旧的堆条目通过 heap_seq 失效（惰性删除）
+        session.heap_seq = next(self.sequence)
+        heapq.heappush(self.heap, (deadline_ns, session.heap_seq, session))
+
+    def _schedule(self, session, deadline_ns=None):
+        # 只在事件循环线程中调用
+        if session.in_flight:
+            # 会话正在注入线程中执行，不能在这里改动它的计时器，执行完成后再按这次请求调度
+            if session.reschedule is False or session.reschedule is None or deadline_ns is None:
+                session.reschedule = deadline_ns
+            else:
+                session.reschedule = min(session.reschedule, deadline_ns)
+            return
+        if deadline_ns is None:
+            session.timer.reset()
+            deadline_ns = session.deadline_ns
+        self._push(session, deadline_ns)
+        if self.task is None:
+            self.wakeup = asyncio.Event()
+            self.task = self.core.loop.create_task(self.run())
+        else:
+            self.wakeup.set()
+
+    def add_session(self, session):
+        """添加会话并立即开始调度（其他会话不受影响，任意线程）"""
+        with self.lock:
+            if session.name in self.sessions:
+                raise ValueError(f"会话名称重复: {session.name}")
+            self.sessions[session.name] = session
+        self.core.call_soon(self._schedule, session)
+
+    def remove_session(self, name):
+        """停止并移除会话，会话的 finish 在注入线程中执行（任意线程）"""
+        with self.lock:
+            session = self.sessions.pop(name, None)
+        if session is not None:
+            session.stop_event.set()
+            self.core.call_soon(self._schedule, session, time.perf_counter_ns())
+        return session
+
+    def stop_all(self):
+        for name in list(self.sessions):
+            self.remove_session(name)
+
+    def wake_waiting(self, state):
+        """触发条件变为满足时立即调度等待中的会话（触发器引擎的监听者，事件循环线程）"""
+        if not state.satisfied:
+            return
+        for session in self.get_sessions():
+            if session.waiting_trigger:
+                self._schedule(session)
+
+    def get_sessions(self):
+        with self.lock:
+            return list(self.sessions.values())
+
+    async def run(self):
+        try:
+            while self.heap:
+                deadline_ns, seq, session = self.heap[0]
+                if seq != session.heap_seq:
+                    heapq.heappop(self.heap)
+                    continue
+                remaining_ns = deadline_ns - time.perf_counter_ns()
+                if remaining_ns > self.spin_threshold_ns:
+                    # 堆只会在本线程中被修改，清除后再等待不会丢失唤醒
+                    self.wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self.wakeup.wait(), (remaining_ns - self.spin_threshold_ns) / 1e9)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                heapq.heappop(self.heap)
+                session.in_flight = True
+                future = self.core.loop.run_in_executor(self.executor, self._fire, session, deadline_ns)
+                future.add_done_callback(functools.partial(self._fired, session))
+        finally:
+            self.task = None
+
+    def _fire(self, session, deadline_ns):
+        # 注入线程：自旋到截止时间后执行会话；下一个截止时间仍在自旋范围内时直接继续，
+        # 省去回到事件循环的往返，执行期间收到重新调度请求时交还调度器
+        try:
+            while True:
+                spin_until(deadline_ns)
+                if not session.fire(time.perf_counter_ns()):
+                    return False
+                deadline_ns = session.deadline_ns
+                if session.reschedule is not False or deadline_ns - time.perf_counter_ns() > self.spin_threshold_ns:
+                    return True
+        except Exception as e:
+            logging.error(f"会话 {session.name} 执行出错: {str(e)}")
+            return session.finish(f"出错: {str(e)}")
+
+    def _fired(self, session, future):
+        # 事件循环线程：会话执行完成，按新的截止时间（或执行期间收到的请求）放回堆中
+        session.in_flight = False
+        if future.cancelled():
+            return
+        if not future.result():
+            with self.lock:
+                if self.sessions.get(session.name) is session:
+                    del self.sessions[session.name]
+            return
+        reschedule, session.reschedule = session.reschedule, False
+        self._schedule(session, session.deadline_ns if reschedule is False else reschedule)
+
+
+# 触发器引擎中每个通道负责的触发器开关
+TRIGGER_GROUPS = {
+    "timer": ("timer_enabled",),
+    "pixel": ("color_enabled", "area_enabled", "signature_enabled"),
+    "image": ("image_enabled", "template_set_enabled"),
+}
+
+
+class TriggerConfig(FrozenRecord):
+    """触发器设置快照
+
+    开始模拟时以及用户每次修改触发器设置时，在界面线程中从控件读取一次，
+    整体替换 MouseClickSimulator.trigger_config（属性赋值是原子的）。
+    点击线程只读取快照中的普通 Python 字段，不再跨线程访问 Qt 控件。
+    """
+    __slots__ = (
+        "color_enabled", "color_x", "color_y", "target_rgb", "color_tolerance",
+        "area_enabled", "area_region", "area_rgb", "area_tolerance", "area_mode", "area_percent",
+        "signature_enabled", "signature", "expression_enabled", "expression",
+        "image_enabled", "image_path", "confidence", "image_region", "image_locality", "image_grayscale",
+        "image_matcher", "template_set_enabled", "template_paths", "template_set_mode",
+        "timer_enabled", "start_seconds", "end_seconds", "schedule"
+    )
+
+    @property
+    def any_enabled(self):
+        return (self.expression_enabled or self.color_enabled or self.area_enabled or self.signature_enabled or self.image_enabled
+                or self.template_set_enabled or self.timer_enabled)
+
+    def group_enabled(self, group):
+        # 使用触发表达式时由表达式通道统一评估，各类触发器的开关不再生效
+        if group == "expression":
+            return self.expression_enabled
+        if self.expression_enabled:
+            return False
+        return any(getattr(self, field) for field in TRIGGER_GROUPS[group])
+
+    def only(self, group):
+        """返回只启用某一类触发器的副本"""
+        return self.replace(expression_enabled=False,
+                            **{field: False for other, fields in TRIGGER_GROUPS.items() if other != group
+                               for field in fields})
+
+    def only_trigger(self, field):
+        """返回只启用一个触发器（field 为其开关字段名）的副本，供触发表达式评估单个触发器"""
+        return self.replace(expression_enabled=False,
+                            **{name: name == field for fields in TRIGGER_GROUPS.values() for name in fields})
+
+    @property
+    def needs_frame(self):
+        """是否需要整帧画面（图像触发器、多模板触发集）"""
+        return self.image_enabled or self.template_set_enabled
+
+
+def parse_region(text):
+    """把 "x,y,宽,高" 解析成整数元组，格式不正确或宽高不为正时返回 None"""
+    try:
+        x, y, width, height = (int(part) for part in text.split(","))
+    except ValueError:
+        return None
+    if width <= 0 or height <= 0:
+        return None
+    return x, y, width, height
+
+
+def clip_rect(rect, bounds):
+    """把矩形 (x, y, 宽, 高) 裁剪到 bounds 范围内"""
+    x, y, width, height = rect
+    left, top, bound_width, bound_height = bounds
+    x0, y0 = max(left, x), max(top, y)
+    x1, y1 = min(left + bound_width, x + width), min(top + bound_height, y + height)
+    return x0, y0, max(0, x1 - x0), max(0, y1 - y0)
+
+
+AREA_COLOR_MODES = {"任意像素符合": "any", "全部像素符合": "all", "符合比例达到": "ratio"}
+
+
+def count_color_matches(pixels, target_rgb, tolerance):
+    """统计 BGR 像素区域中与目标颜色差异不超过容差的像素数
+
+    差异与单像素颜色触发器相同（三个通道差值之和），整个区域一次向量化计算：
+    cv2.absdiff 求各通道差值，再按通道累加到 uint16 中比较（不会饱和）。
+    """
+    if pixels.size == 0:
+        return 0
+    red, green, blue = target_rgb
+    diff = cv2.absdiff(pixels, (blue, green, red, 0))
+    distance = diff[:, :, 0].astype(np.uint16)
+    distance += diff[:, :, 1]
+    distance += diff[:, :, 2]
+    return int(np.count_nonzero(distance <= tolerance))
+
+
+def area_color_satisfied(pixels, config):
+    """按区域颜色触发器的条件（任意/全部/达到比例）判断 BGR 像素区域是否满足"""
+    total = pixels.shape[0] * pixels.shape[1]
+    if total == 0:
+        return False
+    matched = count_color_matches(pixels, config.area_rgb, config.area_tolerance)
+    if config.area_mode == "any":
+        return matched > 0
+    if config.area_mode == "all":
+        return matched == total
+    return matched * 100.0 >= config.area_percent * total
+
+
+class PixelSignature(FrozenRecord):
+    """多点像素签名：一组 (x, y, 颜色, 容差) 必须同时满足
+
+    编译时把坐标换算成相对外接矩形的下标数组、颜色整理成 BGR 数组，检查时只读取一次
+    外接矩形（或直接使用采集帧），用 NumPy 花式索引一次取出所有点，几百个点也在亚毫秒级。
+    """
+    __slots__ = ("points", "bbox", "rows", "cols", "colors", "tolerances")
+    DEFAULT_TOLERANCE = 10
+
+    @classmethod
+    def compile(cls, points):
+        """points 为 (x, y, (r, g, b), 容差) 序列，为空时返回 None"""
+        points = tuple((int(x), int(y), tuple(int(c) for c in rgb), int(tolerance))
+                       for x, y, rgb, tolerance in points)
+        if not points:
+            return None
+        xs = np.array([point[0] for point in points], dtype=np.intp)
+        ys = np.array([point[1] for point in points], dtype=np.intp)
+        left, top = int(xs.min()), int(ys.min())
+        bbox = (left, top, int(xs.max()) - left + 1, int(ys.max()) - top + 1)
+        return cls(
+            points=points, bbox=bbox, rows=ys - top, cols=xs - left,
+            colors=np.array([point[2][::-1] for point in points], dtype=np.int16),
+            tolerances=np.array([point[3] for point in points], dtype=np.int16)
+        )
+
+    @classmethod
+    def parse(cls, text):
+        """解析每行 "x,y,#RRGGBB[,容差]" 的文本，空行和 # 开头的注释行忽略，格式错误时抛出 ValueError"""
+        points = []
+        for number, line in enumerate(text.splitlines(), 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = [part.strip() for part in line.split(",")]
+            if len(parts) not in (3, 4):
+                raise ValueError(f"第 {number} 行格式应为 x,y,#RRGGBB[,容差]: {line}")
+            color = QColor(parts[2])
+            if not color.isValid():
+                raise ValueError(f"第 {number} 行颜色无效: {parts[2]}")
+            tolerance = int(parts[3]) if len(parts) == 4 else cls.DEFAULT_TOLERANCE
+            points.append((int(parts[0]), int(parts[1]), (color.red(), color.green(), color.blue()), tolerance))
+        return cls.compile(points)
+
+    def distances(self, pixels):
+        """pixels 为外接矩形范围内的 BGR 数组，返回每个点与目标颜色的差异（三通道差值之和）"""
+        return np.abs(pixels[self.rows, self.cols].astype(np.int16) - self.colors).sum(axis=1)
+
+    def matches(self, pixels):
+        if pixels.shape[0] < self.bbox[3] or pixels.shape[1] < self.bbox[2]:
+            return False  # 外接矩形超出屏幕范围
+        return bool((self.distances(pixels) <= self.tolerances).all())
+
+    def to_text(self):
+        return "\n".join(f"{x},{y},#{r:02X}{g:02X}{b:02X},{tolerance}"
+                         for x, y, (r, g, b), tolerance in self.points)
+
+
+# 触发表达式中的触发器名称（英文或中文）到触发器开关字段的映射
+TRIGGER_ATOMS = {
+    "timer": "timer_enabled", "定时": "timer_enabled",
+    "color": "color_enabled", "颜色": "color_enabled",
+    "area": "area_enabled", "区域": "area_enabled",
+    "signature": "signature_enabled", "签名": "signature_enabled",
+    "image": "image_enabled", "图像": "image_enabled",
+    "templates": "template_set_enabled", "模板集": "template_set_enabled",
+}
+# 尚未测量时各触发器的预估耗时（毫秒），只用于最初的排序
+TRIGGER_ATOM_COSTS = {
+    "timer_enabled": 0.001, "color_enabled": 0.01, "signature_enabled": 0.05,
+    "area_enabled": 0.1, "image_enabled": 10.0, "template_set_enabled": 20.0,
+}
+# 与画面无关的触发器，结果不按帧缓存
+FRAME_FREE_ATOMS = {"timer_enabled"}
+
+
+class ExpressionNode:
+    """触发表达式求值图中的节点
+
+    stateful 的节点（去抖、保持、边沿）依赖连续的采样，不能被短路跳过：AND/OR 先按耗时
+    评估无状态的子节点并在结果确定后跳过其余无状态子节点，有状态的子节点总是评估。
+    """
+    stateful = False
+
+    def cost(self):
+        return 0.0
+
+    def subnodes(self):
+        return (self.child,)
+
+    def evaluate(self, context):
+        raise NotImplementedError
+
+
+class AtomNode(ExpressionNode):
+    def __init__(self, name):
+        self.name = name
+        self.field = TRIGGER_ATOMS[name]
+        self.expression_costs = {}
+
+    def subnodes(self):
+        return ()
+
+    def cost(self):
+        return self.expression_costs.get(self.field, TRIGGER_ATOM_COSTS[self.field])
+
+    def evaluate(self, context):
+        return context.atom(self.field)
+
+    def describe(self):
+        return self.name
+
+
+class NotNode(ExpressionNode):
+    def __init__(self, child):
+        self.child = child
+        self.stateful = child.stateful
+
+    def cost(self):
+        return self.child.cost()
+
+    def evaluate(self, context):
+        return not self.child.evaluate(context)
+
+    def describe(self):
+        return f"NOT {self.child.describe()}"
+
+
+class LogicNode(ExpressionNode):
+    """AND / OR：每次按子节点的实测耗时从低到高评估，结果确定后短路"""
+
+    def __init__(self, operator, children):
+        self.operator = operator
+        self.children = children
+        self.stateful = any(child.stateful for child in children)
+
+    def subnodes(self):
+        return self.children
+
+    def cost(self):
+        return sum(child.cost() for child in self.children)
+
+    def ordered(self):
+        return sorted(self.children, key=lambda child: (child.stateful, child.cost()))
+
+    def evaluate(self, context):
+        decided = None  # AND 遇到 False、OR 遇到 True 后结果即确定
+        for child in self.ordered():
+            if decided is not None and not child.stateful:
+                context.short_circuits += 1
+                continue
+            value = child.evaluate(context)
+            if decided is None and value == (self.operator == "OR"):
+                decided = value
+        return decided if decided is not None else self.operator == "AND"
+
+    def describe(self):
+        return "(" + f" {self.operator} ".join(child.describe() for child in self.ordered()) + ")"
+
+
+class HoldNode(ExpressionNode):
+    """hold(x, ms)：x 连续满足至少 ms 毫秒后才满足"""
+    stateful = True
+
+    def __init__(self, child, ms):
+        self.child = child
+        self.hold_ns = int(ms * 1e6)
+        self.since_ns = None
+
+    def cost(self):
+        return self.child.cost()
+
+    def evaluate(self, context):
+        if not self.child.evaluate(context):
+            self.since_ns = None
+            return False
+        if self.since_ns is None:
+            self.since_ns = context.now_ns
+        return context.now_ns - self.since_ns >= self.hold_ns
+
+    def describe(self):
+        return f"hold({self.child.describe()}, {self.hold_ns / 1e6:g})"
+
+
+class DebounceNode(ExpressionNode):
+    """debounce(x, ms)：x 的新值保持 ms 毫秒不变后输出才跟着改变"""
+    stateful = True
+
+    def __init__(self, child, ms):
+        self.child = child
+        self.debounce_ns = int(ms * 1e6)
+        self.output = False
+        self.candidate_ns = None
+
+    def cost(self):
+        return self.child.cost()
+
+    def evaluate(self, context):
+        value = self.child.evaluate(context)
+        if value == self.output:
+            self.candidate_ns = None
+        elif self.candidate_ns is None:
+            self.candidate_ns = context.now_ns
+        if self.candidate_ns is not None and context.now_ns - self.candidate_ns >= self.debounce_ns:
+            self.output = value
+            self.candidate_ns = None
+        return self.output
+
+    def describe(self):
+        return f"debounce({self.child.describe()}, {self.debounce_ns / 1e6:g})"
+
+
+class EdgeNode(ExpressionNode):
+    """rising(x) / falling(x)：只在 x 由假变真（或由真变假）的那一次评估中满足"""
+    stateful = True
+
+    def __init__(self, child, rising):
+        self.child = child
+        self.rising = rising
+        self.previous = None
+
+    def cost(self):
+        return self.child.cost()
+
+    def evaluate(self, context):
+        value = self.child.evaluate(context)
+        previous, self.previous = self.previous, value
+        if previous is None:
+            return False
+        return (not previous and value) if self.rising else (previous and not value)
+
+    def describe(self):
+        return f"{'rising' if self.rising else 'falling'}({self.child.describe()})"
+
+
+class ExpressionContext:
+    """一次表达式评估：同一次评估以及同一帧内，每个触发器只计算一次"""
+
+    def __init__(self, expression, check_atom, frame_key, now_ns):
+        self.expression = expression
+        self.check_atom = check_atom
+        self.frame_key = frame_key
+        self.now_ns = now_ns
+        self.memo = {}
+        self.short_circuits = 0
+
+    def atom(self, field):
+        expression = self.expression
+        frame_memo = expression.frame_memo if self.frame_key is not None and field not in FRAME_FREE_ATOMS else None
+        if field in self.memo:
+            expression.memo_hits += 1
+            return self.memo[field]
+        if frame_memo is not None and field in frame_memo:
+            expression.memo_hits += 1
+            return frame_memo[field]
+        start_ns = time.perf_counter_ns()
+        value = bool(self.check_atom(field))
+        elapsed_ms = (time.perf_counter_ns() - start_ns) / 1e6
+        previous = expression.costs.get(field)
+        expression.costs[field] = elapsed_ms if previous is None else previous * 0.8 + elapsed_ms * 0.2
+        expression.atom_evaluations += 1
+        self.memo[field] = value
+        if frame_memo is not None:
+            frame_memo[field] = value
+        return value
+
+
+class TriggerExpression:
+    """触发表达式：把 AND/OR/NOT、debounce、hold、rising/falling 组合编译成求值图
+
+    语法示例: timer and (color or not image) and hold(signature, 200)
+    运算符: and/&&/与、or/||/或、not/!/非，函数: debounce/去抖(x, 毫秒)、hold/保持(x, 毫秒)、
+    rising/上升沿(x)、falling/下降沿(x)；触发器名称见 TRIGGER_ATOMS。
+    与画面有关的触发器结果按帧序号缓存：采集服务还没有产生新帧时直接复用上一次的结果。
+    中文名称之间不需要空格（如 "定时与非颜色"），按最长匹配逐个切分。
+    """
+    OPERATORS = {"and": "&&", "与": "&&", "&": "&&", "or": "||", "或": "||", "|": "||", "not": "!", "非": "!"}
+    FUNCTIONS = {
+        "hold": "hold", "保持": "hold", "debounce": "debounce", "去抖": "debounce",
+        "rising": "rising", "上升沿": "rising", "falling": "falling", "下降沿": "falling",
+    }
+    # 中文没有词间分隔，已知的中文名称按长度从长到短排在标识符规则之前；其余连续汉字作为未知名称报错
+    CJK_WORDS = sorted((word for word in itertools.chain(OPERATORS, FUNCTIONS, TRIGGER_ATOMS) if not word.isascii()),
+                       key=len, reverse=True)
+    TOKEN = re.compile(r"\s*(?:(\d+(?:\.\d+)?)|(" + "|".join(map(re.escape, CJK_WORDS))
+                       + r"|[A-Za-z_][A-Za-z0-9_]*|[\u4e00-\u9fff]+)|(&&|\|\||[()!,&|]))")
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = self.tokenize(text)
+        self.position = 0
+        self.costs = {}
+        self.frame_memo = {}
+        self.frame_key = None
+        self.memo_hits = 0
+        self.atom_evaluations = 0
+        self.short_circuits = 0
+        self.evaluations = 0
+        self.root = self.parse_or()
+        if self.position != len(self.tokens):
+            raise ValueError(f"表达式在 \"{self.tokens[self.position][1]}\" 处有多余内容")
+        self.fields = set()
+        self.bind(self.root)
+        del self.tokens
+
+    @classmethod
+    def tokenize(cls, text):
+        tokens = []
+        position = 0
+        text = text.strip()
+        while position < len(text):
+            match = cls.TOKEN.match(text, position)
+            if match is None or match.end() == position:
+                raise ValueError(f"无法识别的字符: {text[position:position + 10]}")
+            number, word, symbol = match.groups()
+            if number is not None:
+                tokens.append(("number", float(number)))
+            elif word is not None:
+                lowered = word.lower()
+                if lowered in cls.OPERATORS:
+                    tokens.append(("op", cls.OPERATORS[lowered]))
+                elif lowered in cls.FUNCTIONS:
+                    tokens.append(("func", cls.FUNCTIONS[lowered]))
+                elif lowered in TRIGGER_ATOMS:
+                    tokens.append(("atom", lowered))
+                else:
+                    raise ValueError(f"未知的触发器或函数: {word}")
+            else:
+                tokens.append(("op", cls.OPERATORS.get(symbol, symbol)))
+            position = match.end()
+        if not tokens:
+            raise ValueError("表达式为空")
+        return tokens
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def expect(self, value):
+        if self.peek() != ("op", value):
+            raise ValueError(f"缺少 \"{value}\"")
+        self.position += 1
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.peek() == ("op", "||"):
+            self.position += 1
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else LogicNode("OR", children)
+
+    def parse_and(self):
+        children = [self.parse_not()]
+        while self.peek() == ("op", "&&"):
+            self.position += 1
+            children.append(self.parse_not())
+        return children[0] if len(children) == 1 else LogicNode("AND", children)
+
+    def parse_not(self):
+        if self.peek() == ("op", "!"):
+            self.position += 1
+            return NotNode(self.parse_not())
+        return self.parse_primary()
+
+    def parse_primary(self):
+        kind, value = self.peek()
+        if kind is None:
+            raise ValueError("表达式不完整")
+        self.position += 1
+        if kind == "atom":
+            return AtomNode(value)
+        if kind == "op" and value == "(":
+            node = self.parse_or()
+            self.expect(")")
+            return node
+        if kind == "func":
+            self.expect("(")
+            child = self.parse_or()
+            if value in ("rising", "falling"):
+                self.expect(")")
+                return EdgeNode(child, value == "rising")
+            self.expect(",")
+            kind, ms = self.peek()
+            if kind != "number":
+                raise ValueError(f"{value} 的第二个参数应为毫秒数")
+            self.position += 1
+            self.expect(")")
+            return HoldNode(child, ms) if value == "hold" else DebounceNode(child, ms)
+        raise ValueError(f"意外的 \"{value}\"")
+
+    def bind(self, node):
+        """让原子节点读取本表达式实测的耗时，并收集用到的触发器"""
+        if isinstance(node, AtomNode):
+            node.expression_costs = self.costs
+            self.fields.add(node.field)
+        for child in node.subnodes():
+            self.bind(child)
+
+    def evaluate(self, check_atom, frame_key=None, now_ns=None):
+        """check_atom(field) 评估单个触发器；frame_key 为当前最新帧的序号（没有采集服务时为 None）"""
+        if frame_key is None or frame_key != self.frame_key:
+            self.frame_memo.clear()
+        self.frame_key = frame_key
+        if now_ns is None:
+            now_ns = time.perf_counter_ns()
+        context = ExpressionContext(self, check_atom, frame_key, now_ns)
+        result = self.root.evaluate(context)
+        self.evaluations += 1
+        self.short_circuits += context.short_circuits
+        return result
+
+    def describe(self):
+        """按当前的评估顺序输出规范化的表达式"""
+        return self.root.describe()
+
+    def summary(self):
+        costs = ", ".join(f"{field.replace('_enabled', '')} {ms:.2f}ms" for field, ms in sorted(self.costs.items()))
+        return (f"评估 {self.evaluations} 次, 计算触发器 {self.atom_evaluations} 次, "
+                f"缓存命中 {self.memo_hits} 次, 短路跳过 {self.short_circuits} 次; 耗时: {costs or '-'}")
+
+
+def seconds_of_day(hour, minute, second):
+    """把时分秒转换为当天的秒数"""
+    return hour * 3600 + minute * 60 + second
+
+
+WEEKDAY_NAMES = {
+    "mon": 0, "tue": 1, "wed": 2, "thu": 3, "fri": 4, "sat": 5, "sun": 6,
+    "周一": 0, "周二": 1, "周三": 2, "周四": 3, "周五": 4, "周六": 5, "周日": 6, "周天": 6,
+    "星期一": 0, "星期二": 1, "星期三": 2, "星期四": 3, "星期五": 4, "星期六": 5, "星期日": 6, "星期天": 6,
+}
+
+
+def parse_clock(text):
+    """把 HH:MM[:SS] 解析为当天的秒数（允许 24:00 表示一天结束）"""
+    parts = text.split(":")
+    if len(parts) not in (2, 3) or not all(part.isdigit() for part in parts):
+        raise ValueError(f"时间格式应为 HH:MM[:SS]: {text}")
+    hour, minute, second = (int(part) for part in parts + ["0"] * (3 - len(parts)))
+    if minute > 59 or second > 59 or seconds_of_day(hour, minute, second) > 86400:
+        raise ValueError(f"时间超出范围: {text}")
+    return seconds_of_day(hour, minute, second)
+
+
+def parse_duration(text):
+    """把 30s / 5m / 2h / 90 之类的时长解析为秒"""
+    units = {"s": 1, "m": 60, "h": 3600}
+    number, unit = (text[:-1], text[-1]) if text[-1:] in units else (text, "s")
+    try:
+        seconds = float(number) * units[unit]
+    except ValueError:
+        raise ValueError(f"无效的时长: {text}")
+    if seconds <= 0:
+        raise ValueError(f"时长必须大于 0: {text}")
+    return seconds
+
+
+class DailyWindowRule:
+    """每天（或指定星期几）的一个时间窗口，结束时间不大于开始时间时跨过午夜"""
+
+    def __init__(self, start_seconds, end_seconds, weekdays=None):
+        self.start_seconds = start_seconds
+        self.end_seconds = end_seconds
+        self.weekdays = weekdays  # None 表示每天；星期几按窗口开始的那一天判断
+
+    def windows(self, day):
+        """day 为当天 0 点的 datetime，返回在这一天开始的窗口"""
+        if self.weekdays is not None and day.weekday() not in self.weekdays:
+            return ()
+        end_seconds = self.end_seconds if self.end_seconds > self.start_seconds else self.end_seconds + 86400
+        return ((day + timedelta(seconds=self.start_seconds), day + timedelta(seconds=end_seconds)),)
+
+
+class CronRule:
+    """cron 表达式（分 时 日 月 星期）的每个触发时刻开始、持续 duration 秒的窗口"""
+    FIELDS = (("分", 0, 59), ("时", 0, 23), ("日", 1, 31), ("月", 1, 12), ("星期", 0, 7))
+
+    def __init__(self, expression, duration):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"cron 表达式应有 5 个字段（分 时 日 月 星期）: {expression}")
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            self.parse_field(part, name, low, high) for part, (name, low, high) in zip(parts, self.FIELDS))
+        # cron 中 0 和 7 都表示星期日；换算成 datetime.weekday() 的编号（周一为 0）
+        self.weekdays = {(day - 1) % 7 for day in weekdays}
+        # 与标准 cron 一致：日和星期都有限制时满足其一即可
+        self.day_restricted = parts[2] != "*"
+        self.weekday_restricted = parts[4] != "*"
+        self.duration = duration
+
+    @staticmethod
+    def parse_field(text, name, low, high):
+        values = set()
+        for item in text.split(","):
+            range_text, _, step_text = item.partition("/")
+            step = int(step_text) if step_text.isdigit() else 1
+            if step_text and not step_text.isdigit():
+                raise ValueError(f"cron {name}字段的步长无效: {item}")
+            if range_text == "*":
+                first, last = low, high
+            elif "-" in range_text:
+                first, last = (int(part) for part in range_text.split("-", 1))
+            elif range_text.isdigit():
+                first = last = int(range_text)
+                if step_text:
+                    last = high
+            else:
+                raise ValueError(f"cron {name}字段无效: {item}")
+            if first < low or last > high or first > last or step <= 0:
+                raise ValueError(f"cron {name}字段超出范围 {low}-{high}: {item}")
+            values.update(range(first, last + 1, step))
+        return sorted(values)
+
+    def day_matches(self, day):
+        if day.month not in self.months:
+            return False
+        day_ok = day.day in self.days
+        weekday_ok = day.weekday() in self.weekdays
+        if self.day_restricted and self.weekday_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def windows(self, day):
+        if not self.day_matches(day):
+            return ()
+        duration = timedelta(seconds=self.duration)
+        return tuple((start, start + duration)
+                     for start in (day + timedelta(hours=hour, minutes=minute)
+                                   for hour in self.hours for minute in self.minutes))
+
+
+class TriggerSchedule:
+    """定时触发器的计划：多个每日/按星期的时间窗口和 cron 规则
+
+    把今后 HORIZON_DAYS 天内的所有窗口合并成有序、互不重叠的区间表（时间戳），
+    判断是否在窗口内和求下一次变化时刻都是二分查找；进入新的一天时重新计算，
+    所以区间表总是至少覆盖今后 HORIZON_DAYS - 2 天。
+    定时触发器通道据此一直睡到下一次变化，而不是周期性地检查时钟。
+
+    规则每行一条，例如:
+        09:00-18:00                  每天
+        周一-周五 09:00-12:00         指定星期（也可写 mon-fri、周六,周日）
+        22:00-02:00                  跨过午夜
+        cron */15 9-17 * * 1-5 5m    cron 表达式，每个触发时刻开始持续 5 分钟（默认 1 分钟）
+    """
+    HORIZON_DAYS = 8
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.table = None  # (区间开始列表, 区间结束列表, 计算时当天 0 点, 结果可信的截止时间戳)
+
+    @classmethod
+    def daily(cls, start_seconds, end_seconds):
+        """由界面上的开始/结束时间生成，与原来的比较一致：包含结束时间那一秒，结束早于开始时从不满足"""
+        if end_seconds < start_seconds:
+            return cls([])
+        return cls([DailyWindowRule(start_seconds, (end_seconds + 1) % 86400)])
+
+    @classmethod
+    def parse(cls, text):
+        rules = []
+        for number, line in enumerate(text.splitlines(), 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                rules.append(cls.parse_rule(line))
+            except ValueError as e:
+                raise ValueError(f"第 {number} 行: {str(e)}")
+        if not rules:
+            raise ValueError("没有任何计划规则")
+        return cls(rules)
+
+    @staticmethod
+    def parse_rule(line):
+        parts = line.split()
+        if parts[0].lower() == "cron":
+            if len(parts) not in (6, 7):
+                raise ValueError("格式应为 cron 分 时 日 月 星期 [持续时长]")
+            return CronRule(" ".join(parts[1:6]), parse_duration(parts[6]) if len(parts) == 7 else 60)
+        weekdays = None
+        if len(parts) == 2:
+            weekdays = set()
+            for item in parts[0].lower().split(","):
+                first, _, last = item.partition("-")
+                if first not in WEEKDAY_NAMES or (last and last not in WEEKDAY_NAMES):
+                    raise ValueError(f"无法识别的星期: {item}")
+                first_day = WEEKDAY_NAMES[first]
+                last_day = WEEKDAY_NAMES[last] if last else first_day
+                weekdays.update((first_day + offset) % 7 for offset in range((last_day - first_day) % 7 + 1))
+        elif len(parts) != 1:
+            raise ValueError("格式应为 [星期] HH:MM-HH:MM")
+        start_text, separator, end_text = parts[-1].partition("-")
+        if not separator:
+            raise ValueError("时间窗口格式应为 HH:MM-HH:MM")
+        start_seconds, end_seconds = parse_clock(start_text), parse_clock(end_text)
+        if start_seconds == end_seconds:
+            raise ValueError("开始和结束时间相同")
+        return DailyWindowRule(start_seconds, end_seconds % 86400 if end_seconds == 86400 else end_seconds,
+                               weekdays)
+
+    def build(self, now):
+        """计算从 now 前一天到今后 HORIZON_DAYS 天的区间表（前一天用于跨午夜的窗口）"""
+        today = datetime.fromtimestamp(now).replace(hour=0, minute=0, second=0, microsecond=0)
+        windows = sorted(
+            (start.timestamp(), end.timestamp())
+            for offset in range(-1, self.HORIZON_DAYS)
+            for rule in self.rules
+            for start, end in rule.windows(today + timedelta(days=offset))
+        )
+        starts, ends = [], []
+        for start, end in windows:
+            if ends and start <= ends[-1]:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+        # 最后一天开始的窗口可能与之后的窗口相连，只信任到倒数第二天结束
+        cutoff = (today + timedelta(days=self.HORIZON_DAYS - 1)).timestamp()
+        self.table = (starts, ends, today.timestamp(), cutoff)
+        return self.table
+
+    def lookup(self, now):
+        table = self.table
+        if table is None or not table[2] <= now < table[2] + 86400:
+            table = self.build(now)
+        return table
+
+    def is_active(self, now=None):
+        now = time.time() if now is None else now
+        starts, ends, _, _ = self.lookup(now)
+        index = bisect.bisect_right(starts, now) - 1
+        return index >= 0 and now < ends[index]
+
+    def next_transition(self, now=None):
+        """返回 (下一次变化的时间戳, 变化后是否在窗口内)；在计算范围内没有变化时返回 (重新计算的时刻, None)"""
+        now = time.time() if now is None else now
+        starts, ends, _, cutoff = self.lookup(now)
+        index = bisect.bisect_right(starts, now) - 1
+        if index >= 0 and now < ends[index] < cutoff:
+            return ends[index], False
+        if index + 1 < len(starts) and starts[index + 1] < cutoff:
+            return starts[index + 1], True
+        return cutoff, None
+
+    def seconds_until_change(self, now=None):
+        now = time.time() if now is None else now
+        return max(0.0, self.next_transition(now)[0] - now)
+
+    def describe(self, now=None):
+        now = time.time() if now is None else now
+        moment, becomes_active = self.next_transition(now)
+        state = "在时间窗口内" if self.is_active(now) else "不在时间窗口内"
+        if becomes_active is None:
+            return f"当前{state}，今后 {self.HORIZON_DAYS - 2} 天内不会变化"
+        action = "开始" if becomes_active else "结束"
+        return f"当前{state}，下次{action}: {datetime.fromtimestamp(moment).strftime('%Y-%m-%d %H:%M:%S')}"
+
+
+class PixelProbe:
+    """直接从显示服务读取单个像素或小区域，不截取整屏
+
+    Windows 使用 GDI GetPixel，Linux/X11 使用 XGetImage 只取所需的矩形，其他平台
+    退回到带 bbox 的 ImageGrab.grab。X11 连接不是线程安全的，读取时加锁。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.display = None
+        self.hdc = None
+        if sys.platform == "win32":
+            self.user32 = ctypes.windll.user32
+            self.gdi32 = ctypes.windll.gdi32
+            self.hdc = self.user32.GetDC(0)
+            self.method = "gdi"
+        elif xdisplay is not None and os.environ.get("DISPLAY"):
+            try:
+                self.display = xdisplay.Display()
+                self.root = self.display.screen().root
+                self.method = "xgetimage"
+            except Exception as e:
+                logging.warning(f"无法连接 X11 显示服务，像素探测退回到 ImageGrab: {str(e)}")
+                self.display = None
+                self.method = "imagegrab"
+        else:
+            self.method = "imagegrab"
+
+    def pixel(self, x, y):
+        """读取 (x, y) 处的颜色，返回 (r, g, b)"""
+        if self.hdc is not None:
+            color = self.gdi32.GetPixel(self.hdc, int(x), int(y))
+            return color & 0xFF, (color >> 8) & 0xFF, (color >> 16) & 0xFF
+        if self.display is None:
+            return ImageGrab.grab(bbox=(x, y, x + 1, y + 1)).getpixel((0, 0))[:3]
+        b, g, r = self.region(x, y, 1, 1)[0, 0, ::-1]
+        return int(r), int(g), int(b)
+
+    def region(self, x, y, width, height):
+        """读取一个小矩形区域，返回 (height, width, 3) 的 RGB 数组"""
+        if self.display is not None:
+            with self.lock:
+                image = self.root.get_image(int(x), int(y), int(width), int(height), X.ZPixmap, 0xffffffff)
+            # 24/32 位深度下每个像素 4 字节，字节序为 BGRX
+            pixels = np.frombuffer(image.data, dtype=np.uint8).reshape(height, width, 4)
+            return pixels[:, :, 2::-1]
+        return np.asarray(ImageGrab.grab(bbox=(x, y, x + width, y + height)).convert("RGB"))
+
+    def close(self):
+        if self.hdc is not None:
+            self.user32.ReleaseDC(0, self.hdc)
+            self.hdc = None
+        if self.display is not None:
+            self.display.close()
+            self.display = None
+
+
+class PILScreenGrabber:
+    """通过 ImageGrab 截取整屏，转换为 BGR 写入给定缓冲区"""
+    name = "pil"
+
+    def __init__(self, display_name=None):
+        self.display_name = display_name
+
+    def grab_into(self, out):
+        """截屏写入 out；尺寸不符（首次或分辨率变化）时返回新分配的数组"""
+        if self.display_name:
+            screen = ImageGrab.grab(xdisplay=self.display_name)
+        else:
+            screen = ImageGrab.grab()
+        rgb = np.asarray(screen.convert("RGB"))
+        if out is None or out.shape != rgb.shape:
+            return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+        cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR, dst=out)
+        return out
+
+    def close(self):
+        pass
+
+
+class _XImage(ctypes.Structure):
+    # 只声明用到的前几个字段（Xlib.h 中 XImage 的开头部分）
+    _fields_ = [
+        ("width", ctypes.c_int), ("height", ctypes.c_int), ("xoffset", ctypes.c_int),
+        ("format", ctypes.c_int), ("data", ctypes.c_void_p),
+        ("byte_order", ctypes.c_int), ("bitmap_unit", ctypes.c_int), ("bitmap_bit_order", ctypes.c_int),
+        ("bitmap_pad", ctypes.c_int), ("depth", ctypes.c_int), ("bytes_per_line", ctypes.c_int),
+        ("bits_per_pixel", ctypes.c_int),
+    ]
+
+
+class _XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [
+        ("shmseg", ctypes.c_ulong), ("shmid", ctypes.c_int),
+        ("shmaddr", ctypes.c_void_p), ("readOnly", ctypes.c_int),
+    ]
+
+
+class XShmScreenGrabber:
+    """通过 X11 MIT-SHM 扩展截屏（仅 Linux）
+
+    X 服务器把像素直接写进与本进程共享的内存段，这块内存在整个生命周期里复用，
+    并以 NumPy BGRA 视图（self.bgra）暴露，不经过 PIL 编解码。grab_into 再把它转换成
+    采集环形缓冲区使用的 BGR 布局。
+    """
+    name = "xshm"
+    ZPIXMAP = 2
+    ALL_PLANES = 0xFFFFFFFF
+    IPC_PRIVATE = 0
+    IPC_CREAT = 0o1000
+    IPC_RMID = 0
+
+    def __init__(self, display_name=None):
+        if not sys.platform.startswith("linux"):
+            raise RuntimeError("XShm 采集仅支持 Linux/X11")
+        libx11 = ctypes.util.find_library("X11")
+        libxext = ctypes.util.find_library("Xext")
+        if not libx11 or not libxext:
+            raise RuntimeError("未找到 libX11/libXext")
+        self.xlib = ctypes.CDLL(libx11)
+        self.xext = ctypes.CDLL(libxext)
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._declare_functions()
+
+        self.display = self.xlib.XOpenDisplay(display_name.encode() if display_name else None)
+        if not self.display:
+            raise RuntimeError(f"无法连接 X11 显示服务: {display_name or os.environ.get('DISPLAY', '')}")
+        self.image = None
+        self.shminfo = _XShmSegmentInfo()
+        try:
+            if not self.xext.XShmQueryExtension(self.display):
+                raise RuntimeError("X 服务器不支持 MIT-SHM 扩展")
+            screen = self.xlib.XDefaultScreen(self.display)
+            self.root = self.xlib.XRootWindow(self.display, screen)
+            self.width = self.xlib.XDisplayWidth(self.display, screen)
+            self.height = self.xlib.XDisplayHeight(self.display, screen)
+            visual = self.xlib.XDefaultVisual(self.display, screen)
+            depth = self.xlib.XDefaultDepth(self.display, screen)
+
+            self.image = self.xext.XShmCreateImage(self.display, visual, depth, self.ZPIXMAP, None,
+                                                   ctypes.byref(self.shminfo), self.width, self.height)
+            if not self.image:
+                raise RuntimeError("XShmCreateImage 失败")
+            image = self.image.contents
+            if image.bits_per_pixel != 32:
+                raise RuntimeError(f"不支持的像素格式: {image.bits_per_pixel} 位")
+            size = image.bytes_per_line * image.height
+
+            self.shminfo.shmid = self.libc.shmget(self.IPC_PRIVATE, size, self.IPC_CREAT | 0o600)
+            if self.shminfo.shmid < 0:
+                raise RuntimeError(f"shmget 失败: errno {ctypes.get_errno()}")
+            address = self.libc.shmat(self.shminfo.shmid, None, 0)
+            if address in (None, ctypes.c_void_p(-1).value):
+                raise RuntimeError(f"shmat 失败: errno {ctypes.get_errno()}")
+            self.shminfo.shmaddr = image.data = address
+            self.shminfo.readOnly = 0
+            if not self.xext.XShmAttach(self.display, ctypes.byref(self.shminfo)):
+                raise RuntimeError("XShmAttach 失败")
+            self.xlib.XSync(self.display, 0)
+            # 双方都已映射后标记删除，进程退出时内存段自动释放
+            self.libc.shmctl(self.shminfo.shmid, self.IPC_RMID, None)
+
+            buffer = (ctypes.c_ubyte * size).from_address(address)
+            self.bgra = np.ctypeslib.as_array(buffer).reshape(
+                image.height, image.bytes_per_line // 4, 4)[:, :self.width]
+        except Exception:
+            self.close()
+            raise
+
+    def _declare_functions(self):
+        xlib, xext, libc = self.xlib, self.xext, self.libc
+        xlib.XOpenDisplay.restype = ctypes.c_void_p
+        xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        for func in ("XDefaultScreen",):
+            getattr(xlib, func).argtypes = [ctypes.c_void_p]
+        for func in ("XDisplayWidth", "XDisplayHeight", "XDefaultDepth"):
+            getattr(xlib, func).argtypes = [ctypes.c_void_p, ctypes.c_int]
+        xlib.XRootWindow.restype = ctypes.c_ulong
+        xlib.XRootWindow.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        xlib.XDefaultVisual.restype = ctypes.c_void_p
+        xlib.XDefaultVisual.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        xlib.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        xlib.XFree.argtypes = [ctypes.c_void_p]
+        xlib.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        xext.XShmQueryExtension.argtypes = [ctypes.c_void_p]
+        xext.XShmCreateImage.restype = ctypes.POINTER(_XImage)
+        xext.XShmCreateImage.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int,
+                                         ctypes.c_char_p, ctypes.POINTER(_XShmSegmentInfo),
+                                         ctypes.c_uint, ctypes.c_uint]
+        xext.XShmAttach.argtypes = [ctypes.c_void_p, ctypes.POINTER(_XShmSegmentInfo)]
+        xext.XShmDetach.argtypes = [ctypes.c_void_p, ctypes.POINTER(_XShmSegmentInfo)]
+        xext.XShmGetImage.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(_XImage),
+                                      ctypes.c_int, ctypes.c_int, ctypes.c_ulong]
+        libc.shmget.argtypes = [ctypes.c_int, ctypes.c_size_t, ctypes.c_int]
+        libc.shmat.restype = ctypes.c_void_p
+        libc.shmat.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int]
+        libc.shmdt.argtypes = [ctypes.c_void_p]
+        libc.shmctl.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p]
+
+    def grab(self):
+        """把整屏读入共享内存，返回复用的 BGRA 视图（下一次 grab 会覆盖）"""
+        if not self.xext.XShmGetImage(self.display, self.root, self.image, 0, 0, self.ALL_PLANES):
+            raise RuntimeError("XShmGetImage 失败")
+        return self.bgra
+
+    def grab_into(self, out):
+        bgra = self.grab()
+        if out is None or out.shape != (self.height, self.width, 3):
+            out = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=out)
+        return out
+
+    def close(self):
+        if self.display:
+            if self.shminfo.shmaddr:
+                self.xext.XShmDetach(self.display, ctypes.byref(self.shminfo))
+                self.libc.shmdt(self.shminfo.shmaddr)
+                self.shminfo.shmaddr = None
+            if self.image:
+                self.xlib.XFree(self.image)
+                self.image = None
+            self.xlib.XCloseDisplay(self.display)
+            self.display = None
+
+
+SCREEN_GRABBERS = {
+    "pil": PILScreenGrabber,
+    "xshm": XShmScreenGrabber,
+}
+
+
+def create_screen_grabber(name="auto", display_name=None):
+    """创建截屏实现；auto 在 Linux/X11 下优先使用 XShm，失败时退回 PIL"""
+    if name == "auto":
+        name = "xshm" if sys.platform.startswith("linux") and (display_name or os.environ.get("DISPLAY")) else "pil"
+    try:
+        return SCREEN_GRABBERS.get(name, PILScreenGrabber)(display_name)
+    except Exception as e:
+        logging.warning(f"无法使用截屏后端 {name}，退回到 PIL: {str(e)}")
+        return PILScreenGrabber(display_name)
+
+
+class CapturedFrame:
+    """从采集环形缓冲区借出的一帧（只读视图，BGR 顺序，与 OpenCV 一致）"""
+    __slots__ = ("array", "seq", "timestamp_ns", "slot", "generation")
+
+    def __init__(self, array, seq, timestamp_ns, slot, generation):
+        self.array = array
+        self.seq = seq
+        self.timestamp_ns = timestamp_ns
+        self.slot = slot
+        self.generation = generation
+
+    def pixel(self, x, y):
+        """返回 (r, g, b)"""
+        b, g, r = self.array[y, x]
+        return int(r), int(g), int(b)
+
+    def region(self, x, y, width, height):
+        """区域超出画面时裁剪到画面边缘（负坐标不能直接用作切片起点）"""
+        x, y, width, height = clip_rect((x, y, width, height), (0, 0, self.array.shape[1], self.array.shape[0]))
+        return self.array[y:y + height, x:x + width]
+
+
+class FrameCaptureService:
+    """共享的屏幕采集服务
+
+    一个采集线程按设定帧率把屏幕写入预先分配的 NumPy 环形缓冲区，颜色/图像触发器、
+    区域截取和结果验证都从这里借用最新一帧（只读视图，不复制）。采集线程只写入
+    当前既不是最新帧、也没有被借用的槽位；找不到空闲槽位时丢弃本帧（只保留最新帧语义）。
+    服务在第一次借用时启动，连续 idle_timeout 秒没有消费者借用时自动停止；停止后最新帧作废，
+    重新启动后借用会等待新采集的一帧（帧序号继续递增，按序号缓存的结果不会被误用）。
+    """
+
+    def __init__(self, fps=30, ring_size=3, grabber=None, idle_timeout=2.0):
+        self.fps = fps
+        self.ring_size = max(2, ring_size)
+        self.grabber = grabber or create_screen_grabber()
+        self.idle_timeout = idle_timeout
+        self.condition = threading.Condition()
+        self.buffers = [None] * self.ring_size
+        self.borrowed = [0] * self.ring_size
+        self.generation = 0
+        self.latest_slot = None
+        self.latest_seq = 0
+        self.latest_timestamp_ns = 0
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.last_use = time.perf_counter()
+        self.frame_times = deque(maxlen=120)
+        self.dropped = 0
+        self.capture_ms = 0.0
+        self.consumer_lag_ms = {}
+        self.error = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    @property
+    def current_seq(self):
+        """最新有效帧的序号；未运行或重启后尚未出帧时为 None"""
+        return self.latest_seq if self.running and self.latest_slot is not None else None
+
+    def set_fps(self, fps):
+        self.fps = max(1, fps)
+
+    def set_grabber(self, grabber):
+        """更换截屏实现（下一帧生效）"""
+        with self.condition:
+            old, self.grabber = self.grabber, grabber
+        if old is not grabber:
+            old.close()
+
+    def ensure_running(self):
+        with self.condition:
+            self.last_use = time.perf_counter()
+            if not self.running:
+                self.stop_event.clear()
+                self.thread = threading.Thread(target=self.run, name="FrameCapture", daemon=True)
+                self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=1)
+
+    def _free_slot(self):
+        for i in range(1, self.ring_size + 1):
+            slot = ((self.latest_slot if self.latest_slot is not None else -1) + i) % self.ring_size
+            if slot != self.latest_slot and self.borrowed[slot] == 0:
+                return slot
+        return None
+
+    def _retire(self):
+        # 持有 condition 时调用：采集线程退出，最新帧不再代表当前画面
+        self.thread = None
+        self.latest_slot = None
+        self.condition.notify_all()
+
+    def run(self):
+        timer = DeadlineTimer()
+        try:
+            while not self.stop_event.is_set():
+                with self.condition:
+                    if time.perf_counter() - self.last_use > self.idle_timeout:
+                        # 在锁内退役，之后的 ensure_running 会立即启动新的采集线程
+                        self._retire()
+                        break
+                    slot = self._free_slot()
+                if slot is None:
+                    # 所有空闲槽位都被消费者占用，丢弃本帧
+                    self.dropped += 1
+                else:
+                    start_ns = time.perf_counter_ns()
+                    try:
+                        result = self.grabber.grab_into(self.buffers[slot])
+                    except Exception as e:
+                        self.error = str(e)
+                        logging.error(f"屏幕采集失败: {str(e)}")
+                        break
+                    now_ns = time.perf_counter_ns()
+                    self.capture_ms = (now_ns - start_ns) / 1e6
+                    with self.condition:
+                        if result is not self.buffers[slot]:
+                            if self.buffers[slot] is not None:
+                                # 分辨率变化：重新分配环形缓冲区，已借出的旧帧仍然有效
+                                self.generation += 1
+                                self.buffers = [None] * self.ring_size
+                                self.borrowed = [0] * self.ring_size
+                            # 槽位第一次写入时直接保存，不影响其他已借出的槽位
+                            self.buffers[slot] = result
+                        self.latest_slot = slot
+                        self.latest_seq += 1
+                        self.latest_timestamp_ns = now_ns
+                        self.frame_times.append(now_ns)
+                        self.condition.notify_all()
+
+                timer.advance(1.0 / self.fps)
+                if timer.wait(self.stop_event) is None:
+                    break
+        finally:
+            with self.condition:
+                if self.thread is threading.current_thread():
+                    self._retire()
+
+    @contextlib.contextmanager
+    def borrow(self, consumer, timeout=1.0, after_seq=None):
+        """借用最新一帧，with 块结束时归还；timeout 内没有可用帧时得到 None
+
+        after_seq 不为 None 时等待序号大于它的新帧（例如刚隐藏窗口后需要一帧新的画面）。
+        """
+        self.ensure_running()
+        min_seq = after_seq if after_seq is not None else 0
+        with self.condition:
+            self.condition.wait_for(
+                lambda: self.latest_slot is not None and self.latest_seq > min_seq or not self.running, timeout)
+            if self.latest_slot is None or self.latest_seq <= min_seq:
+                frame = None
+            else:
+                slot = self.latest_slot
+                self.borrowed[slot] += 1
+                view = self.buffers[slot].view()
+                view.flags.writeable = False
+                frame = CapturedFrame(view, self.latest_seq, self.latest_timestamp_ns, slot, self.generation)
+        if frame is not None:
+            lag_ms = (time.perf_counter_ns() - frame.timestamp_ns) / 1e6
+            previous = self.consumer_lag_ms.get(consumer)
+            self.consumer_lag_ms[consumer] = lag_ms if previous is None else previous * 0.8 + lag_ms * 0.2
+        try:
+            yield frame
+        finally:
+            if frame is not None:
+                with self.condition:
+                    if frame.generation == self.generation:
+                        self.borrowed[frame.slot] -= 1
+
+    def measured_fps(self):
+        times = self.frame_times
+        if len(times) < 2 or not self.running:
+            return 0.0
+        return (len(times) - 1) * 1e9 / (times[-1] - times[0])
+
+    def summary(self):
+        if not self.running:
+            return f"画面采集: 未运行 ({self.grabber.name})" + (f" - 错误: {self.error}" if self.error else "")
+        buffer = self.buffers[self.latest_slot] if self.latest_slot is not None else None
+        size = f"{buffer.shape[1]}x{buffer.shape[0]}" if buffer is not None else "-"
+        lags = ", ".join(f"{name} {lag:.1f}ms" for name, lag in self.consumer_lag_ms.items()) or "-"
+        return (f"画面采集: {self.measured_fps():.1f}/{self.fps} FPS ({self.grabber.name}, {size}), "
+                f"单帧 {self.capture_ms:.1f}ms, 丢帧 {self.dropped}, 消费延迟: {lags}")
+
+
+class ClickVerifier:
+    """点击结果验证：每次点击循环后比较验证区域与上一次循环时是否发生变化"""
+
+    def __init__(self, capture_service, area):
+        self.capture_service = capture_service
+        self.x, self.y, self.width, self.height = area
+        self.previous = None
+        self.passed = 0
+        self.failed = 0
+
+    def check(self):
+        # 在注入线程中调用，不等待新帧，采集服务尚未出帧时跳过本次
+        with self.capture_service.borrow("结果验证", timeout=0) as frame:
+            if frame is None:
+                return None
+            region = frame.region(self.x, self.y, self.width, self.height)
+            first = self.previous is None
+            changed = not first and not np.array_equal(region, self.previous)
+            self.previous = region.copy()
+        if first:
+            return None
+        if changed:
+            self.passed += 1
+        else:
+            self.failed += 1
+        return changed
+
+    def summary(self):
+        total = self.passed + self.failed
+        rate = 100.0 * self.passed / total if total else 0.0
+        return f"验证次数: {total}, 区域变化: {self.passed}, 未变化: {self.failed}, 通过率: {rate:.2f}%"
+
+
+_pixel_probe = None
+
+
+def get_pixel_probe():
+    """进程内共享的像素探测器（首次使用时创建）"""
+    global _pixel_probe
+    if _pixel_probe is None:
+        _pixel_probe = PixelProbe()
+    return _pixel_probe
+
+
+def read_pixel(x, y):
+    return get_pixel_probe().pixel(x, y)
+
+
+def read_area(x, y, width, height):
+    """只读取一个矩形区域，返回 BGR 数组（与采集帧的通道顺序一致）"""
+    return cv2.cvtColor(np.ascontiguousarray(get_pixel_probe().region(x, y, width, height)), cv2.COLOR_RGB2BGR)
+
+
+def halve_image(image):
+    """按 2x2 区域平均缩小一半；模板金字塔和匹配时的画面金字塔使用同一种缩放，得分才可比"""
+    height, width = image.shape[:2]
+    return cv2.resize(image, (width // 2, height // 2), interpolation=cv2.INTER_AREA)
+
+
+class TemplateEntry(FrozenRecord):
+    """解码后的模板图像：BGR 原图、灰度图以及逐级缩小一半的金字塔（第 0 级为原尺寸）"""
+    __slots__ = ("path", "mtime_ns", "size", "color", "gray", "color_pyramid", "gray_pyramid")
+
+
+class TemplateCache:
+    """模板图像的内存缓存
+
+    以路径为键、文件修改时间和大小为版本，查询时只做一次 stat；文件变化后自动重新解码。
+    条目数有上限，超出时淘汰最久未使用的条目（LRU）。
+    """
+
+    def __init__(self, max_entries=16, pyramid_levels=4):
+        self.max_entries = max_entries
+        self.pyramid_levels = pyramid_levels
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, path):
+        """返回 path 对应的 TemplateEntry；文件不存在或无法解码时抛出异常"""
+        stat = os.stat(path)
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                self.entries.move_to_end(path)
+                self.hits += 1
+                return entry
+
+        entry = self.load(path, stat)
+        with self.lock:
+            self.misses += 1
+            self.entries[path] = entry
+            self.entries.move_to_end(path)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def load(self, path, stat):
+        # np.fromfile + imdecode 可以读取包含中文的路径（cv2.imread 在 Windows 上不行）
+        color = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if color is None:
+            raise ValueError(f"无法解码模板图像: {path}")
+        gray = cv2.cvtColor(color, cv2.COLOR_BGR2GRAY)
+        color_pyramid = [color]
+        gray_pyramid = [gray]
+        for _ in range(1, self.pyramid_levels):
+            if min(gray_pyramid[-1].shape[:2]) < 32:  # 最小一级不小于 16 像素
+                break
+            color_pyramid.append(halve_image(color_pyramid[-1]))
+            gray_pyramid.append(halve_image(gray_pyramid[-1]))
+        for image in color_pyramid + gray_pyramid:
+            image.flags.writeable = False
+        return TemplateEntry(
+            path=path, mtime_ns=stat.st_mtime_ns, size=stat.st_size,
+            color=color, gray=gray,
+            color_pyramid=tuple(color_pyramid), gray_pyramid=tuple(gray_pyramid)
+        )
+
+    def invalidate(self, path=None):
+        with self.lock:
+            if path is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(path, None)
+
+    def summary(self):
+        total = self.hits + self.misses
+        rate = 100.0 * self.hits / total if total else 0.0
+        return (f"模板缓存: {len(self.entries)}/{self.max_entries} 条, 命中 {self.hits}, "
+                f"未命中 {self.misses} ({rate:.1f}%), 淘汰 {self.evictions}")
+
+
+_template_cache = None
+
+
+def get_template_cache():
+    """进程内共享的模板缓存（首次使用时创建）"""
+    global _template_cache
+    if _template_cache is None:
+        _template_cache = TemplateCache()
+    return _template_cache
+
+
+def pyautogui_match(template, haystack, confidence, grayscale=False):
+    """用 pyautogui 在 haystack（BGR 数组）中查找模板，返回 (x, y, 宽, 高) 或 None"""
+    try:
+        box = pyautogui.locate(template.color, haystack, confidence=confidence, grayscale=grayscale)
+    except pyautogui.ImageNotFoundException:
+        return None
+    return tuple(box) if box else None
+
+
+class PyramidMatcher:
+    """由粗到细的金字塔模板匹配
+
+    先在缩小 2^level 倍的画面上用缩小后的模板做一次匹配，取得分最高的几个候选位置，
+    再只在这些位置附近的原尺寸区域里精确匹配。得分与 pyautogui/pyscreeze 相同，
+    都是 TM_CCOEFF_NORMED，最终判定也在原尺寸上进行，所以置信度的含义与 confidence_spin 一致。
+    缩小后的阶段只用来挑候选，阈值放宽 coarse_margin，以免漏掉真正的匹配。
+    """
+
+    def __init__(self, max_level=3, candidates=3, coarse_margin=0.25, margin_px=2):
+        self.max_level = max_level
+        self.candidates = candidates
+        self.coarse_margin = coarse_margin
+        self.margin_px = margin_px
+
+    def __call__(self, template, haystack, confidence, grayscale=False):
+        return self.match(template, haystack, confidence, grayscale)
+
+    def match(self, template, haystack, confidence, grayscale=False):
+        """template 为 TemplateEntry，haystack 为 BGR 数组（可以是整帧中的一块视图）"""
+        box, score = self.best_match(template, haystack, confidence, grayscale)
+        return box if score >= confidence else None
+
+    def prepare(self, haystack, grayscale=False):
+        """把画面转换为匹配用的金字塔（第 0 级为原尺寸），同一帧上匹配多个模板时只构建一次"""
+        if grayscale:
+            haystack = cv2.cvtColor(haystack, cv2.COLOR_BGR2GRAY)
+        pyramid = [haystack]
+        while len(pyramid) <= self.max_level and min(pyramid[-1].shape[:2]) >= 2:
+            pyramid.append(halve_image(pyramid[-1]))
+        return pyramid
+
+    def best_match(self, template, haystack, confidence, grayscale=False, prepared=None):
+        """返回 (匹配框, 得分)；没有候选达到阈值时匹配框为 None，得分为看到的最高分
+
+        prepared 为 prepare() 对同一 haystack 的结果，不提供时现场构建。
+        """
+        pyramid = prepared if prepared is not None else self.prepare(haystack, grayscale)
+        haystack = pyramid[0]
+        levels = template.gray_pyramid if grayscale else template.color_pyramid
+        height, width = haystack.shape[:2]
+        template_height, template_width = levels[0].shape[:2]
+        if height < template_height or width < template_width:
+            return None, 0.0
+
+        level = min(len(levels) - 1, len(pyramid) - 1, self.max_level)
+        while level > 0 and (pyramid[level].shape[0] < levels[level].shape[0] or
+                             pyramid[level].shape[1] < levels[level].shape[1]):
+            level -= 1
+        if level == 0:
+            return self._best(haystack, levels[0], 0, 0)
+
+        result = cv2.matchTemplate(pyramid[level], levels[level], cv2.TM_CCOEFF_NORMED)
+        threshold = confidence - self.coarse_margin
+        scale = 1 << level
+        small_height, small_width = levels[level].shape[:2]
+        best_box, best_score = None, 0.0
+        for _ in range(self.candidates):
+            _, score, _, (cx, cy) = cv2.minMaxLoc(result)
+            if score < threshold:
+                best_score = max(best_score, score)
+                break
+            # 粗匹配位置的误差在一个缩放步长内，原尺寸上只需搜索这个邻域
+            x0 = max(0, cx * scale - scale - self.margin_px)
+            y0 = max(0, cy * scale - scale - self.margin_px)
+            x1 = min(width, cx * scale + scale + self.margin_px + template_width)
+            y1 = min(height, cy * scale + scale + self.margin_px + template_height)
+            box, score = self._best(haystack[y0:y1, x0:x1], levels[0], x0, y0)
+            if score >= confidence:
+                return box, score
+            if score > best_score:
+                best_box, best_score = box, score
+            # 排除这个候选附近的位置，继续看下一个
+            result[max(0, cy - small_height // 2):cy + small_height // 2 + 1,
+                   max(0, cx - small_width // 2):cx + small_width // 2 + 1] = -1.0
+        return best_box, best_score
+
+    @staticmethod
+    def _best(haystack, template, offset_x, offset_y):
+        """原尺寸匹配，返回 (得分最高的位置, 得分)"""
+        template_height, template_width = template.shape[:2]
+        if haystack.shape[0] < template_height or haystack.shape[1] < template_width:
+            return None, 0.0
+        result = cv2.matchTemplate(haystack, template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (x, y) = cv2.minMaxLoc(result)
+        return (offset_x + x, offset_y + y, template_width, template_height), float(score)
+
+
+FEATURE_DETECTORS = {
+    # 界面图标通常只有几十个像素，ORB 默认 31 像素的描述子邻域太大，缩小后小模板上也能取到足够的特征点
+    "orb": (lambda: cv2.ORB_create(nfeatures=5000, edgeThreshold=15, patchSize=15), cv2.NORM_HAMMING),
+    "akaze": (lambda: cv2.AKAZE_create(), cv2.NORM_HAMMING),
+    "sift": (lambda: cv2.SIFT_create(), cv2.NORM_L2),
+}
+
+IMAGE_MATCHERS = {
+    "模板匹配 (金字塔)": "pyramid",
+    "特征点 ORB (适应缩放/旋转)": "orb",
+    "特征点 AKAZE (适应缩放/旋转)": "akaze",
+    "特征点 SIFT (适应缩放/旋转，较慢)": "sift",
+}
+
+
+def feature_detector_available(name):
+    """当前 OpenCV 是否提供该特征检测器（例如 OpenCV 5 把 AKAZE 移到了 contrib 模块）"""
+    return name in FEATURE_DETECTORS and hasattr(cv2, f"{name.upper()}_create")
+
+
+class FeatureMatcher:
+    """基于特征点的图像匹配，目标因 DPI 或缩放变大变小、或者有少量旋转时仍能找到
+
+    模板的特征点和描述子只计算一次，按模板路径、修改时间和大小缓存；画面的特征点只在
+    传入的 haystack（ImageSearcher/TemplateSetMatcher 已经按搜索区域裁好的视图）内检测。
+    描述子用比值检验筛选匹配对，再用 RANSAC 求单应矩阵，并检查投影后的四边形是凸的、
+    缩放比例在 scale_range 之内。得分是把画面中的匹配区域按单应矩阵反投影回模板坐标后，
+    与模板灰度图的 TM_CCOEFF_NORMED，因此置信度的含义与模板匹配相同。
+    接口与 PyramidMatcher 一致（包括每帧只做一次的 prepare）；特征点总是在灰度图上检测，grayscale 参数不起作用。
+    """
+
+    def __init__(self, detector="orb", ratio=0.75, min_inliers=8, ransac_threshold=3.0,
+                 scale_range=(0.25, 4.0), max_templates=32):
+        if not feature_detector_available(detector):
+            raise RuntimeError(f"当前 OpenCV 不提供 {detector.upper()} 特征检测器")
+        self.detector = detector
+        self.create_detector, norm = FEATURE_DETECTORS[detector]
+        self.norm = norm
+        self.ratio = ratio
+        self.min_inliers = min_inliers
+        self.ransac_threshold = ransac_threshold
+        self.scale_range = scale_range
+        self.max_templates = max_templates
+        self.templates = OrderedDict()  # (路径, 修改时间, 大小) -> (特征点坐标, 描述子)
+        self.lock = threading.Lock()
+        # 检测器和 BFMatcher 对象不能被多个线程同时使用，每个线程各建一份
+        self.local = threading.local()
+        self.searches = 0
+        self.found = 0
+        self.frame_keypoints = 0
+        self.inliers = 0
+        self.detect_ms = None
+
+    def tools(self):
+        tools = getattr(self.local, "tools", None)
+        if tools is None:
+            tools = self.local.tools = (self.create_detector(), cv2.BFMatcher(self.norm))
+        return tools
+
+    def template_features(self, template):
+        """返回模板的 (特征点坐标 Nx2, 描述子)，同一版本的模板只计算一次"""
+        key = (template.path, template.mtime_ns, template.size)
+        with self.lock:
+            features = self.templates.get(key)
+            if features is not None:
+                self.templates.move_to_end(key)
+                return features
+        detector, _ = self.tools()
+        keypoints, descriptors = detector.detectAndCompute(template.gray, None)
+        features = (np.float32([keypoint.pt for keypoint in keypoints]).reshape(-1, 2), descriptors)
+        with self.lock:
+            self.templates[key] = features
+            while len(self.templates) > self.max_templates:
+                self.templates.popitem(last=False)
+        return features
+
+    def __call__(self, template, haystack, confidence, grayscale=False):
+        return self.match(template, haystack, confidence, grayscale)
+
+    def match(self, template, haystack, confidence, grayscale=False):
+        box, score = self.best_match(template, haystack, confidence, grayscale)
+        return box if score >= confidence else None
+
+    def prepare(self, haystack, grayscale=False):
+        """检测画面的特征点，返回 (灰度图, 特征点, 描述子)；同一帧上匹配多个模板时只检测一次"""
+        gray = cv2.cvtColor(haystack, cv2.COLOR_BGR2GRAY) if haystack.ndim == 3 else haystack
+        detector, _ = self.tools()
+        start_ns = time.perf_counter_ns()
+        keypoints, descriptors = detector.detectAndCompute(gray, None)
+        elapsed_ms = (time.perf_counter_ns() - start_ns) / 1e6
+        self.detect_ms = elapsed_ms if self.detect_ms is None else self.detect_ms * 0.8 + elapsed_ms * 0.2
+        self.frame_keypoints = len(keypoints)
+        return gray, keypoints, descriptors
+
+    def best_match(self, template, haystack, confidence, grayscale=False, prepared=None):
+        """返回 (匹配框, 得分)；特征点不足或几何验证失败时返回 (None, 0.0)
+
+        prepared 为 prepare() 对同一 haystack 的结果，不提供时现场检测。
+        """
+        self.searches += 1
+        points, descriptors = self.template_features(template)
+        if descriptors is None or len(points) < self.min_inliers:
+            return None, 0.0
+        gray, keypoints, frame_descriptors = prepared if prepared is not None else self.prepare(haystack)
+        if frame_descriptors is None or len(keypoints) < self.min_inliers:
+            return None, 0.0
+        _, matcher = self.tools()
+
+        pairs = matcher.knnMatch(descriptors, frame_descriptors, k=2)
+        good = [first for first, second in (pair for pair in pairs if len(pair) == 2)
+                if first.distance < self.ratio * second.distance]
+        if len(good) < self.min_inliers:
+            return None, 0.0
+        source = points[[match.queryIdx for match in good]]
+        target = np.float32([keypoints[match.trainIdx].pt for match in good])
+        homography, mask = cv2.findHomography(source, target, cv2.RANSAC, self.ransac_threshold)
+        self.inliers = int(mask.sum()) if mask is not None else 0
+        if homography is None or self.inliers < self.min_inliers:
+            return None, 0.0
+
+        template_height, template_width = template.gray.shape[:2]
+        corners = np.float32([[0, 0], [template_width, 0], [template_width, template_height], [0, template_height]])
+        quad = cv2.perspectiveTransform(corners.reshape(-1, 1, 2), homography)
+        scale = (cv2.contourArea(quad) / (template_width * template_height)) ** 0.5
+        if not cv2.isContourConvex(quad) or not self.scale_range[0] <= scale <= self.scale_range[1]:
+            return None, 0.0
+
+        warped = cv2.warpPerspective(gray, homography, (template_width, template_height),
+                                     flags=cv2.WARP_INVERSE_MAP | cv2.INTER_LINEAR)
+        score = float(cv2.matchTemplate(warped, template.gray, cv2.TM_CCOEFF_NORMED)[0, 0])
+        height, width = gray.shape[:2]
+        x0, y0 = np.maximum(np.floor(quad.reshape(-1, 2).min(axis=0)), 0).astype(int)
+        x1, y1 = np.minimum(np.ceil(quad.reshape(-1, 2).max(axis=0)), (width, height)).astype(int)
+        if score >= confidence:
+            self.found += 1
+        return (int(x0), int(y0), int(x1 - x0), int(y1 - y0)), score
+
+    def summary(self):
+        return (f"特征匹配 ({self.detector.upper()}): 搜索 {self.searches} 次, 找到 {self.found} 次, "
+                f"模板特征缓存 {len(self.templates)} 个, 画面特征点 {self.frame_keypoints}, "
+                f"内点 {self.inliers}, 检测耗时 {self.detect_ms or 0:.1f}ms")
+
+
+class ImageSearcher:
+    """图像触发器的搜索区域控制
+
+    可以把搜索限制在一个固定区域（ROI）内；开启位置预测后先在上次匹配位置周围的小窗口里找，
+    没找到再搜索整个 ROI（或整屏）。记录预测窗口的命中/未命中次数，并用完整搜索耗时的
+    滑动平均估算命中节省的时间。
+    """
+
+    def __init__(self, match=None, margin=64):
+        self.match = match or PyramidMatcher()
+        self.margin = margin
+        self.key = None
+        self.last_box = None
+        self.hits = 0
+        self.misses = 0
+        self.full_searches = 0
+        self.full_ms = None
+        self.saved_ms = 0.0
+
+    def reset(self):
+        self.last_box = None
+
+    def locate(self, template, haystack, confidence, region=None, locality=False, key=None, grayscale=False,
+               match=None):
+        """在 haystack 中查找 TemplateEntry，返回匹配框 (x, y, 宽, 高)（整帧坐标）或 None
+
+        key 变化（换了模板）时丢弃上次位置。match 可以临时换用其他匹配器（如 FeatureMatcher）。
+        """
+        match = match or self.match
+        if key != self.key:
+            self.key = key
+            self.last_box = None
+
+        frame_height, frame_width = haystack.shape[:2]
+        frame_bounds = (0, 0, frame_width, frame_height)
+        bounds = clip_rect(region, frame_bounds) if region else frame_bounds
+
+        if locality and self.last_box is not None:
+            x, y, width, height = self.last_box
+            window = clip_rect((x - self.margin, y - self.margin,
+                                 width + 2 * self.margin, height + 2 * self.margin), bounds)
+            start_ns = time.perf_counter_ns()
+            box = self._search(match, template, haystack, window, confidence, grayscale)
+            elapsed_ms = (time.perf_counter_ns() - start_ns) / 1e6
+            if box is not None:
+                self.hits += 1
+                if self.full_ms is not None:
+                    self.saved_ms += max(0.0, self.full_ms - elapsed_ms)
+                self.last_box = box
+                return box
+            self.misses += 1
+
+        start_ns = time.perf_counter_ns()
+        box = self._search(match, template, haystack, bounds, confidence, grayscale)
+        elapsed_ms = (time.perf_counter_ns() - start_ns) / 1e6
+        self.full_searches += 1
+        self.full_ms = elapsed_ms if self.full_ms is None else self.full_ms * 0.8 + elapsed_ms * 0.2
+        self.last_box = box
+        return box
+
+    @staticmethod
+    def _search(match, template, haystack, window, confidence, grayscale):
+        x, y, width, height = window
+        template_height, template_width = template.color.shape[:2]
+        # 特征匹配能找到缩小后的目标，窗口比模板原尺寸小时也要搜索
+        if (width < template_width or height < template_height) and not isinstance(match, FeatureMatcher):
+            return None
+        box = match(template, haystack[y:y + height, x:x + width], confidence, grayscale)
+        if box is None:
+            return None
+        return (x + box[0], y + box[1], box[2], box[3])
+
+    def summary(self):
+        total = self.hits + self.misses
+        rate = 100.0 * self.hits / total if total else 0.0
+        return (f"图像搜索: 预测命中 {self.hits}, 未命中 {self.misses} ({rate:.1f}%), "
+                f"完整搜索 {self.full_searches} 次 (平均 {self.full_ms or 0:.1f}ms), 节省 {self.saved_ms:.0f}ms")
+
+
+class TemplateMatchResult(FrozenRecord):
+    """多模板触发集中一个模板的匹配结果（box 为整帧坐标）"""
+    __slots__ = ("path", "matched", "box", "score", "elapsed_ms", "error")
+
+
+TEMPLATE_SET_MODES = {"任意一个匹配": "any", "全部匹配": "all"}
+
+
+class TemplateSetMatcher:
+    """多模板触发集：在同一帧上把各模板的匹配分发到线程池并行执行
+
+    cv2.matchTemplate 执行时会释放 GIL，总耗时随核心数而不是模板数增长。画面金字塔
+    （或特征点）每帧只由匹配器的 prepare 构建一次，所有模板共用。
+    最近一次的结果整体替换 self.results，界面线程直接读取。
+    """
+
+    def __init__(self, matcher=None, max_workers=None):
+        self.matcher = matcher or PyramidMatcher()
+        self.max_workers = max_workers or os.cpu_count() or 4
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="TemplateMatch")
+        self.results = ()
+        self.latency_ms = 0.0
+
+    def match_all(self, paths, haystack, confidence, grayscale=False, region=None, matcher=None):
+        """在 haystack（可选限定 region）中匹配全部模板，返回 TemplateMatchResult 元组
+
+        matcher 可以临时换用其他匹配器（如 FeatureMatcher），默认使用创建时给定的匹配器。
+        """
+        matcher = matcher or self.matcher
+        start_ns = time.perf_counter_ns()
+        frame_height, frame_width = haystack.shape[:2]
+        x, y, width, height = clip_rect(region, (0, 0, frame_width, frame_height)) if region else \
+            (0, 0, frame_width, frame_height)
+        view = haystack[y:y + height, x:x + width]
+        try:
+            prepared = matcher.prepare(view, grayscale)
+        except Exception as e:
+            # 画面本身无法处理（例如区域为空），每个模板都得到同样的错误
+            results = tuple(TemplateMatchResult(path=path, matched=False, box=None, score=0.0, elapsed_ms=0.0,
+                                                error=str(e)) for path in paths)
+        else:
+            futures = [self.executor.submit(self._match_one, matcher, path, view, prepared, confidence, grayscale, x, y)
+                       for path in paths]
+            results = tuple(future.result() for future in futures)
+        self.latency_ms = (time.perf_counter_ns() - start_ns) / 1e6
+        self.results = results
+        return results
+
+    @staticmethod
+    def _match_one(matcher, path, haystack, prepared, confidence, grayscale, offset_x, offset_y):
+        start_ns = time.perf_counter_ns()
+        try:
+            template = get_template_cache().get(path)
+            box, score = matcher.best_match(template, haystack, confidence, grayscale, prepared)
+        except Exception as e:
+            return TemplateMatchResult(path=path, matched=False, box=None, score=0.0,
+                                       elapsed_ms=(time.perf_counter_ns() - start_ns) / 1e6, error=str(e))
+        if box is not None:
+            box = (offset_x + box[0], offset_y + box[1], box[2], box[3])
+        return TemplateMatchResult(path=path, matched=score >= confidence, box=box, score=score,
+                                   elapsed_ms=(time.perf_counter_ns() - start_ns) / 1e6, error=None)
+
+    @staticmethod
+    def satisfied(results, mode):
+        if not results:
+            return False
+        if mode == "all":
+            return all(result.matched for result in results)
+        return any(result.matched for result in results)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+class ChangeGate:
+    """昂贵匹配前的廉价变化检测
+
+    对每个检查（key）记住上一次使用的帧序号、搜索区域像素的 CRC32 和匹配结果：
+    还是同一帧、或者区域内像素没变时，直接复用上一次的结果而不重新匹配。
+    设置了区域时逐行哈希区域内的全部像素；没有区域时只哈希整帧中每 SAMPLE_ROW_STEP 行的一行，
+    高度小于这个步长、又恰好落在未采样行上的变化会被忽略（模板和界面元素通常远高于此）。
+    key 需要包含所有会影响结果的设置（模板路径和修改时间、置信度、区域等）。
+    """
+    SAMPLE_ROW_STEP = 8
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> [帧序号, 摘要, 结果]
+        self.checks = 0
+        self.skips = 0
+        self.compute_ms = None
+        self.saved_ms = 0.0
+
+    @staticmethod
+    def digest(view, row_step=1):
+        """逐行累积 CRC32：区域视图的每一行在内存中都是连续的，不需要先拷贝整块区域"""
+        crc = zlib.crc32(str(view.shape).encode())
+        rows = view[::row_step]
+        if len(rows) and not rows[0].flags.c_contiguous:
+            rows = np.ascontiguousarray(rows)
+        for row in rows:
+            crc = zlib.crc32(row, crc)
+        return crc
+
+    def run(self, key, frame, region, compute):
+        """frame 为 CapturedFrame，region 为 (x, y, 宽, 高) 或 None；像素未变化时返回缓存结果"""
+        self.checks += 1
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            if entry[0] == frame.seq:
+                self.skip()
+                return entry[2]
+
+        array = frame.array
+        if region:
+            x, y, width, height = clip_rect(region, (0, 0, array.shape[1], array.shape[0]))
+            digest = self.digest(array[y:y + height, x:x + width])
+        else:
+            digest = self.digest(array, self.SAMPLE_ROW_STEP)
+        if entry is not None and entry[1] == digest:
+            entry[0] = frame.seq
+            self.skip()
+            return entry[2]
+
+        start_ns = time.perf_counter_ns()
+        result = compute()
+        elapsed_ms = (time.perf_counter_ns() - start_ns) / 1e6
+        self.compute_ms = elapsed_ms if self.compute_ms is None else self.compute_ms * 0.8 + elapsed_ms * 0.2
+        self.entries[key] = [frame.seq, digest, result]
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return result
+
+    def skip(self):
+        self.skips += 1
+        if self.compute_ms is not None:
+            self.saved_ms += self.compute_ms
+
+    def summary(self):
+        rate = 100.0 * self.skips / self.checks if self.checks else 0.0
+        return (f"变化检测: 检查 {self.checks} 次, 画面未变跳过匹配 {self.skips} 次 ({rate:.1f}%), "
+                f"估计节省 {self.saved_ms:.0f}ms")
+
+
+def locate_on_screen(image_path, confidence):
+    template = get_template_cache().get(image_path)
+    return pyautogui.locateOnScreen(template.color, confidence=confidence)
+
+
+def evaluate_triggers(config, pixel=read_pixel, locate=locate_on_screen, template_set=None, now=None,
+                      area=read_area):
+    """按触发器配置快照评估触发条件
+
+    pixel(x, y) 返回屏幕上一个像素的 RGB（默认只读取该像素，不截整屏），
+    area(x, y, 宽, 高) 返回一个矩形区域的 BGR 数组，locate(image_path, confidence) 在屏幕上查找图像，template_set(config) 评估多模板触发集，
+    now 为 time.struct_time；基准测试通过这些参数注入合成画面。
+    """
+    if not config.any_enabled:
+        return True
+    
+    # 检查定时触发器
+    if config.timer_enabled:
+        if config.schedule is not None:
+            # time.localtime() 取自粗粒度时钟，可能比 time.time() 晚几毫秒，计划按精确时间判断
+            if not config.schedule.is_active(time.mktime(now) if now else None):
+                return False
+        else:
+            now = now or time.localtime()
+            current_seconds = seconds_of_day(now.tm_hour, now.tm_min, now.tm_sec)
+            if not (config.start_seconds <= current_seconds <= config.end_seconds):
+                return False
+    
+    # 检查颜色触发器
+    if config.color_enabled:
+        # 只读取目标像素的颜色
+        pixel_color = pixel(config.color_x, config.color_y)
+        
+        # 计算颜色差异
+        target_rgb = config.target_rgb
+        diff = abs(pixel_color[0] - target_rgb[0]) + \
+               abs(pixel_color[1] - target_rgb[1]) + \
+               abs(pixel_color[2] - target_rgb[2])
+        
+        if diff > config.color_tolerance:
+            return False
+    
+    # 检查像素签名触发器（一次读取所有点的外接矩形）
+    if config.signature_enabled:
+        if config.signature is None or not config.signature.matches(area(*config.signature.bbox)):
+            return False
+    
+    # 检查区域颜色触发器
+    if config.area_enabled:
+        if config.area_region is None or not area_color_satisfied(area(*config.area_region), config):
+            return False
+    
+    # 检查图像触发器
+    if config.image_enabled:
+        if not os.path.exists(config.image_path):
+            return False
+        
+        try:
+            location = locate(config.image_path, config.confidence)
+            if not location:
+                return False
+        except:
+            return False
+    
+    # 检查多模板触发集
+    if config.template_set_enabled:
+        if template_set is None or not template_set(config):
+            return False
+    
+    return True
+
+
+async def play_macro_actions(actions, backend, is_running=lambda: True):
+    """按录制顺序回放宏动作，每个动作之后等待其记录的时间间隔
+
+    后端调用可能阻塞（如 pyautogui 的 PAUSE），放在线程池中执行，不占用事件循环线程。
+    """
+    loop = asyncio.get_running_loop()
+    for action in actions:
+        if not is_running():
+            break
+        
+        if action['type'] == 'move':
+            await loop.run_in_executor(None, backend.move_to, action['x'], action['y'])
+        elif action['type'] == 'click':
+            if 'x' in action:
+                await loop.run_in_executor(None, backend.move_to, action['x'], action['y'])
+            await loop.run_in_executor(None, backend.click, action['button'])
+        
+        await asyncio.sleep(action.get('time', 0.1))
+
+
+class MacroRecorder:
+    """事件驱动的宏录制
+
+    pynput 的鼠标监听线程在鼠标移动和按下按键时回调，回调只记下时刻，通过 call_soon_threadsafe
+    把事件投递到异步核心的事件循环，在循环线程中追加动作；鼠标不动时不产生任何唤醒。
+    每个动作的 time 是执行后到下一个动作的等待时间，与 play_macro_actions 的回放方式一致。
+    """
+    BUTTONS = ("left", "middle", "right")
+
+    def __init__(self, core, listener_factory=None):
+        self.core = core
+        self.listener_factory = listener_factory or MouseListener
+        self.listener = None
+        self.recording = False
+        self.actions = []
+        self.last_ns = None
+        self.last_position = None
+
+    def start(self):
+        self.actions = []
+        self.last_ns = self.last_position = None
+        self.recording = True
+        self.listener = self.listener_factory(on_move=self.on_move, on_click=self.on_click)
+        self.listener.start()
+
+    def stop(self, timeout=1.0):
+        """停止监听并返回录制的动作；已经投递到事件循环的事件处理完才返回"""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+        self.core.submit(asyncio.sleep(0)).result(timeout)
+        self.recording = False
+        return self.actions
+
+    def on_move(self, x, y):
+        # 监听线程
+        self.core.call_soon(self._append, time.perf_counter_ns(), {'type': 'move', 'x': int(x), 'y': int(y)})
+
+    def on_click(self, x, y, button, pressed):
+        # 监听线程；只录制按下，回放时 click 包含按下和松开
+        name = getattr(button, "name", None)
+        if pressed and name in self.BUTTONS:
+            self.core.call_soon(self._append, time.perf_counter_ns(),
+                                {'type': 'click', 'button': name, 'x': int(x), 'y': int(y)})
+
+    def _append(self, timestamp_ns, action):
+        # 事件循环线程
+        if not self.recording:
+            return
+        position = (action['x'], action['y'])
+        if action['type'] == 'move' and position == self.last_position:
+            return
+        self.last_position = position
+        if self.actions:
+            self.actions[-1]['time'] = (timestamp_ns - self.last_ns) / 1e9
+        action['time'] = 0.0
+        self.actions.append(action)
+        self.last_ns = timestamp_ns
+
+
+def _legacy_click_iteration(state, backend, button, click_mode, position_mode, fixed_x, fixed_y,
+                            positions, combo_key, combo_key_type, recoil_mode, recoil_pattern,
+                            anti_detect, random_offset, random_interval, min_interval, max_interval, interval):
+    """旧版 click_loop 单次循环的逐行复刻（仅用于基准对比，不含等待）"""
+    button_map = {
+        "左键": "left",
+        "中键": "middle",
+        "右键": "right"
+    }
+    button = button_map.get(button, "left")
+    combo_buttons = []
+    if combo_key:
+        if combo_key_type == 0:
+            combo_buttons = ["left", "right"]
+        elif combo_key_type == 1:
+            combo_buttons = ["left", "middle"]
+        elif combo_key_type == 2:
+            combo_buttons = ["right", "middle"]
+    if position_mode == 0:
+        x, y = backend.position()
+    elif position_mode == 1:
+        x, y = fixed_x, fixed_y
+    else:
+        x, y = positions[state[0]]
+        state[0] = (state[0] + 1) % len(positions)
+    if anti_detect:
+        x += random.randint(-random_offset, random_offset)
+        y += random.randint(-random_offset, random_offset)
+    backend.move_to(x, y)
+    clicks_to_add = 1
+    if click_mode == 0:
+        if combo_key:
+            for btn in combo_buttons:
+                backend.mouse_down(btn)
+            for btn in reversed(combo_buttons):
+                backend.mouse_up(btn)
+            clicks_to_add = len(combo_buttons)
+        else:
+            backend.click(button)
+    elif click_mode == 1:
+        backend.click(button, clicks=2)
+        clicks_to_add = 2
+    if recoil_mode and recoil_pattern:
+        dx, dy = recoil_pattern[state[1]]
+        backend.move_rel(dx, dy)
+        state[1] = (state[1] + 1) % len(recoil_pattern)
+    if random_interval:
+        return clicks_to_add, random.uniform(min_interval, max_interval)
+    return clicks_to_add, interval
+
+
+def benchmark_click_plan(iterations=20000):
+    """对比旧版逐次解析设置的循环与编译后的点击计划的单次循环开销（纳秒/次）
+
+    两者都使用内存记录后端、不做间隔等待，测得的是纯粹的引擎开销。
+    """
+    positions = [(100 + i, 200 + i) for i in range(8)]
+    recoil_pattern = [(0, 1), (0, 2), (0, 1), (0, 0)]
+    legacy_args = dict(
+        button="左键", click_mode=0, position_mode=2, fixed_x=0, fixed_y=0,
+        positions=positions, combo_key=False, combo_key_type=0,
+        recoil_mode=True, recoil_pattern=recoil_pattern, anti_detect=True, random_offset=3,
+        random_interval=True, min_interval=0.01, max_interval=0.02, interval=0.01
+    )
+    plan = ClickPlan.compile(
+        button="左键", click_mode=0, position_mode=2, positions=positions,
+        recoil_pattern=recoil_pattern, anti_detect=True, random_offset=3,
+        random_interval=True, min_interval=0.01, max_interval=0.02
+    )
+
+    backend = RecordingBackend()
+    state = [0, 0]
+    start_ns = time.perf_counter_ns()
+    for _ in range(iterations):
+        _legacy_click_iteration(state, backend, **legacy_args)
+    legacy_ns = (time.perf_counter_ns() - start_ns) / iterations
+
+    backend = RecordingBackend()
+    runner = ClickPlanRunner(plan, backend)
+    start_ns = time.perf_counter_ns()
+    for _ in range(iterations):
+        runner.run_cycle()
+        runner.next_interval()
+    plan_ns = (time.perf_counter_ns() - start_ns) / iterations
+    runner.close()
+
+    return {
+        "iterations": iterations,
+        "legacy_ns_per_iteration": legacy_ns,
+        "plan_ns_per_iteration": plan_ns,
+        "speedup": legacy_ns / plan_ns if plan_ns else 0.0
+    }
+
+
+def _percentile_ms(samples_ns, q):
+    return float(np.percentile(np.asarray(samples_ns, dtype=np.float64), q)) / 1e6 if len(samples_ns) else 0.0
+
+
+def benchmark_max_cps(duration=1.0):
+    """无间隔运行一个点击会话，测量调度器 + 点击计划能持续达到的最高点击速率"""
+    core = AsyncCore()
+    try:
+        scheduler = ClickScheduler(core)
+        backend = RecordingBackend()
+        plan = ClickPlan.compile(button="左键", interval=0.0, position_mode=1, fixed_position=(100, 100))
+        finished = threading.Event()
+        session = ClickSession("benchmark", plan, backend, on_finish=lambda _: finished.set())
+        scheduler.add_session(session)
+        time.sleep(duration)
+        scheduler.remove_session(session.name)
+        finished.wait(timeout=5)
+        return {
+            "duration_s": session.stats.elapsed(),
+            "clicks": session.stats.clicks,
+            "max_cps": session.stats.achieved_cps()
+        }
+    finally:
+        core.stop()
+
+
+BENCHMARK_SCREEN_SIZES = ((1280, 720), (1920, 1080), (2560, 1440), (3840, 2160))
+
+
+def benchmark_trigger_check(sizes=BENCHMARK_SCREEN_SIZES, repeats=20, seed=0):
+    """在不同分辨率的合成画面上测量触发器检查耗时（毫秒）
+
+    颜色触发器直接读取合成画面上的像素（与像素探测器一致，不复制整帧）；图像触发器用
+    金字塔匹配在合成画面上查找从画面中截取的模板（与图像触发器的实际路径一致）。
+    """
+    rng = np.random.default_rng(seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for width, height in sizes:
+            pixels = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+            frame = Image.fromarray(pixels)
+            template_path = os.path.join(tmp_dir, f"template_{width}x{height}.png")
+            frame.crop((width // 2, height // 2, width // 2 + 64, height // 2 + 64)).save(template_path)
+            target_rgb = tuple(int(c) for c in pixels[height // 2, width // 2])
+
+            def pixel(x, y):
+                return frame.getpixel((x, y))
+
+            haystack = cv2.cvtColor(pixels, cv2.COLOR_RGB2BGR)
+            matcher = PyramidMatcher()
+
+            def locate(image_path, confidence):
+                return matcher(get_template_cache().get(image_path), haystack, confidence)
+
+            def area(x, y, area_width, area_height):
+                return haystack[y:y + area_height, x:x + area_width]
+
+            # 分布在画面中部 400x400 范围内的 256 个点，颜色取自画面本身
+            point_xs = rng.integers(width // 2 - 200, width // 2 + 200, size=256)
+            point_ys = rng.integers(height // 2 - 200, height // 2 + 200, size=256)
+            signature = PixelSignature.compile(
+                (x, y, tuple(int(c) for c in pixels[y, x]), 10) for x, y in zip(point_xs, point_ys))
+
+            color_config = TriggerConfig(
+                color_enabled=True, color_x=width // 2, color_y=height // 2,
+                target_rgb=target_rgb, color_tolerance=30,
+                area_enabled=False, area_region=(width // 2, height // 2, 200, 200), area_rgb=target_rgb,
+                area_tolerance=30, area_mode="ratio", area_percent=50.0,
+                signature_enabled=False, signature=signature, expression_enabled=False, expression=None,
+                image_enabled=False, image_path="", confidence=0.9, image_region=None, image_locality=False,
+                image_grayscale=False, image_matcher="pyramid", template_set_enabled=False, template_paths=(), template_set_mode="any",
+                timer_enabled=False, start_seconds=0, end_seconds=0, schedule=None
+            )
+            image_config = color_config.replace(color_enabled=False, image_enabled=True, image_path=template_path)
+            area_config = color_config.replace(color_enabled=False, area_enabled=True)
+            signature_config = color_config.replace(color_enabled=False, signature_enabled=True)
+
+            size_result = {}
+            for label, config, count in (("color", color_config, repeats), ("area", area_config, repeats),
+                                         ("signature", signature_config, repeats),
+                                         ("image", image_config, max(3, repeats // 4))):
+                samples = []
+                for _ in range(count):
+                    start_ns = time.perf_counter_ns()
+                    evaluate_triggers(config, pixel=pixel, locate=locate, area=area)
+                    samples.append(time.perf_counter_ns() - start_ns)
+                size_result[f"{label}_p50_ms"] = _percentile_ms(samples, 50)
+                size_result[f"{label}_p99_ms"] = _percentile_ms(samples, 99)
+            results[f"{width}x{height}"] = size_result
+    return results
+
+
+def benchmark_trigger_expression(frame_size=(1920, 1080), repeats=20, seed=0):
+    """触发表达式按耗时排序短路的效果（毫秒）
+
+    表达式 "image and color" 中颜色不满足：按书写顺序评估时每次都要做一次图像匹配，
+    按实测耗时排序后先评估颜色，图像匹配被短路跳过；同一帧内重复评估则全部命中缓存。
+    """
+    width, height = frame_size
+    haystack = synthetic_screen(width, height, seed)
+    matcher = PyramidMatcher()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "template.png")
+        cv2.imencode(".png", haystack[height // 3:height // 3 + 64, width // 3:width // 3 + 64])[1].tofile(path)
+        template = TemplateCache().get(path)
+
+        def check_atom(field):
+            if field == "image_enabled":
+                return matcher(template, haystack, 0.9) is not None
+            b, g, r = haystack[0, 0]
+            return (int(r), int(g), int(b)) == (1, 2, 3)
+
+        results = {}
+        for label, frame_keys in (("ordered", range(repeats)), ("same_frame", [0] * repeats)):
+            expression = TriggerExpression("image and color")
+            samples = []
+            for frame_key in frame_keys:
+                start_ns = time.perf_counter_ns()
+                expression.evaluate(check_atom, frame_key)
+                samples.append(time.perf_counter_ns() - start_ns)
+            # 第一次评估时还没有实测耗时，按预估顺序执行
+            results[f"{label}_p50_ms"] = _percentile_ms(samples[1:], 50)
+        samples = []
+        for _ in range(max(3, repeats // 4)):
+            start_ns = time.perf_counter_ns()
+            check_atom("image_enabled") and check_atom("color_enabled")
+            samples.append(time.perf_counter_ns() - start_ns)
+        results["written_order_p50_ms"] = _percentile_ms(samples, 50)
+    return results
+
+
+def synthetic_screen(width, height, seed=0):
+    """生成有大尺度结构的合成画面（低分辨率噪声放大后叠加细节），比纯噪声更接近真实界面"""
+    rng = np.random.default_rng(seed)
+    coarse = rng.integers(0, 256, size=(height // 16 + 1, width // 16 + 1, 3), dtype=np.uint8)
+    frame = cv2.resize(coarse, (width, height), interpolation=cv2.INTER_CUBIC)
+    detail = rng.integers(-24, 25, size=(height, width, 3), dtype=np.int16)
+    return np.clip(frame.astype(np.int16) + detail, 0, 255).astype(np.uint8)
+
+
+def benchmark_template_matching(frame_sizes=((1920, 1080), (3840, 2160)), template_sizes=(32, 64, 128, 256),
+                                repeats=5, confidence=0.9, seed=0):
+    """对比 pyautogui.locate（locateOnScreen 去掉截屏后的匹配部分）、原尺寸 cv2 匹配和金字塔匹配（毫秒）
+
+    found 表示金字塔匹配是否找到了模板的真实位置。pyautogui 不可用时只报告错误。
+    """
+    results = {}
+    matcher = PyramidMatcher()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for width, height in frame_sizes:
+            frame = synthetic_screen(width, height, seed)
+            for size in template_sizes:
+                x, y = width // 3, height // 3
+                path = os.path.join(tmp_dir, f"template_{width}_{size}.png")
+                cv2.imencode(".png", frame[y:y + size, x:x + size])[1].tofile(path)
+                template = TemplateCache().get(path)
+
+                timings = {"pyautogui": [], "full": [], "pyramid": []}
+                box = None
+                for _ in range(repeats):
+                    start_ns = time.perf_counter_ns()
+                    PyramidMatcher._best(frame, template.color, 0, 0)
+                    timings["full"].append(time.perf_counter_ns() - start_ns)
+                    start_ns = time.perf_counter_ns()
+                    box = matcher(template, frame, confidence)
+                    timings["pyramid"].append(time.perf_counter_ns() - start_ns)
+
+                entry = {
+                    "full_p50_ms": _percentile_ms(timings["full"], 50),
+                    "pyramid_p50_ms": _percentile_ms(timings["pyramid"], 50),
+                    "found": box is not None and box[:2] == (x, y)
+                }
+                try:
+                    for _ in range(repeats):
+                        start_ns = time.perf_counter_ns()
+                        pyautogui_match(template, frame, confidence)
+                        timings["pyautogui"].append(time.perf_counter_ns() - start_ns)
+                    entry["pyautogui_p50_ms"] = _percentile_ms(timings["pyautogui"], 50)
+                except Exception as e:
+                    entry["pyautogui_error"] = str(e)
+                results[f"{width}x{height}.{size}px"] = entry
+    return results
+
+
+def synthetic_widget(size, seed=0):
+    """生成类似界面控件的图案（色块、边框、文字），用于需要角点和边缘的特征匹配测试"""
+    rng = np.random.default_rng(seed)
+    image = np.full((size, size, 3), int(rng.integers(180, 240)), dtype=np.uint8)
+    for i in range(6):
+        x, y = (int(v) for v in rng.integers(0, size, 2))
+        width, height = (int(v) for v in rng.integers(10, size // 2, 2))
+        color = tuple(int(v) for v in rng.integers(0, 256, 3))
+        cv2.rectangle(image, (x, y), (x + width, y + height), color, -1 if i % 2 else 2)
+    for _ in range(3):
+        text = "".join(chr(int(c)) for c in rng.integers(65, 91, 4))
+        origin = (int(rng.integers(0, size // 2)), int(rng.integers(15, size)))
+        color = tuple(int(v) for v in rng.integers(0, 120, 3))
+        cv2.putText(image, text, origin, cv2.FONT_HERSHEY_SIMPLEX, size / 160, color, max(1, size // 64))
+    cv2.circle(image, (size // 2, size // 2), size // 5, (20, 60, 200), 3)
+    return image
+
+
+def place_transformed(frame, template, x, y, scale=1.0, angle=0.0):
+    """把缩放、旋转后的模板画到 frame 的 (x, y) 处，返回目标中心点"""
+    height, width = template.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, scale)
+    cos, sin = abs(matrix[0, 0]), abs(matrix[0, 1])
+    out_width, out_height = int(height * sin + width * cos), int(height * cos + width * sin)
+    matrix[0, 2] += out_width / 2 - width / 2
+    matrix[1, 2] += out_height / 2 - height / 2
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+    warped = cv2.warpAffine(template, matrix, (out_width, out_height), flags=interpolation)
+    mask = cv2.warpAffine(np.full((height, width), 255, np.uint8), matrix, (out_width, out_height)) > 0
+    frame[y:y + out_height, x:x + out_width][mask] = warped[mask]
+    return x + out_width / 2, y + out_height / 2
+
+
+def benchmark_feature_matching(frame_size=(1920, 1080), template_size=128,
+                               transforms=((1.0, 0), (0.75, 0), (1.25, 0), (1.0, 10)),
+                               repeats=3, confidence=0.8, seed=0):
+    """金字塔模板匹配与特征点匹配在缩放/旋转后的目标上的耗时（毫秒）和是否找到
+
+    分别在整帧和目标周围 400x400 的搜索区域内测试；found 表示匹配框中心与目标中心相差不超过 4 像素。
+    画面上另外放了一些干扰控件。当前 OpenCV 不提供的特征检测器不参与测试，在每项结果中记为 {名称}_error。
+    """
+    width, height = frame_size
+    background = synthetic_screen(width, height, seed)
+    for i in range(12):
+        x, y = (i * 150) % (width - template_size), height - template_size - (i % 3) * 140
+        background[y:y + template_size, x:x + template_size] = synthetic_widget(template_size, seed + 100 + i)
+    widget = synthetic_widget(template_size, seed + 1)
+    matchers = {"pyramid": PyramidMatcher()}
+    unavailable = {}
+    for name in FEATURE_DETECTORS:
+        try:
+            matchers[name] = FeatureMatcher(name)
+        except RuntimeError as e:
+            unavailable[f"{name}_error"] = str(e)
+            logging.warning(f"特征匹配基准测试跳过 {name.upper()}: {str(e)}")
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "widget.png")
+        cv2.imencode(".png", widget)[1].tofile(path)
+        template = TemplateCache().get(path)
+        for scale, angle in transforms:
+            frame = background.copy()
+            target_x, target_y = width // 3, height // 3
+            center = place_transformed(frame, widget, target_x, target_y, scale, angle)
+            roi = (target_x - 100, target_y - 100, 400, 400)
+            for area, (x, y, roi_width, roi_height) in (("full", (0, 0, width, height)), ("roi", roi)):
+                view = frame[y:y + roi_height, x:x + roi_width]
+                entry = dict(unavailable)
+                for name, matcher in matchers.items():
+                    timings = []
+                    for _ in range(repeats):
+                        start_ns = time.perf_counter_ns()
+                        box, score = matcher.best_match(template, view, confidence)
+                        timings.append(time.perf_counter_ns() - start_ns)
+                    found = box is not None and score >= confidence and \
+                        abs(x + box[0] + box[2] / 2 - center[0]) <= 4 and abs(y + box[1] + box[3] / 2 - center[1]) <= 4
+                    entry[f"{name}_p50_ms"] = _percentile_ms(timings, 50)
+                    entry[f"{name}_score"] = round(score, 3)
+                    entry[f"{name}_found"] = found
+                results[f"x{scale:g}.r{angle:g}.{area}"] = entry
+    return results
+
+
+def benchmark_template_set(counts=(1, 4, 16), frame_size=(1920, 1080), template_size=64, repeats=3, seed=0):
+    """多模板触发集：单线程依次匹配与线程池并行匹配的总耗时（毫秒）"""
+    width, height = frame_size
+    frame = synthetic_screen(width, height, seed)
+    rng = np.random.default_rng(seed)
+    results = {}
+    serial = TemplateSetMatcher(max_workers=1)
+    parallel = TemplateSetMatcher()
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = []
+            for i in range(max(counts)):
+                x = int(rng.integers(0, width - template_size))
+                y = int(rng.integers(0, height - template_size))
+                path = os.path.join(tmp_dir, f"template_{i}.png")
+                cv2.imencode(".png", frame[y:y + template_size, x:x + template_size])[1].tofile(path)
+                paths.append(path)
+            for count in counts:
+                timings = {"serial": [], "parallel": []}
+                for _ in range(repeats):
+                    for name, matcher in (("serial", serial), ("parallel", parallel)):
+                        matcher.match_all(paths[:count], frame, 0.9)
+                        timings[name].append(matcher.latency_ms * 1e6)
+                results[f"{count}_templates"] = {
+                    "serial_p50_ms": _percentile_ms(timings["serial"], 50),
+                    "parallel_p50_ms": _percentile_ms(timings["parallel"], 50),
+                    "workers": parallel.max_workers,
+                    "matched": sum(result.matched for result in parallel.results)
+                }
+    finally:
+        serial.close()
+        parallel.close()
+    return results
+
+
+def benchmark_change_gate(frame_size=(1920, 1080), region=None, repeats=20, seed=0):
+    """变化检测本身的开销与完整金字塔匹配的对比（毫秒）"""
+    width, height = frame_size
+    frame_array = synthetic_screen(width, height, seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "template.png")
+        cv2.imencode(".png", frame_array[height // 3:height // 3 + 64, width // 3:width // 3 + 64])[1].tofile(path)
+        template = TemplateCache().get(path)
+        matcher = PyramidMatcher()
+        gate = ChangeGate()
+        match_times, gated_times = [], []
+        for i in range(repeats):
+            # 每次都是新帧序号，但像素不变：走 CRC32 比较路径
+            frame = CapturedFrame(frame_array, i + 1, time.perf_counter_ns(), 0, 0)
+            start_ns = time.perf_counter_ns()
+            matcher(template, frame_array, 0.9)
+            match_times.append(time.perf_counter_ns() - start_ns)
+            start_ns = time.perf_counter_ns()
+            gate.run("bench", frame, region, lambda: matcher(template, frame_array, 0.9))
+            gated_times.append(time.perf_counter_ns() - start_ns)
+        results = {
+            "match_p50_ms": _percentile_ms(match_times, 50),
+            "gated_unchanged_p50_ms": _percentile_ms(gated_times[1:], 50),
+            "skip_rate": gate.skips / gate.checks
+        }
+    return results
+
+
+def benchmark_template_cache(template_sizes=(32, 128, 256), repeats=50, seed=0):
+    """对比每次从磁盘读取解码模板与命中模板缓存的耗时（毫秒）"""
+    rng = np.random.default_rng(seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in template_sizes:
+            path = os.path.join(tmp_dir, f"template_{size}.png")
+            Image.fromarray(rng.integers(0, 256, size=(size, size, 3), dtype=np.uint8)).save(path)
+            cache = TemplateCache()
+            decode, cached = [], []
+            for _ in range(repeats):
+                start_ns = time.perf_counter_ns()
+                cache.load(path, os.stat(path))
+                decode.append(time.perf_counter_ns() - start_ns)
+                start_ns = time.perf_counter_ns()
+                cache.get(path)
+                cached.append(time.perf_counter_ns() - start_ns)
+            results[f"{size}px"] = {
+                "decode_p50_ms": _percentile_ms(decode, 50),
+                "cached_p50_ms": _percentile_ms(cached, 50)
+            }
+    return results
+
+
+def benchmark_pixel_probe(repeats=10):
+    """在真实屏幕上对比整屏截图后取一个像素（ImageGrab.grab().getpixel）与 PixelProbe.pixel 的耗时（毫秒）
+
+    两者的差别在于显示服务的截屏开销，内存中的图像无法模拟，所以没有可用显示时只返回错误信息。
+    """
+    try:
+        probe = PixelProbe()
+        try:
+            screen_width, screen_height = ImageGrab.grab().size
+            x, y = screen_width // 2, screen_height // 2
+            full, probed = [], []
+            for _ in range(repeats):
+                start_ns = time.perf_counter_ns()
+                ImageGrab.grab().getpixel((x, y))
+                full.append(time.perf_counter_ns() - start_ns)
+                start_ns = time.perf_counter_ns()
+                probe.pixel(x, y)
+                probed.append(time.perf_counter_ns() - start_ns)
+        finally:
+            probe.close()
+    except Exception as e:
+        # 无显示环境（CI、无头服务器）
+        return {"error": str(e)}
+    return {
+        "method": probe.method,
+        "screen": f"{screen_width}x{screen_height}",
+        "full_grab_p50_ms": _percentile_ms(full, 50),
+        "probe_p50_ms": _percentile_ms(probed, 50)
     }
-    HELP_TEXT = """
-使用说明:
 
-"""
 
+BENCHMARK_CAPTURE_SIZES = ((1920, 1080), (2560, 1440), (3840, 2160))
 
-    @classmethod
-    def get_metadata(cls) -> dict:
-        """获取主要元数据字典"""
-        return {
-            'version': cls.VERSION,
-            'author': cls.AUTHOR,
-            'license': cls.LICENSE,
-            'url': cls.URL
-        }
 
+def _start_xvfb(width, height):
+    """启动一个指定分辨率的 Xvfb，返回 (进程, 显示名)"""
+    xvfb = shutil.which("Xvfb")
+    if xvfb is None:
+        raise RuntimeError("未找到 Xvfb")
+    for number in range(99, 160):
+        if not os.path.exists(f"/tmp/.X11-unix/X{number}") and not os.path.exists(f"/tmp/.X{number}-lock"):
+            break
+    display_name = f":{number}"
+    process = subprocess.Popen(
+        [xvfb, display_name, "-screen", "0", f"{width}x{height}x24", "-nolisten", "tcp"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.perf_counter() + 5
+    while not os.path.exists(f"/tmp/.X11-unix/X{number}"):
+        if process.poll() is not None or time.perf_counter() > deadline:
+            process.kill()
+            raise RuntimeError(f"Xvfb {display_name} 启动失败")
+        time.sleep(0.05)
+    return process, display_name
+
+
+def _measure_capture_fps(grabber, duration):
+    out = grabber.grab_into(None)
+    frames = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        out = grabber.grab_into(out)
+        frames += 1
+    return frames / (time.perf_counter() - start)
+
+
+def benchmark_capture_backends(sizes=BENCHMARK_CAPTURE_SIZES, duration=1.0):
+    """在各分辨率的 Xvfb 上测量每个截屏后端的采集帧率（帧/秒，不限速连续截屏）"""
+    results = {}
+    for width, height in sizes:
+        size_result = {}
+        try:
+            process, display_name = _start_xvfb(width, height)
+        except Exception as e:
+            results[f"{width}x{height}"] = {"error": str(e)}
+            continue
+        try:
+            for name, grabber_class in SCREEN_GRABBERS.items():
+                try:
+                    grabber = grabber_class(display_name)
+                    try:
+                        size_result[f"{name}_fps"] = _measure_capture_fps(grabber, duration)
+                    finally:
+                        grabber.close()
+                except Exception as e:
+                    size_result[f"{name}_error"] = str(e)
+        finally:
+            process.terminate()
+            process.wait(timeout=5)
+        results[f"{width}x{height}"] = size_result
+    return results
+
+
+def benchmark_macro_fidelity(actions=200, seed=0):
+    """回放合成宏，测量每个动作的实际时间与录制时间轴的偏差（毫秒）"""
+    rng = np.random.default_rng(seed)
+    delays = rng.choice([0.002, 0.005, 0.01, 0.02], size=actions).tolist()
+    macro = [{'type': 'move', 'x': i % 500, 'y': i % 300, 'time': delay} for i, delay in enumerate(delays)]
+
+    core = AsyncCore()
+    try:
+        backend = RecordingBackend()
+        core.submit(play_macro_actions(macro, backend)).result()
+    finally:
+        core.stop()
+
+    timestamps = np.array([event[0] for event in backend.events], dtype=np.int64)
+    expected = np.concatenate(([0.0], np.cumsum(delays[:-1]) * 1e9))
+    errors_ns = (timestamps - timestamps[0]) - expected
+    step_errors_ns = np.diff(timestamps) - np.asarray(delays[:-1]) * 1e9
+    return {
+        "actions": actions,
+        "step_error_p50_ms": _percentile_ms(np.abs(step_errors_ns), 50),
+        "step_error_p99_ms": _percentile_ms(np.abs(step_errors_ns), 99),
+        "cumulative_drift_ms": float(errors_ns[-1]) / 1e6,
+        "max_abs_error_ms": float(np.abs(errors_ns).max()) / 1e6
+    }
+
+
+class LatencyTargetWindow(QWidget):
+    """延迟自测的目标窗口：在已知时刻由黑变红，收到点击时记录时刻并变回黑色"""
+    TARGET_RGB = (255, 0, 0)
+
+    def __init__(self, flips, gap=(0.15, 0.4), seed=0, on_done=None):
+        super().__init__(None, Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
+        self.flips = flips
+        self.gap = gap
+        self.rng = random.Random(seed)
+        self.on_done = on_done
+        self.color = QColor(0, 0, 0)
+        self.rgb = (0, 0, 0)  # 离屏模式下触发器直接读取这个属性（整体替换，跨线程读取安全）
+        self.flip_ns = None
+        self.results = []  # (变红时刻, 收到点击时刻) perf_counter_ns
+
+    def paintEvent(self, event):
+        QPainter(self).fillRect(self.rect(), self.color)
+
+    def set_color(self, rgb):
+        self.color = QColor(*rgb)
+        self.rgb = rgb
+        self.repaint()  # 同步绘制，返回时新的颜色已经提交给显示服务
+
+    def schedule_flip(self):
+        QTimer.singleShot(int(self.rng.uniform(*self.gap) * 1000), self.flip)
+
+    def flip(self):
+        self.set_color(self.TARGET_RGB)
+        self.flip_ns = time.perf_counter_ns()
+
+    def mousePressEvent(self, event):
+        press_ns = time.perf_counter_ns()
+        if self.flip_ns is None:
+            return  # 黑色期间的点击不计入
+        self.results.append((self.flip_ns, press_ns))
+        self.flip_ns = None
+        self.set_color((0, 0, 0))
+        if len(self.results) >= self.flips:
+            if self.on_done is not None:
+                self.on_done()
+        else:
+            self.schedule_flip()
+
+
+class QtEventBackend(InputBackend):
+    """把鼠标事件作为 Qt 事件投递给指定窗口（离屏自测用，QApplication.postEvent 可以跨线程调用）"""
+    name = "qt-event"
+    supports_failsafe = False
+    BUTTONS = {"left": Qt.LeftButton, "middle": Qt.MiddleButton, "right": Qt.RightButton}
+
+    def __init__(self, widget, origin=(0, 0)):
+        self.widget = widget
+        self.origin = origin  # 窗口左上角的屏幕坐标
+        self.x, self.y = origin
+
+    def move_to(self, x, y):
+        self.x, self.y = x, y
+
+    def _post(self, kind, button, buttons):
+        local = QPointF(self.x - self.origin[0], self.y - self.origin[1])
+        QApplication.postEvent(self.widget, QMouseEvent(kind, local, self.BUTTONS[button], buttons, Qt.NoModifier))
+
+    def mouse_down(self, button):
+        self._post(QEvent.MouseButtonPress, button, self.BUTTONS[button])
+
+    def mouse_up(self, button):
+        self._post(QEvent.MouseButtonRelease, button, Qt.NoButton)
+
+    def position(self):
+        return self.x, self.y
+
+
+def run_latency_selftest(flips=20, timeout=30.0, seed=0):
+    """端到端延迟自测：目标窗口在已知时刻变红，颜色触发器和点击会话去点击它，统计从变色到窗口收到点击的时间
+
+    能启动 Xvfb 时在新的 Xvfb 上运行，经过真实的 X11 像素读取和 XTest 注入；否则使用 Qt 离屏平台，
+    像素直接读取窗口颜色、点击以 Qt 事件投递（只覆盖触发器引擎、调度和事件分发）。
+    不会在当前桌面上点击。需要在创建 QApplication 之前调用才能使用 Xvfb。
+    """
+    xvfb = None
+    mode = "offscreen"
+    if QApplication.instance() is None:
+        try:
+            xvfb, display_name = _start_xvfb(640, 480)
+            os.environ["DISPLAY"] = display_name
+            os.environ["QT_QPA_PLATFORM"] = "xcb"
+            mode = "xvfb"
+        except Exception as e:
+            logging.info(f"无法启动 Xvfb，延迟自测使用离屏模式: {str(e)}")
+            os.environ["QT_QPA_PLATFORM"] = "offscreen"
+    app = QApplication.instance() or QApplication([])
+
+    core = AsyncCore()
+    loop = QEventLoop()
+    window = LatencyTargetWindow(flips, seed=seed, on_done=loop.quit)
+    probe = backend = None
+    try:
+        window.setGeometry(0, 0, 200, 200)
+        window.show()
+        settle_end = time.perf_counter() + 0.5
+        while time.perf_counter() < settle_end:
+            app.processEvents()
+            time.sleep(0.01)
+        center = (100, 100)
+        if mode == "xvfb":
+            probe = PixelProbe()
+            backend = XTestBackend()
+
+            def check():
+                capture_ns = time.perf_counter_ns()
+                return probe.pixel(*center) == LatencyTargetWindow.TARGET_RGB, capture_ns
+        else:
+            backend = QtEventBackend(window)
+
+            def check():
+                return window.rgb == LatencyTargetWindow.TARGET_RGB, time.perf_counter_ns()
+
+        engine = TriggerEngine(core)
+        engine.add_channel("pixel", "颜色", check, lambda: True, 0.005)
+        scheduler = ClickScheduler(core)
+        engine.add_listener(scheduler.wake_waiting)
+        latency = LatencyRecorder()
+        plan = ClickPlan.compile(button="左键", interval=0.05, position_mode=1, fixed_position=center)
+        session = ClickSession(
+            "延迟自测", plan, backend,
+            trigger_check=engine.is_satisfied, trigger_retry=TriggerEngine.EDGE_FALLBACK_INTERVAL,
+            trigger_state=lambda: engine.state, latency=latency
+        )
+        engine.acquire()
+        scheduler.add_session(session)
+        window.schedule_flip()
+        QTimer.singleShot(int(timeout * 1000), loop.quit)
+        loop.exec_()
+        scheduler.stop_all()
+        engine.release()
+    finally:
+        core.stop()
+        window.close()
+        if backend is not None:
+            backend.close()
+        if probe is not None:
+            probe.close()
+        if xvfb is not None:
+            xvfb.terminate()
+            xvfb.wait()
+
+    delays_ms = np.array([press_ns - flip_ns for flip_ns, press_ns in window.results], dtype=np.int64) / 1e6
+    result = {"mode": mode, "backend": backend.name if backend is not None else None,
+              "flips": len(window.results), "requested": flips, "stages": latency.report()}
+    if len(delays_ms):
+        result.update({
+            "flip_to_click_p50_ms": float(np.percentile(delays_ms, 50)),
+            "flip_to_click_p99_ms": float(np.percentile(delays_ms, 99)),
+            "flip_to_click_max_ms": float(delays_ms.max()),
+            "histogram": dict(zip(LatencyRecorder.histogram_labels(),
+                                  (int(c) for c in LatencyRecorder.histogram(delays_ms))))
+        })
+    return result
+
+
+# 指标名 -> (单位, 越大越好?)，用于判断回归方向
+BENCHMARK_METRICS = {
+    "click.legacy_ns_per_iteration": ("ns", False),
+    "click.plan_ns_per_iteration": ("ns", False),
+    "click.max_cps": ("cps", True),
+    "capture.1920x1080.xshm_fps": ("fps", True),
+    "capture.1920x1080.pil_fps": ("fps", True),
+    "capture.2560x1440.xshm_fps": ("fps", True),
+    "capture.2560x1440.pil_fps": ("fps", True),
+    "capture.3840x2160.xshm_fps": ("fps", True),
+    "capture.3840x2160.pil_fps": ("fps", True),
+    "macro.step_error_p50_ms": ("ms", False),
+    "macro.step_error_p99_ms": ("ms", False),
+    "macro.cumulative_drift_ms": ("ms", False),
+}
+
+
+def run_benchmarks(quick=False, capture=False, latency=False):
+    """运行全部基准测试，返回可序列化为 JSON 的结果
+
+    capture=True 时额外在 Xvfb 上测量各截屏后端的帧率（需要安装 Xvfb），
+    latency=True 时运行端到端延迟自测（见 run_latency_selftest）。
+    """
+    iterations = 5000 if quick else 20000
+    repeats = 5 if quick else 20
+    # 开销类测试取多次运行中的最小值，它受调度抖动的影响最小，便于跨次比较
+    overhead = [benchmark_click_plan(iterations) for _ in range(5)]
+    cps = benchmark_max_cps(0.3 if quick else 1.0)
+    triggers = benchmark_trigger_check(repeats=repeats)
+    probes = benchmark_pixel_probe(repeats=repeats)
+    templates = benchmark_template_cache(repeats=repeats * 2)
+    matching = benchmark_template_matching(repeats=3 if quick else 5)
+    features = benchmark_feature_matching(repeats=2 if quick else 5)
+    template_sets = benchmark_template_set(repeats=2 if quick else 3)
+    gating = benchmark_change_gate(repeats=repeats)
+    expressions = benchmark_trigger_expression(repeats=repeats)
+    macro = benchmark_macro_fidelity(50 if quick else 200)
+    captures = benchmark_capture_backends(duration=0.3 if quick else 1.0) if capture else {}
+    selftest = run_latency_selftest(flips=10 if quick else 30) if latency else {}
+
+    metrics = {
+        "click.legacy_ns_per_iteration": min(r["legacy_ns_per_iteration"] for r in overhead),
+        "click.plan_ns_per_iteration": min(r["plan_ns_per_iteration"] for r in overhead),
+        "click.max_cps": cps["max_cps"],
+        "macro.step_error_p50_ms": macro["step_error_p50_ms"],
+        "macro.step_error_p99_ms": macro["step_error_p99_ms"],
+        "macro.cumulative_drift_ms": abs(macro["cumulative_drift_ms"]),
+    }
+    for size, values in triggers.items():
+        for key, value in values.items():
+            metrics[f"trigger.{size}.{key}"] = value
+    for key, value in probes.items():
+        if key.endswith("_ms"):
+            metrics[f"probe.live.{key}"] = value
+    for case, values in matching.items():
+        for key, value in values.items():
+            if key.endswith("_ms"):
+                metrics[f"matching.{case}.{key}"] = value
+    for case, values in features.items():
+        for key, value in values.items():
+            if key.endswith("_ms"):
+                metrics[f"feature.{case}.{key}"] = value
+    metrics["gate.match_p50_ms"] = gating["match_p50_ms"]
+    metrics["gate.gated_unchanged_p50_ms"] = gating["gated_unchanged_p50_ms"]
+    for key, value in expressions.items():
+        metrics[f"expression.{key}"] = value
+    for case, values in template_sets.items():
+        for key, value in values.items():
+            if key.endswith("_ms"):
+                metrics[f"template_set.{case}.{key}"] = value
+    for size, values in templates.items():
+        for key, value in values.items():
+            metrics[f"template.{size}.{key}"] = value
+    for size, values in captures.items():
+        for key, value in values.items():
+            if key.endswith("_fps"):
+                metrics[f"capture.{size}.{key}"] = value
+    for key, value in selftest.items():
+        if key.endswith("_ms"):
+            metrics[f"latency.{selftest['mode']}.{key}"] = value
+
+    return {
+        "version": ProjectInfo.VERSION,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "quick": quick,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count()
+        },
+        "metrics": metrics,
+        "details": {"click_overhead": overhead, "max_cps": cps, "trigger_check": triggers,
+                    "pixel_probe": probes, "template_cache": templates,
+                    "matching": matching, "feature_matching": features, "template_set": template_sets,
+                    "change_gate": gating, "expression": expressions, "capture": captures, "macro": macro,
+                    "latency": selftest}
+    }
+
+
+def compare_benchmarks(current, baseline, tolerance=0.2):
+    """与基准结果比较，返回回归列表 [(指标, 基准值, 当前值, 变化比例)]"""
+    regressions = []
+    for name, value in current["metrics"].items():
+        base = baseline.get("metrics", {}).get(name)
+        if base is None or base <= 0:
+            continue
+        higher_is_better = BENCHMARK_METRICS.get(name, ("ms", False))[1]
+        change = (value - base) / base
+        if (change < -tolerance) if higher_is_better else (change > tolerance):
+            regressions.append((name, base, value, change))
+    return regressions
+
+
+def benchmark_main(argv=None):
+    """命令行入口: --benchmark [--quick] [--capture] [--latency] [--output 结果.json] [--baseline 基准.json] [--tolerance 0.2]"""
+    parser = argparse.ArgumentParser(description=f"{ProjectInfo.NAME} 基准测试")
+    parser.add_argument("--benchmark", action="store_true")
+    parser.add_argument("--quick", action="store_true", help="缩短运行时间（结果波动更大）")
+    parser.add_argument("--capture", action="store_true", help="在 Xvfb 上测量截屏后端帧率（1080p/1440p/4K）")
+    parser.add_argument("--latency", action="store_true",
+                        help="运行端到端延迟自测（Xvfb 上的目标窗口变色后多久收到点击，无 Xvfb 时使用离屏模式）")
+    parser.add_argument("--output", help="把结果写入 JSON 文件")
+    parser.add_argument("--baseline", help="与之前保存的 JSON 结果比较，出现回归时返回非零退出码")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许的相对变化（默认 0.2）")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(quick=args.quick, capture=args.capture, latency=args.latency)
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_benchmarks(results, baseline, args.tolerance)
+        for name, base, value, change in regressions:
+            print(f"性能回归: {name} {base:.4g} -> {value:.4g} ({change:+.1%})", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+MAIN_SESSION_NAME = "主会话"
 
-    @classmethod
-    def get_header(cls) -> str:
-        """生成标准化的项目头信息"""
-        return f"{cls.NAME} {cls.VERSION} | {cls.LICENSE} License | {cls.URL}"
 
 class MouseClickSimulator(QMainWindow):
+    # 会话在异步核心线程中结束，通过信号回到界面线程处理
+    session_finished = pyqtSignal(object)
+    # 远程控制命令需要在界面线程中执行
+    remote_command = pyqtSignal(str)
+
     def __init__(self):
         super().__init__()
         # self.setWindowTitle(f"高级鼠标点击模拟器 v{__version__}")
@@ -109,7 +4277,37 @@ class MouseClickSimulator(QMainWindow):
         
         # 初始化变量
         self.clicking = False
-        self.click_thread = None
+        self.core = AsyncCore()
+        self.macro_recorder = MacroRecorder(self.core)
+        self.image_searcher = ImageSearcher()
+        self.template_set_matcher = TemplateSetMatcher()
+        # 特征匹配器各自缓存模板描述子，按触发器设置选用；金字塔匹配使用两者自带的匹配器
+        self.feature_matchers = {name: FeatureMatcher(name) for name in FEATURE_DETECTORS
+                                 if feature_detector_available(name)}
+        self.change_gate = ChangeGate()
+        self.capture_service = FrameCaptureService(
+            fps=self.settings.value("advanced/capture_fps", 30, type=int),
+            grabber=create_screen_grabber(self.settings.value("advanced/capture_backend", "auto"))
+        )
+        self.scheduler = ClickScheduler(self.core)
+        self.trigger_engine = TriggerEngine(self.core)
+        for group, name, interval in (
+            ("timer", "定时", 0.2),
+            ("pixel", "颜色", self.settings.value("advanced/pixel_trigger_interval", 20, type=int) / 1000),
+            ("image", "图像", self.settings.value("advanced/image_trigger_interval", 100, type=int) / 1000),
+            ("expression", "表达式", self.settings.value("advanced/expression_trigger_interval", 20, type=int) / 1000),
+        ):
+            check = self.check_expression if group == "expression" else functools.partial(self.sample_triggers, group)
+            self.trigger_engine.add_channel(
+                group, name, check,
+                functools.partial(lambda group: self.trigger_config.group_enabled(group), group), interval,
+                wake_after=self.seconds_until_schedule_change if group == "timer" else None
+            )
+        self.trigger_engine.add_listener(self.scheduler.wake_waiting)
+        self.latency_recorder = LatencyRecorder()
+        self.compiled_expression = (None, None)  # (表达式文本, TriggerExpression)，文本不变时保留求值状态
+        self.main_session = None
+        self.session_counter = 0
         self.click_count = 0
         self.emergency_stop = False
         self.mouse_positions = []
@@ -120,13 +4318,17 @@ class MouseClickSimulator(QMainWindow):
         self.timer_trigger_active = False
         self.remote_control_active = False
         self.remote_server = None
-        self.remote_thread = None
         self.script_engine = None
         self.tray_icon = None
+        self.input_backend = None
+        self.stop_event = threading.Event()
+        self.session_stats = None
         
         # 初始化UI
         self.init_ui()
         self.setup_hotkeys()
+        self.session_finished.connect(self.on_session_finished)
+        self.remote_command.connect(self.handle_remote_command)
 
         # 只在系统托盘可用时初始化
         if QSystemTrayIcon.isSystemTrayAvailable():
@@ -467,6 +4669,29 @@ class MouseClickSimulator(QMainWindow):
         hold_row.addStretch()
         button_layout.addLayout(hold_row)
         
+        # 点击时序设置（各模式内部事件之间的间隔）
+        timing_row = QHBoxLayout()
+        timing_row.addWidget(QLabel("双击间隔:"))
+        self.double_click_interval_spin = QSpinBox()
+        self.double_click_interval_spin.setRange(0, 1000)
+        self.double_click_interval_spin.setValue(self.settings.value("basic/double_click_interval", 0, type=int))
+        self.double_click_interval_spin.setSuffix("ms")
+        timing_row.addWidget(self.double_click_interval_spin)
+        timing_row.addWidget(QLabel("三连击间隔:"))
+        self.triple_click_interval_spin = QSpinBox()
+        self.triple_click_interval_spin.setRange(0, 1000)
+        self.triple_click_interval_spin.setValue(self.settings.value("basic/triple_click_interval", 100, type=int))
+        self.triple_click_interval_spin.setSuffix("ms")
+        timing_row.addWidget(self.triple_click_interval_spin)
+        timing_row.addWidget(QLabel("组合键按住:"))
+        self.combo_hold_spin = QSpinBox()
+        self.combo_hold_spin.setRange(0, 10000)
+        self.combo_hold_spin.setValue(self.settings.value("basic/combo_hold", 50, type=int))
+        self.combo_hold_spin.setSuffix("ms")
+        timing_row.addWidget(self.combo_hold_spin)
+        timing_row.addStretch()
+        button_layout.addLayout(timing_row)
+        
         button_group.setLayout(button_layout)
         layout.addWidget(button_group)
         
@@ -589,6 +4814,34 @@ class MouseClickSimulator(QMainWindow):
         position_group.setLayout(position_layout)
         layout.addWidget(position_group)
         
+        # === 并发点击会话 ===
+        session_group = QGroupBox("并发点击会话")
+        session_layout = QVBoxLayout()
+        session_layout.setSpacing(5)
+        
+        session_layout.addWidget(QLabel("以上方当前设置添加独立会话，所有会话由同一个调度线程驱动:"))
+        self.session_table = QTableWidget(0, 6)
+        self.session_table.setHorizontalHeaderLabels(["名称", "按键/间隔", "点击次数", "实际速率", "迟到 p99", "重新对齐"])
+        self.session_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.session_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.session_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.session_table.setMinimumHeight(120)
+        session_layout.addWidget(self.session_table)
+        
+        session_btn_row = QHBoxLayout()
+        self.add_session_btn = QPushButton("添加会话")
+        self.add_session_btn.clicked.connect(self.add_click_session)
+        session_btn_row.addWidget(self.add_session_btn)
+        
+        self.remove_session_btn = QPushButton("移除选中会话")
+        self.remove_session_btn.clicked.connect(self.remove_click_session)
+        session_btn_row.addWidget(self.remove_session_btn)
+        session_btn_row.addStretch()
+        session_layout.addLayout(session_btn_row)
+        
+        session_group.setLayout(session_layout)
+        layout.addWidget(session_group)
+        
         # 添加拉伸项使内容顶部对齐
         layout.addStretch()
 
@@ -691,6 +4944,107 @@ class MouseClickSimulator(QMainWindow):
         test_layout.addWidget(self.report_check)
         test_group.setLayout(test_layout)
         
+        # === 点击引擎设置 ===
+        engine_group = QGroupBox("点击引擎设置")
+        engine_layout = QVBoxLayout()
+        engine_layout.setSpacing(5)
+        
+        backend_row = QHBoxLayout()
+        backend_row.addWidget(QLabel("输入后端:"))
+        self.input_backend_combo = QComboBox()
+        self.input_backend_combo.addItems(list(INPUT_BACKENDS.keys()))
+        self.input_backend_combo.setCurrentText(self.settings.value("advanced/input_backend", "pyautogui"))
+        backend_row.addWidget(self.input_backend_combo)
+        backend_row.addStretch()
+        
+        injection_row = QHBoxLayout()
+        injection_row.addWidget(QLabel("注入模式:"))
+        self.injection_mode_combo = QComboBox()
+        self.injection_mode_combo.addItems(["标准 (pyautogui 内置暂停和 failsafe)", "原始 (无内置暂停，紧急停止保护)"])
+        self.injection_mode_combo.setCurrentIndex(self.settings.value("advanced/injection_mode", 0, type=int))
+        injection_row.addWidget(self.injection_mode_combo)
+        injection_row.addStretch()
+        
+        jitter_row = QHBoxLayout()
+        jitter_row.addWidget(QLabel("随机分布:"))
+        self.jitter_distribution_combo = QComboBox()
+        self.jitter_distribution_combo.addItems(list(JITTER_DISTRIBUTION_NAMES.keys()))
+        self.jitter_distribution_combo.setCurrentIndex(self.settings.value("advanced/jitter_distribution", 0, type=int))
+        jitter_row.addWidget(self.jitter_distribution_combo)
+        
+        jitter_row.addSpacing(15)
+        jitter_row.addWidget(QLabel("随机种子:"))
+        self.jitter_seed_spin = QSpinBox()
+        # 最小值 -1 显示为"不固定"，0 也是可以复现的种子
+        self.jitter_seed_spin.setRange(-1, 2147483647)
+        self.jitter_seed_spin.setSpecialValueText("不固定")
+        self.jitter_seed_spin.setValue(self.settings.value("advanced/jitter_seed", -1, type=int))
+        jitter_row.addWidget(self.jitter_seed_spin)
+        jitter_row.addStretch()
+        
+        capture_row = QHBoxLayout()
+        capture_row.addWidget(QLabel("画面采集帧率:"))
+        self.capture_fps_spin = QSpinBox()
+        self.capture_fps_spin.setRange(1, 240)
+        self.capture_fps_spin.setValue(self.settings.value("advanced/capture_fps", 30, type=int))
+        self.capture_fps_spin.setSuffix(" FPS")
+        self.capture_fps_spin.valueChanged.connect(self.capture_service.set_fps)
+        capture_row.addWidget(self.capture_fps_spin)
+        
+        capture_row.addSpacing(15)
+        capture_row.addWidget(QLabel("截屏后端:"))
+        self.capture_backend_combo = QComboBox()
+        self.capture_backend_combo.addItems(["auto"] + list(SCREEN_GRABBERS))
+        self.capture_backend_combo.setCurrentText(self.settings.value("advanced/capture_backend", "auto"))
+        self.capture_backend_combo.setToolTip("auto: Linux/X11 下使用 XShm 共享内存截屏，不可用时退回 PIL")
+        self.capture_backend_combo.currentTextChanged.connect(
+            lambda name: self.capture_service.set_grabber(create_screen_grabber(name))
+        )
+        capture_row.addWidget(self.capture_backend_combo)
+        capture_row.addStretch()
+        
+        engine_layout.addLayout(backend_row)
+        engine_layout.addLayout(injection_row)
+        engine_layout.addLayout(jitter_row)
+        trigger_rate_row = QHBoxLayout()
+        trigger_rate_row.addWidget(QLabel("颜色类触发器检查间隔:"))
+        self.pixel_trigger_interval_spin = QSpinBox()
+        self.pixel_trigger_interval_spin.setRange(1, 5000)
+        self.pixel_trigger_interval_spin.setSuffix(" ms")
+        self.pixel_trigger_interval_spin.setValue(self.settings.value("advanced/pixel_trigger_interval", 20, type=int))
+        self.pixel_trigger_interval_spin.valueChanged.connect(
+            lambda value: self.trigger_engine.set_interval("pixel", value / 1000)
+        )
+        trigger_rate_row.addWidget(self.pixel_trigger_interval_spin)
+        
+        trigger_rate_row.addSpacing(15)
+        trigger_rate_row.addWidget(QLabel("图像类:"))
+        self.image_trigger_interval_spin = QSpinBox()
+        self.image_trigger_interval_spin.setRange(1, 5000)
+        self.image_trigger_interval_spin.setSuffix(" ms")
+        self.image_trigger_interval_spin.setValue(self.settings.value("advanced/image_trigger_interval", 100, type=int))
+        self.image_trigger_interval_spin.valueChanged.connect(
+            lambda value: self.trigger_engine.set_interval("image", value / 1000)
+        )
+        trigger_rate_row.addWidget(self.image_trigger_interval_spin)
+        
+        trigger_rate_row.addSpacing(15)
+        trigger_rate_row.addWidget(QLabel("表达式:"))
+        self.expression_trigger_interval_spin = QSpinBox()
+        self.expression_trigger_interval_spin.setRange(1, 5000)
+        self.expression_trigger_interval_spin.setSuffix(" ms")
+        self.expression_trigger_interval_spin.setValue(
+            self.settings.value("advanced/expression_trigger_interval", 20, type=int))
+        self.expression_trigger_interval_spin.valueChanged.connect(
+            lambda value: self.trigger_engine.set_interval("expression", value / 1000)
+        )
+        trigger_rate_row.addWidget(self.expression_trigger_interval_spin)
+        trigger_rate_row.addStretch()
+        
+        engine_layout.addLayout(capture_row)
+        engine_layout.addLayout(trigger_rate_row)
+        engine_group.setLayout(engine_layout)
+        
         # === 系统设置 ===
         system_group = QGroupBox("系统设置")
         system_layout = QVBoxLayout()
@@ -708,6 +5062,7 @@ class MouseClickSimulator(QMainWindow):
         # 添加到主布局
         layout.addWidget(game_group)
         layout.addWidget(test_group)
+        layout.addWidget(engine_group)
         layout.addWidget(system_group)
         
         # 添加拉伸项使内容顶部对齐
@@ -787,6 +5142,84 @@ class MouseClickSimulator(QMainWindow):
         color_layout.addWidget(self.color_preview)
         color_group.setLayout(color_layout)
         
+        # === 区域颜色触发器 ===
+        area_group = QGroupBox("区域颜色触发器")
+        area_layout = QVBoxLayout()
+        area_layout.setSpacing(5)
+        
+        self.area_trigger_check = QCheckBox("启用区域颜色触发 (整个矩形一次向量化检查)")
+        self.area_trigger_check.setChecked(self.settings.value("trigger/area_trigger", False, type=bool))
+        
+        area_region_row = QHBoxLayout()
+        area_region_row.addWidget(QLabel("检测区域:"))
+        self.area_region_edit = QLineEdit(self.settings.value("trigger/area_region", "0,0,200,200"))
+        self.area_region_edit.setPlaceholderText("x,y,宽,高")
+        area_region_row.addWidget(self.area_region_edit)
+        
+        area_color_row = QHBoxLayout()
+        self.area_color_btn = QPushButton("选择区域目标颜色")
+        self.area_color_btn.clicked.connect(self.select_area_color)
+        self.area_color = QColor(self.settings.value("trigger/area_color", "#FF0000"))
+        self.area_color_preview = QLabel()
+        self.area_color_preview.setFixedSize(30, 30)
+        self.update_area_color_preview()
+        area_color_row.addWidget(self.area_color_btn)
+        area_color_row.addWidget(self.area_color_preview)
+        area_color_row.addWidget(QLabel("容差:"))
+        self.area_tolerance_spin = QSpinBox()
+        self.area_tolerance_spin.setRange(0, 765)
+        self.area_tolerance_spin.setValue(self.settings.value("trigger/area_tolerance", 30, type=int))
+        area_color_row.addWidget(self.area_tolerance_spin)
+        area_color_row.addStretch()
+        
+        area_mode_row = QHBoxLayout()
+        area_mode_row.addWidget(QLabel("触发条件:"))
+        self.area_mode_combo = QComboBox()
+        self.area_mode_combo.addItems(list(AREA_COLOR_MODES))
+        self.area_mode_combo.setCurrentIndex(self.settings.value("trigger/area_mode", 2, type=int))
+        area_mode_row.addWidget(self.area_mode_combo)
+        self.area_percent_spin = QDoubleSpinBox()
+        self.area_percent_spin.setRange(0.1, 100.0)
+        self.area_percent_spin.setSuffix(" %")
+        self.area_percent_spin.setValue(self.settings.value("trigger/area_percent", 50.0, type=float))
+        self.area_percent_spin.setEnabled(AREA_COLOR_MODES[self.area_mode_combo.currentText()] == "ratio")
+        self.area_mode_combo.currentTextChanged.connect(
+            lambda text: self.area_percent_spin.setEnabled(AREA_COLOR_MODES[text] == "ratio"))
+        area_mode_row.addWidget(self.area_percent_spin)
+        area_mode_row.addStretch()
+        
+        area_layout.addWidget(self.area_trigger_check)
+        area_layout.addLayout(area_region_row)
+        area_layout.addLayout(area_color_row)
+        area_layout.addLayout(area_mode_row)
+        area_group.setLayout(area_layout)
+        
+        # === 像素签名触发器 ===
+        signature_group = QGroupBox("像素签名触发器")
+        signature_layout = QVBoxLayout()
+        signature_layout.setSpacing(5)
+        
+        self.signature_trigger_check = QCheckBox("启用像素签名触发 (所有点同时符合时触发)")
+        self.signature_trigger_check.setChecked(self.settings.value("trigger/signature_trigger", False, type=bool))
+        
+        self.signature_edit = QTextEdit()
+        self.signature_edit.setPlainText(self.settings.value("trigger/signature_points", ""))
+        self.signature_edit.setPlaceholderText("每行一个点: x,y,#RRGGBB[,容差]")
+        self.signature_edit.setMaximumHeight(100)
+        
+        signature_btn_row = QHBoxLayout()
+        self.sample_signature_btn = QPushButton("读取当前屏幕颜色")
+        self.sample_signature_btn.clicked.connect(self.sample_signature_colors)
+        signature_btn_row.addWidget(self.sample_signature_btn)
+        self.signature_status_label = QLabel("")
+        signature_btn_row.addWidget(self.signature_status_label)
+        signature_btn_row.addStretch()
+        
+        signature_layout.addWidget(self.signature_trigger_check)
+        signature_layout.addWidget(self.signature_edit)
+        signature_layout.addLayout(signature_btn_row)
+        signature_group.setLayout(signature_layout)
+        
         # === 图像触发器 ===
         image_group = QGroupBox("图像触发器")
         image_layout = QVBoxLayout()
@@ -812,6 +5245,35 @@ class MouseClickSimulator(QMainWindow):
         self.confidence_spin.setValue(self.settings.value("trigger/confidence", 0.9, type=float))
         self.confidence_spin.setSingleStep(0.05)
         
+        region_row = QHBoxLayout()
+        self.image_region_check = QCheckBox("限定搜索区域")
+        self.image_region_check.setChecked(self.settings.value("trigger/image_region_enabled", False, type=bool))
+        self.image_region_edit = QLineEdit(self.settings.value("trigger/image_region", "0,0,800,600"))
+        self.image_region_edit.setPlaceholderText("x,y,宽,高")
+        self.image_region_edit.setEnabled(self.image_region_check.isChecked())
+        self.image_region_check.toggled.connect(self.image_region_edit.setEnabled)
+        region_row.addWidget(self.image_region_check)
+        region_row.addWidget(self.image_region_edit)
+        
+        self.image_locality_check = QCheckBox("优先在上次匹配位置附近搜索")
+        self.image_locality_check.setChecked(self.settings.value("trigger/image_locality", False, type=bool))
+        
+        self.image_grayscale_check = QCheckBox("灰度匹配 (更快，忽略颜色差异)")
+        self.image_grayscale_check.setChecked(self.settings.value("trigger/image_grayscale", False, type=bool))
+        
+        matcher_row = QHBoxLayout()
+        matcher_row.addWidget(QLabel("匹配方式:"))
+        self.image_matcher_combo = QComboBox()
+        for text, name in IMAGE_MATCHERS.items():
+            if name == "pyramid" or feature_detector_available(name):
+                self.image_matcher_combo.addItem(text, name)
+        self.image_matcher_combo.setCurrentIndex(
+            max(0, self.image_matcher_combo.findData(self.settings.value("trigger/image_matcher", "pyramid"))))
+        self.image_matcher_combo.setToolTip("特征点匹配能找到因 DPI 或缩放而变大变小、或略有旋转的目标，"
+                                            "建议配合限定搜索区域使用；多模板触发集也使用这里的设置")
+        matcher_row.addWidget(self.image_matcher_combo)
+        matcher_row.addStretch()
+        
         self.image_preview = QLabel()
         self.image_preview.setFixedSize(100, 100)
         self.update_image_preview()
@@ -822,10 +5284,52 @@ class MouseClickSimulator(QMainWindow):
         image_layout.addWidget(self.capture_area_btn)
         image_layout.addWidget(QLabel("匹配置信度:"))
         image_layout.addWidget(self.confidence_spin)
+        image_layout.addLayout(region_row)
+        image_layout.addWidget(self.image_locality_check)
+        image_layout.addWidget(self.image_grayscale_check)
+        image_layout.addLayout(matcher_row)
         image_layout.addWidget(QLabel("目标图像预览:"))
         image_layout.addWidget(self.image_preview)
         image_group.setLayout(image_layout)
         
+        # === 多模板触发集 ===
+        template_set_group = QGroupBox("多模板触发集")
+        template_set_layout = QVBoxLayout()
+        template_set_layout.setSpacing(5)
+        
+        self.template_set_check = QCheckBox("启用多模板触发 (同一帧上并行匹配)")
+        self.template_set_check.setChecked(self.settings.value("trigger/template_set_enabled", False, type=bool))
+        
+        self.template_paths_edit = QTextEdit()
+        self.template_paths_edit.setPlainText(self.settings.value("trigger/template_paths", ""))
+        self.template_paths_edit.setMaximumHeight(80)
+        
+        template_btn_row = QHBoxLayout()
+        self.add_templates_btn = QPushButton("添加图像...")
+        self.add_templates_btn.clicked.connect(self.add_template_images)
+        template_btn_row.addWidget(self.add_templates_btn)
+        template_btn_row.addWidget(QLabel("触发条件:"))
+        self.template_set_mode_combo = QComboBox()
+        self.template_set_mode_combo.addItems(list(TEMPLATE_SET_MODES))
+        self.template_set_mode_combo.setCurrentIndex(self.settings.value("trigger/template_set_mode", 0, type=int))
+        template_btn_row.addWidget(self.template_set_mode_combo)
+        template_btn_row.addStretch()
+        
+        self.template_result_table = QTableWidget(0, 5)
+        self.template_result_table.setHorizontalHeaderLabels(["模板", "结果", "位置", "得分", "耗时"])
+        self.template_result_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.template_result_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.template_result_table.setMinimumHeight(120)
+        self.template_latency_label = QLabel("总耗时: -")
+        
+        template_set_layout.addWidget(self.template_set_check)
+        template_set_layout.addWidget(QLabel("模板图像 (每行一个路径，共用上方的置信度、灰度和搜索区域设置):"))
+        template_set_layout.addWidget(self.template_paths_edit)
+        template_set_layout.addLayout(template_btn_row)
+        template_set_layout.addWidget(self.template_result_table)
+        template_set_layout.addWidget(self.template_latency_label)
+        template_set_group.setLayout(template_set_layout)
+        
         # === 定时触发器 ===
         timer_group = QGroupBox("定时触发器")
         timer_layout = QVBoxLayout()
@@ -851,15 +5355,88 @@ class MouseClickSimulator(QMainWindow):
         time_row2.addWidget(self.end_time_edit)
         time_row2.addStretch()
         
+        self.schedule_check = QCheckBox("使用计划规则 (代替上面的每日时间段)")
+        self.schedule_check.setChecked(self.settings.value("trigger/schedule_enabled", False, type=bool))
+        self.schedule_edit = QTextEdit()
+        self.schedule_edit.setPlaceholderText(
+            "每行一条规则，例如:\n"
+            "09:00-18:00\n"
+            "周一-周五 09:00-12:00\n"
+            "周六,周日 22:00-02:00\n"
+            "cron */15 9-17 * * 1-5 5m"
+        )
+        self.schedule_edit.setPlainText(self.settings.value("trigger/schedule_rules", ""))
+        self.schedule_edit.setMaximumHeight(90)
+        self.schedule_status_label = QLabel("")
+        self.schedule_status_label.setWordWrap(True)
+        
         timer_layout.addWidget(self.timer_trigger_check)
         timer_layout.addLayout(time_row1)
         timer_layout.addLayout(time_row2)
+        timer_layout.addWidget(self.schedule_check)
+        timer_layout.addWidget(self.schedule_edit)
+        timer_layout.addWidget(self.schedule_status_label)
         timer_group.setLayout(timer_layout)
         
+        # === 触发表达式 ===
+        expression_group = QGroupBox("触发表达式")
+        expression_layout = QVBoxLayout()
+        expression_layout.setSpacing(5)
+        
+        self.expression_check = QCheckBox("使用表达式组合触发器 (代替默认的全部满足)")
+        self.expression_check.setChecked(self.settings.value("trigger/expression_enabled", False, type=bool))
+        self.expression_edit = QLineEdit(self.settings.value("trigger/expression", ""))
+        self.expression_edit.setPlaceholderText("例如: timer and (color or not image) and hold(signature, 200)")
+        self.expression_status_label = QLabel("")
+        self.expression_status_label.setWordWrap(True)
+        
+        expression_layout.addWidget(self.expression_check)
+        expression_layout.addWidget(QLabel(
+            "触发器: timer/定时, color/颜色, area/区域, signature/签名, image/图像, templates/模板集 "
+            "(使用各自的设置，不受启用开关影响)\n"
+            "运算: and, or, not, debounce(x, 毫秒), hold(x, 毫秒), rising(x), falling(x)"
+        ))
+        expression_layout.addWidget(self.expression_edit)
+        expression_layout.addWidget(self.expression_status_label)
+        expression_group.setLayout(expression_layout)
+        
         # 添加到主布局
         layout.addWidget(color_group)
+        layout.addWidget(area_group)
+        layout.addWidget(signature_group)
         layout.addWidget(image_group)
+        layout.addWidget(template_set_group)
         layout.addWidget(timer_group)
+        layout.addWidget(expression_group)
+        
+        # 任何触发器设置变化都重新生成设置快照
+        self.color_x_spin.valueChanged.connect(self.update_trigger_status)
+        self.color_y_spin.valueChanged.connect(self.update_trigger_status)
+        self.color_tolerance_spin.valueChanged.connect(self.update_trigger_status)
+        self.area_trigger_check.stateChanged.connect(self.update_trigger_status)
+        self.area_region_edit.textChanged.connect(self.update_trigger_status)
+        self.area_tolerance_spin.valueChanged.connect(self.update_trigger_status)
+        self.area_mode_combo.currentIndexChanged.connect(self.update_trigger_status)
+        self.area_percent_spin.valueChanged.connect(self.update_trigger_status)
+        self.signature_trigger_check.stateChanged.connect(self.update_trigger_status)
+        self.signature_edit.textChanged.connect(self.update_trigger_status)
+        self.image_path_edit.textChanged.connect(self.update_trigger_status)
+        self.confidence_spin.valueChanged.connect(self.update_trigger_status)
+        self.image_region_check.stateChanged.connect(self.update_trigger_status)
+        self.image_region_edit.textChanged.connect(self.update_trigger_status)
+        self.image_locality_check.stateChanged.connect(self.update_trigger_status)
+        self.image_grayscale_check.stateChanged.connect(self.update_trigger_status)
+        self.image_matcher_combo.currentIndexChanged.connect(self.update_trigger_status)
+        self.template_set_check.stateChanged.connect(self.update_trigger_status)
+        self.template_paths_edit.textChanged.connect(self.update_trigger_status)
+        self.template_set_mode_combo.currentIndexChanged.connect(self.update_trigger_status)
+        self.start_time_edit.timeChanged.connect(self.update_trigger_status)
+        self.end_time_edit.timeChanged.connect(self.update_trigger_status)
+        self.schedule_check.stateChanged.connect(self.update_trigger_status)
+        self.schedule_edit.textChanged.connect(self.update_trigger_status)
+        self.expression_check.stateChanged.connect(self.update_trigger_status)
+        self.expression_edit.textChanged.connect(self.update_trigger_status)
+        self.update_trigger_status()
         
         # 添加拉伸项使内容顶部对齐
         layout.addStretch()
@@ -1121,6 +5698,13 @@ class MouseClickSimulator(QMainWindow):
         monitor_layout.setSpacing(5)
         
         self.click_count_label = QLabel("点击次数: 0")
+        self.click_rate_label = QLabel("点击速率: -")
+        self.capture_label = QLabel("画面采集: 未运行")
+        self.template_cache_label = QLabel("模板缓存: -")
+        self.image_search_label = QLabel("图像搜索: -")
+        self.trigger_engine_label = QLabel("触发器: -")
+        self.trigger_engine_label.setWordWrap(True)
+        self.change_gate_label = QLabel("变化检测: -")
         self.mouse_position_label = QLabel("鼠标位置: (0, 0)")
         self.cpu_usage_label = QLabel("CPU使用率: 0%")
         self.memory_usage_label = QLabel("内存使用: 0MB")
@@ -1152,6 +5736,12 @@ class MouseClickSimulator(QMainWindow):
         """)
         
         monitor_layout.addWidget(self.click_count_label)
+        monitor_layout.addWidget(self.click_rate_label)
+        monitor_layout.addWidget(self.capture_label)
+        monitor_layout.addWidget(self.template_cache_label)
+        monitor_layout.addWidget(self.image_search_label)
+        monitor_layout.addWidget(self.trigger_engine_label)
+        monitor_layout.addWidget(self.change_gate_label)
         monitor_layout.addWidget(self.mouse_position_label)
         monitor_layout.addWidget(self.cpu_usage_label)
         monitor_layout.addWidget(self.cpu_usage_bar)
@@ -1186,6 +5776,22 @@ class MouseClickSimulator(QMainWindow):
         
         monitor_group.setLayout(monitor_layout)
         
+        # === 端到端延迟 ===
+        latency_group = QGroupBox("触发点击端到端延迟")
+        latency_layout = QVBoxLayout()
+        self.latency_table = QTableWidget(0, 6)
+        self.latency_table.setHorizontalHeaderLabels(["阶段", "样本", "p50", "p99", "最大", "分布"])
+        self.latency_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.latency_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.latency_table.setMinimumHeight(140)
+        self.latency_table.setToolTip("分布区间: " + ", ".join(LatencyRecorder.histogram_labels()))
+        clear_latency_btn = QPushButton("清空延迟统计")
+        clear_latency_btn.clicked.connect(self.latency_recorder.clear)
+        latency_layout.addWidget(QLabel("采集 → 匹配完成 → 会话决策 → 注入完成 (只统计因触发条件满足而发生的点击)"))
+        latency_layout.addWidget(self.latency_table)
+        latency_layout.addWidget(clear_latency_btn)
+        latency_group.setLayout(latency_layout)
+        
         # === 日志查看 ===
         log_group = QGroupBox("运行日志")
         log_layout = QVBoxLayout()
@@ -1213,6 +5819,7 @@ class MouseClickSimulator(QMainWindow):
         
         # 添加到标签页布局
         layout.addWidget(monitor_group)
+        layout.addWidget(latency_group)
         layout.addWidget(log_group)
         
         # 添加拉伸项使内容顶部对齐
@@ -1237,15 +5844,120 @@ class MouseClickSimulator(QMainWindow):
         self.clear_positions_btn.setEnabled(index == 2)
     
     def update_trigger_status(self):
-        self.color_trigger_active = self.color_trigger_check.isChecked()
-        self.image_trigger_active = self.image_trigger_check.isChecked()
-        self.timer_trigger_active = self.timer_trigger_check.isChecked()
+        """从触发器控件生成新的设置快照并整体替换（只在界面线程调用）"""
+        start_time = self.start_time_edit.time()
+        end_time = self.end_time_edit.time()
+        try:
+            signature = PixelSignature.parse(self.signature_edit.toPlainText())
+            self.signature_status_label.setText(f"{len(signature.points)} 个点" if signature else "")
+        except ValueError as e:
+            signature = None
+            self.signature_status_label.setText(str(e))
+        expression = self.compile_expression(self.expression_edit.text())
+        start_seconds = seconds_of_day(start_time.hour(), start_time.minute(), start_time.second())
+        end_seconds = seconds_of_day(end_time.hour(), end_time.minute(), end_time.second())
+        if self.schedule_check.isChecked():
+            try:
+                schedule = TriggerSchedule.parse(self.schedule_edit.toPlainText())
+                self.schedule_status_label.setText(schedule.describe())
+            except ValueError as e:
+                schedule = TriggerSchedule([])
+                self.schedule_status_label.setText(f"计划规则错误: {str(e)} (启用时不会放行点击)")
+        else:
+            schedule = TriggerSchedule.daily(start_seconds, end_seconds)
+            self.schedule_status_label.setText("")
+        self.trigger_config = TriggerConfig(
+            color_enabled=self.color_trigger_check.isChecked(),
+            color_x=self.color_x_spin.value(),
+            color_y=self.color_y_spin.value(),
+            target_rgb=(self.target_color.red(), self.target_color.green(), self.target_color.blue()),
+            color_tolerance=self.color_tolerance_spin.value(),
+            area_enabled=self.area_trigger_check.isChecked(),
+            area_region=parse_region(self.area_region_edit.text()),
+            area_rgb=(self.area_color.red(), self.area_color.green(), self.area_color.blue()),
+            area_tolerance=self.area_tolerance_spin.value(),
+            area_mode=AREA_COLOR_MODES[self.area_mode_combo.currentText()],
+            area_percent=self.area_percent_spin.value(),
+            signature_enabled=self.signature_trigger_check.isChecked(),
+            signature=signature,
+            expression_enabled=self.expression_check.isChecked(),
+            expression=expression,
+            image_enabled=self.image_trigger_check.isChecked(),
+            image_path=self.image_path_edit.text(),
+            confidence=self.confidence_spin.value(),
+            image_region=parse_region(self.image_region_edit.text()) if self.image_region_check.isChecked() else None,
+            image_locality=self.image_locality_check.isChecked(),
+            image_grayscale=self.image_grayscale_check.isChecked(),
+            image_matcher=self.image_matcher_combo.currentData(),
+            template_set_enabled=self.template_set_check.isChecked(),
+            template_paths=tuple(line.strip() for line in self.template_paths_edit.toPlainText().split('\n') if line.strip()),
+            template_set_mode=TEMPLATE_SET_MODES[self.template_set_mode_combo.currentText()],
+            timer_enabled=self.timer_trigger_check.isChecked(),
+            start_seconds=start_seconds,
+            end_seconds=end_seconds,
+            schedule=schedule
+        )
+        self.color_trigger_active = self.trigger_config.color_enabled
+        self.image_trigger_active = self.trigger_config.image_enabled
+        self.timer_trigger_active = self.trigger_config.timer_enabled
+        if hasattr(self, 'trigger_engine'):
+            self.trigger_engine.notify_changed()
+    
+    def seconds_until_schedule_change(self):
+        """定时通道的睡眠时长：一直等到计划的下一次开始或结束"""
+        schedule = self.trigger_config.schedule
+        if schedule is None:
+            return TriggerEngine.EDGE_FALLBACK_INTERVAL
+        return schedule.seconds_until_change()
+    
+    def compile_expression(self, text):
+        """编译触发表达式；文本没有变化时沿用已编译的表达式（保留 hold/debounce 等状态）"""
+        cached_text, expression = self.compiled_expression
+        if text != cached_text:
+            try:
+                expression = TriggerExpression(text)
+            except ValueError as e:
+                expression = None
+                self.expression_status_label.setText(f"表达式错误: {str(e)} (启用时不会放行点击)")
+            self.compiled_expression = (text, expression)
+        if expression is not None:
+            self.expression_status_label.setText(f"评估顺序: {expression.describe()}")
+        return expression
     
     def update_color_preview(self):
         pixmap = QPixmap(50, 50)
         pixmap.fill(self.target_color)
         self.color_preview.setPixmap(pixmap)
     
+    def update_area_color_preview(self):
+        pixmap = QPixmap(30, 30)
+        pixmap.fill(self.area_color)
+        self.area_color_preview.setPixmap(pixmap)
+    
+    def select_area_color(self):
+        color = QColorDialog.getColor(self.area_color, self, "选择区域目标颜色")
+        if color.isValid():
+            self.area_color = color
+            self.settings.setValue("trigger/area_color", color.name())
+            self.update_area_color_preview()
+            self.update_trigger_status()
+    
+    def sample_signature_colors(self):
+        """把像素签名中每个点的颜色替换为屏幕上当前的颜色（保留坐标和容差）"""
+        signature = self.trigger_config.signature
+        if signature is None:
+            QMessageBox.warning(self, "像素签名", "请先按 x,y,#RRGGBB[,容差] 的格式填写坐标")
+            return
+        pixels = read_area(*signature.bbox)
+        if pixels.shape[0] < signature.bbox[3] or pixels.shape[1] < signature.bbox[2]:
+            QMessageBox.warning(self, "像素签名", "有坐标超出了屏幕范围")
+            return
+        colors = pixels[signature.rows, signature.cols]
+        sampled = PixelSignature.compile(
+            (x, y, (int(r), int(g), int(b)), tolerance)
+            for (x, y, _, tolerance), (b, g, r) in zip(signature.points, colors))
+        self.signature_edit.setPlainText(sampled.to_text())
+    
     def update_image_preview(self):
         image_path = self.image_path_edit.text()
         if image_path and os.path.exists(image_path):
@@ -1262,6 +5974,7 @@ class MouseClickSimulator(QMainWindow):
             self.target_color = color
             self.settings.setValue("trigger/target_color", color.name())
             self.update_color_preview()
+            self.update_trigger_status()
     
     def browse_image(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "选择目标图像", "", "Images (*.png *.jpg *.bmp)")
@@ -1270,19 +5983,58 @@ class MouseClickSimulator(QMainWindow):
             self.settings.setValue("trigger/image_path", file_path)
             self.update_image_preview()
     
+    def add_template_images(self):
+        file_paths, _ = QFileDialog.getOpenFileNames(self, "选择模板图像", "", "Images (*.png *.jpg *.bmp)")
+        if file_paths:
+            current_text = self.template_paths_edit.toPlainText().strip()
+            lines = [current_text] if current_text else []
+            self.template_paths_edit.setPlainText("\n".join(lines + file_paths))
+    
+    def update_template_result_table(self):
+        """刷新多模板匹配结果表格（界面线程）"""
+        results = self.template_set_matcher.results
+        self.template_result_table.setRowCount(len(results))
+        for row, result in enumerate(results):
+            if result.error:
+                state = f"错误: {result.error}"
+            else:
+                state = "匹配" if result.matched else "未匹配"
+            position = f"({result.box[0]}, {result.box[1]})" if result.matched else "-"
+            values = [os.path.basename(result.path), state, position, f"{result.score:.3f}", f"{result.elapsed_ms:.1f}ms"]
+            for column, value in enumerate(values):
+                self.template_result_table.setItem(row, column, QTableWidgetItem(value))
+        if results:
+            self.template_latency_label.setText(
+                f"总耗时: {self.template_set_matcher.latency_ms:.1f}ms ({len(results)} 个模板, "
+                f"{self.template_set_matcher.max_workers} 个线程)"
+            )
+    
+    def update_latency_table(self):
+        """刷新端到端延迟表格，分布一列是各区间样本数的字符柱状图"""
+        report = self.latency_recorder.report()
+        self.latency_table.setRowCount(len(report))
+        for row, (stage, values) in enumerate(report.items()):
+            counts = list(values["histogram"].values())
+            peak = max(counts) or 1
+            bars = "".join(" ▁▂▃▄▅▆▇█"[0 if count == 0 else 1 + count * 7 // peak] for count in counts)
+            cells = [stage, str(values["count"]), f"{values['p50_ms']:.2f}ms",
+                     f"{values['p99_ms']:.2f}ms", f"{values['max_ms']:.2f}ms", bars]
+            for column, text in enumerate(cells):
+                self.latency_table.setItem(row, column, QTableWidgetItem(text))
+    
     def capture_screen_area(self):
         self.hide()
         time.sleep(0.5)  # 给窗口隐藏时间
         
-        # 使用PIL捕获屏幕
-        screen = ImageGrab.grab()
-        screen.save("screenshot.png")
+        # 从采集服务取一帧窗口隐藏之后的画面
+        with self.capture_service.borrow("区域截取", timeout=2.0,
+                                         after_seq=self.capture_service.latest_seq) as frame:
+            img = Image.fromarray(cv2.cvtColor(frame.array, cv2.COLOR_BGR2RGB)) if frame is not None else ImageGrab.grab()
+        img.save("screenshot.png")
         
         self.show()
         
         # 让用户选择区域
-        from PIL import Image
-        img = Image.open("screenshot.png")
         img.show()
         
         # 这里应该有一个更专业的方法让用户选择区域
@@ -1321,43 +6073,23 @@ class MouseClickSimulator(QMainWindow):
             self.stop_record_btn.setEnabled(True)
             self.macro_info.setPlainText("开始录制宏...\n移动鼠标并点击进行录制")
             
-            # 启动鼠标监听线程
-            self.macro_listener = MouseController()
-            self.macro_listener_thread = threading.Thread(target=self.record_macro_actions)
-            self.macro_listener_thread.start()
+            try:
+                self.macro_recorder.start()
+            except Exception as e:
+                logging.error(f"启动宏录制失败: {str(e)}")
+                self.stop_record_macro()
         else:
             self.stop_record_macro()
     
-    def record_macro_actions(self):
-        last_pos = None
-        last_time = time.time()
-        
-        while self.record_macro:
-            current_pos = self.mouse_controller.position
-            current_time = time.time()
-            
-            # 记录移动
-            if last_pos is None or current_pos != last_pos:
-                self.macro_actions.append({
-                    'type': 'move',
-                    'x': current_pos[0],
-                    'y': current_pos[1],
-                    'time': current_time - last_time if last_time else 0
-                })
-                last_pos = current_pos
-                last_time = current_time
-            
-            # 记录点击 (通过监听鼠标事件)
-            # 这里简化处理，实际应该监听鼠标点击事件
-            time.sleep(0.01)
-    
     def stop_record_macro(self):
         self.record_macro = False
         self.record_macro_btn.setEnabled(True)
         self.stop_record_btn.setEnabled(False)
         
-        if hasattr(self, 'macro_listener_thread'):
-            self.macro_listener_thread.join(timeout=1)
+        try:
+            self.macro_actions = self.macro_recorder.stop()
+        except Exception as e:
+            logging.error(f"结束宏录制时出错: {str(e)}")
         
         self.macro_info.setPlainText(f"宏录制完成!\n共录制了 {len(self.macro_actions)} 个动作")
     
@@ -1366,19 +6098,9 @@ class MouseClickSimulator(QMainWindow):
             QMessageBox.warning(self, "警告", "没有可播放的宏!")
             return
         
-        def play():
-            for action in self.macro_actions:
-                if not self.clicking:
-                    break
-                
-                if action['type'] == 'move':
-                    pyautogui.moveTo(action['x'], action['y'])
-                elif action['type'] == 'click':
-                    pyautogui.click(button=action['button'])
-                
-                time.sleep(action.get('time', 0.1))
+        backend = self.input_backend or create_input_backend(self.input_backend_combo.currentText())
         
-        threading.Thread(target=play, daemon=True).start()
+        self.core.submit(play_macro_actions(self.macro_actions, backend, lambda: self.clicking))
     
     def save_macro(self):
         if not self.macro_actions:
@@ -1416,6 +6138,7 @@ class MouseClickSimulator(QMainWindow):
                 'mouse': self.mouse_controller,
                 'keyboard': keyboard,
                 'pyautogui': pyautogui,
+                'backend': self.input_backend or create_input_backend(self.input_backend_combo.currentText()),
                 'time': time,
                 'random': random,
                 'math': __import__('math'),
@@ -1444,16 +6167,17 @@ class MouseClickSimulator(QMainWindow):
             return
         
         try:
-            self.remote_server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.remote_server.bind(('0.0.0.0', port))
-            self.remote_server.listen(1)
-            
-            self.remote_thread = threading.Thread(target=self.handle_remote_connections, daemon=True)
-            self.remote_thread.start()
+            # 远程点击使用的后端在界面线程中创建好，连接处理中不再读取控件
+            self.remote_backend = create_input_backend(self.input_backend_combo.currentText())
+            self.remote_control_active = True
+            self.remote_server = self.core.submit(asyncio.start_server(
+                lambda reader, writer: self.handle_remote_client(reader, writer, password),
+                '0.0.0.0', port
+            )).result(timeout=5)
             
             self.remote_status_label.setText(f"状态: 监听中 (端口: {port})")
-            self.remote_control_active = True
         except Exception as e:
+            self.remote_control_active = False
             QMessageBox.critical(self, "错误", f"启动远程控制服务失败:\n{str(e)}")
             self.remote_enable_check.setChecked(False)
     
@@ -1461,63 +6185,69 @@ class MouseClickSimulator(QMainWindow):
         self.remote_control_active = False
         if self.remote_server:
             try:
-                self.remote_server.close()
+                self.core.call_soon(self.remote_server.close)
             except:
                 pass
             self.remote_server = None
         
         self.remote_status_label.setText("状态: 已停止")
     
-    def handle_remote_connections(self):
-        while self.remote_control_active:
-            try:
-                conn, addr = self.remote_server.accept()
-                logging.info(f"远程连接来自: {addr}")
-                
-                # 验证密码
-                password = self.remote_password_edit.text()
-                conn.sendall(b"AUTH_REQUIRED")
-                received_password = conn.recv(1024).decode().strip()
-                
-                if received_password != password:
-                    conn.sendall(b"AUTH_FAILED")
-                    conn.close()
-                    continue
-                
-                conn.sendall(b"AUTH_SUCCESS")
+    async def handle_remote_client(self, reader, writer, password):
+        """处理一个远程连接（异步核心上的任务）"""
+        addr = writer.get_extra_info('peername')
+        logging.info(f"远程连接来自: {addr}")
+        try:
+            # 验证密码
+            writer.write(b"AUTH_REQUIRED")
+            await writer.drain()
+            received_password = (await reader.read(1024)).decode().strip()
+            
+            if received_password != password:
+                writer.write(b"AUTH_FAILED")
+                await writer.drain()
+                return
+            
+            writer.write(b"AUTH_SUCCESS")
+            await writer.drain()
+            
+            # 处理命令
+            while self.remote_control_active:
+                data = await reader.read(1024)
+                if not data:
+                    break
                 
-                # 处理命令
-                while self.remote_control_active:
-                    try:
-                        data = conn.recv(1024)
-                        if not data:
-                            break
-                        
-                        command = data.decode().strip()
-                        logging.info(f"收到远程命令: {command}")
-                        
-                        # 执行命令
-                        if command == "START":
-                            self.start_clicking()
-                            conn.sendall(b"STARTED")
-                        elif command == "STOP":
-                            self.stop_clicking()
-                            conn.sendall(b"STOPPED")
-                        elif command.startswith("CLICK"):
-                            _, button, x, y = command.split()
-                            pyautogui.click(int(x), int(y), button=button.lower())
-                            conn.sendall(b"CLICKED")
-                        else:
-                            conn.sendall(b"UNKNOWN_COMMAND")
-                    except Exception as e:
-                        logging.error(f"处理远程命令时出错: {str(e)}")
-                        break
+                command = data.decode().strip()
+                logging.info(f"收到远程命令: {command}")
                 
-                conn.close()
-            except Exception as e:
-                logging.error(f"处理远程连接时出错: {str(e)}")
-                if self.remote_control_active:
-                    time.sleep(1)
+                # 执行命令
+                if command == "START":
+                    self.remote_command.emit(command)
+                    writer.write(b"STARTED")
+                elif command == "STOP":
+                    self.remote_command.emit(command)
+                    writer.write(b"STOPPED")
+                elif command.startswith("CLICK"):
+                    _, button, x, y = command.split()
+                    await self.core.run_blocking(self.remote_click, button.lower(), int(x), int(y))
+                    writer.write(b"CLICKED")
+                else:
+                    writer.write(b"UNKNOWN_COMMAND")
+                await writer.drain()
+        except Exception as e:
+            logging.error(f"处理远程命令时出错: {str(e)}")
+        finally:
+            writer.close()
+    
+    def remote_click(self, button, x, y):
+        self.remote_backend.move_to(x, y)
+        self.remote_backend.click(button)
+    
+    def handle_remote_command(self, command):
+        """在界面线程中执行远程命令"""
+        if command == "START":
+            self.start_clicking()
+        elif command == "STOP":
+            self.stop_clicking()
     
     def download_script(self):
         script_name = self.script_list.currentText()
@@ -1571,7 +6301,25 @@ class MouseClickSimulator(QMainWindow):
         self.memory_usage_bar.setValue(int(memory_percent))
         
         # 更新点击次数
+        if self.main_session is not None:
+            self.click_count = self.main_session.stats.clicks
         self.click_count_label.setText(f"点击次数: {self.click_count}")
+        if self.session_stats:
+            self.click_rate_label.setText(self.session_stats.summary())
+        self.capture_label.setText(self.capture_service.summary())
+        self.template_cache_label.setText(get_template_cache().summary())
+        search_text = self.image_searcher.summary()
+        feature_matcher = self.feature_matchers.get(self.trigger_config.image_matcher)
+        if feature_matcher is not None:
+            search_text += f"\n{feature_matcher.summary()}"
+        self.image_search_label.setText(search_text)
+        self.change_gate_label.setText(self.change_gate.summary())
+        engine_text = self.trigger_engine.summary()
+        if self.trigger_config.expression_enabled and self.trigger_config.expression is not None:
+            engine_text += f"\n表达式: {self.trigger_config.expression.summary()}"
+        self.trigger_engine_label.setText(engine_text)
+        self.update_template_result_table()
+        self.update_latency_table()
         
         # 更新状态栏
         status_text = f"状态: {'运行中' if self.clicking else '未运行'} | 点击次数: {self.click_count} | CPU: {cpu_percent}% | 内存: {memory_used:.1f}MB"
@@ -1589,6 +6337,8 @@ class MouseClickSimulator(QMainWindow):
         # 更新图表显示（如果有）
         if hasattr(self, 'cpu_chart'):
             self.update_performance_charts()
+        
+        self.update_session_table()
     
     def update_mouse_position(self):
         x, y = pyautogui.position()
@@ -1729,6 +6479,9 @@ class MouseClickSimulator(QMainWindow):
         self.settings.setValue("basic/button_index", self.button_combo.currentIndex())
         self.settings.setValue("basic/click_mode", self.click_mode_combo.currentIndex())
         self.settings.setValue("basic/hold_time", self.hold_time_spin.value())
+        self.settings.setValue("basic/double_click_interval", self.double_click_interval_spin.value())
+        self.settings.setValue("basic/triple_click_interval", self.triple_click_interval_spin.value())
+        self.settings.setValue("basic/combo_hold", self.combo_hold_spin.value())
         self.settings.setValue("basic/interval", self.interval_spin.value())
         self.settings.setValue("basic/random_interval", self.random_interval_check.isChecked())
         self.settings.setValue("basic/min_interval", self.min_interval_spin.value())
@@ -1752,18 +6505,46 @@ class MouseClickSimulator(QMainWindow):
         self.settings.setValue("advanced/verify_result", self.verify_check.isChecked())
         self.settings.setValue("advanced/verify_area", self.verify_area_edit.toPlainText())
         self.settings.setValue("advanced/generate_report", self.report_check.isChecked())
+        self.settings.setValue("advanced/input_backend", self.input_backend_combo.currentText())
+        self.settings.setValue("advanced/injection_mode", self.injection_mode_combo.currentIndex())
+        self.settings.setValue("advanced/jitter_distribution", self.jitter_distribution_combo.currentIndex())
+        self.settings.setValue("advanced/jitter_seed", self.jitter_seed_spin.value())
+        self.settings.setValue("advanced/capture_fps", self.capture_fps_spin.value())
+        self.settings.setValue("advanced/capture_backend", self.capture_backend_combo.currentText())
+        self.settings.setValue("advanced/pixel_trigger_interval", self.pixel_trigger_interval_spin.value())
+        self.settings.setValue("advanced/image_trigger_interval", self.image_trigger_interval_spin.value())
+        self.settings.setValue("advanced/expression_trigger_interval", self.expression_trigger_interval_spin.value())
         
         # 触发器设置
         self.settings.setValue("trigger/color_trigger", self.color_trigger_check.isChecked())
         self.settings.setValue("trigger/color_x", self.color_x_spin.value())
         self.settings.setValue("trigger/color_y", self.color_y_spin.value())
         self.settings.setValue("trigger/color_tolerance", self.color_tolerance_spin.value())
+        self.settings.setValue("trigger/area_trigger", self.area_trigger_check.isChecked())
+        self.settings.setValue("trigger/area_region", self.area_region_edit.text())
+        self.settings.setValue("trigger/area_tolerance", self.area_tolerance_spin.value())
+        self.settings.setValue("trigger/area_mode", self.area_mode_combo.currentIndex())
+        self.settings.setValue("trigger/area_percent", self.area_percent_spin.value())
+        self.settings.setValue("trigger/signature_trigger", self.signature_trigger_check.isChecked())
+        self.settings.setValue("trigger/signature_points", self.signature_edit.toPlainText())
         self.settings.setValue("trigger/image_trigger", self.image_trigger_check.isChecked())
         self.settings.setValue("trigger/image_path", self.image_path_edit.text())
         self.settings.setValue("trigger/confidence", self.confidence_spin.value())
+        self.settings.setValue("trigger/image_region_enabled", self.image_region_check.isChecked())
+        self.settings.setValue("trigger/image_region", self.image_region_edit.text())
+        self.settings.setValue("trigger/image_locality", self.image_locality_check.isChecked())
+        self.settings.setValue("trigger/image_grayscale", self.image_grayscale_check.isChecked())
+        self.settings.setValue("trigger/image_matcher", self.image_matcher_combo.currentData())
+        self.settings.setValue("trigger/template_set_enabled", self.template_set_check.isChecked())
+        self.settings.setValue("trigger/template_paths", self.template_paths_edit.toPlainText())
+        self.settings.setValue("trigger/template_set_mode", self.template_set_mode_combo.currentIndex())
         self.settings.setValue("trigger/timer_trigger", self.timer_trigger_check.isChecked())
         self.settings.setValue("trigger/start_time", self.start_time_edit.time().toString("HH:mm:ss"))
         self.settings.setValue("trigger/end_time", self.end_time_edit.time().toString("HH:mm:ss"))
+        self.settings.setValue("trigger/schedule_enabled", self.schedule_check.isChecked())
+        self.settings.setValue("trigger/schedule_rules", self.schedule_edit.toPlainText())
+        self.settings.setValue("trigger/expression_enabled", self.expression_check.isChecked())
+        self.settings.setValue("trigger/expression", self.expression_edit.text())
         
         # 远程控制设置
         self.settings.setValue("remote/enabled", self.remote_enable_check.isChecked())
@@ -1785,6 +6566,9 @@ class MouseClickSimulator(QMainWindow):
         self.button_index = self.settings.value("basic/button_index", 0, type=int)
         self.click_mode = self.settings.value("basic/click_mode", 0, type=int)
         self.hold_time = self.settings.value("basic/hold_time", 100, type=int)
+        self.double_click_interval = self.settings.value("basic/double_click_interval", 0, type=int)
+        self.triple_click_interval = self.settings.value("basic/triple_click_interval", 100, type=int)
+        self.combo_hold = self.settings.value("basic/combo_hold", 50, type=int)
         self.interval = self.settings.value("basic/interval", 100, type=int)
         self.random_interval = self.settings.value("basic/random_interval", False, type=bool)
         self.min_interval = self.settings.value("basic/min_interval", 50, type=int)
@@ -1808,6 +6592,10 @@ class MouseClickSimulator(QMainWindow):
         self.verify_result = self.settings.value("advanced/verify_result", False, type=bool)
         self.verify_area = self.settings.value("advanced/verify_area", "0,0,100,100")
         self.generate_report = self.settings.value("advanced/generate_report", True, type=bool)
+        self.input_backend_name = self.settings.value("advanced/input_backend", "pyautogui")
+        self.injection_mode = self.settings.value("advanced/injection_mode", 0, type=int)
+        self.jitter_distribution = self.settings.value("advanced/jitter_distribution", 0, type=int)
+        self.jitter_seed = self.settings.value("advanced/jitter_seed", -1, type=int)
         
         # 触发器设置
         self.color_trigger = self.settings.value("trigger/color_trigger", False, type=bool)
@@ -1842,6 +6630,8 @@ class MouseClickSimulator(QMainWindow):
             
         self.clicking = True
         self.emergency_stop = False
+        # 每个会话使用独立的停止事件，避免上一个会话尚未收尾时被重新启用
+        self.stop_event = threading.Event()
         self.click_count = 0
         self.status_bar.setText("状态: 运行中")
         self.start_button.setEnabled(False)
@@ -1850,28 +6640,49 @@ class MouseClickSimulator(QMainWindow):
         # 添加日志记录
         logging.info(f"开始点击模拟 - 模式: {self.click_mode_combo.currentText()}")
 
-        # 保存设置
+        # 保存设置并生成触发器设置快照
         self.save_settings()
+        self.update_trigger_status()
         # 重新设置快捷键
         self.setup_hotkeys()
         
-        # 获取当前设置
-        button = self.button_combo.currentText()
-        click_mode = self.click_mode_combo.currentIndex()
-        hold_time = self.hold_time_spin.value() / 1000.0  # 转换为秒
-        
-        interval = self.interval_spin.value() / 1000.0
-        random_interval = self.random_interval_check.isChecked()
-        min_interval = self.min_interval_spin.value() / 1000.0
-        max_interval = self.max_interval_spin.value() / 1000.0
-        
-        click_limit = self.click_limit_check.isChecked()
-        click_limit_value = self.click_limit_spin.value()
-        
+        # 创建输入后端并编译点击计划
+        self.input_backend = self.create_session_backend(self.stop_event)
+        logging.info(f"输入后端: {self.input_backend.name}")
+        plan = self.build_click_plan(self.input_backend)
+        
+        self.main_session = ClickSession(
+            MAIN_SESSION_NAME, plan, self.input_backend,
+            trigger_check=self.trigger_engine.is_satisfied,
+            trigger_retry=TriggerEngine.EDGE_FALLBACK_INTERVAL,
+            trigger_state=lambda: self.trigger_engine.state,
+            latency=self.latency_recorder,
+            on_finish=self.on_session_finish,
+            stop_event=self.stop_event,
+            verifier=self.create_verifier(plan)
+        )
+        self.session_stats = self.main_session.stats
+        self.trigger_engine.acquire()
+        self.scheduler.add_session(self.main_session)
+    
+    def create_verifier(self, plan):
+        if plan.verify_area is None:
+            return None
+        # 提前启动采集服务，第一次循环结束时就有画面可用
+        self.capture_service.ensure_running()
+        return ClickVerifier(self.capture_service, plan.verify_area)
+    
+    def create_session_backend(self, stop_event):
+        """按当前设置创建输入后端（原始模式下套上紧急停止保护）"""
+        raw_injection = self.injection_mode_combo.currentIndex() == 1
+        backend = create_input_backend(self.input_backend_combo.currentText(), raw=raw_injection)
+        if raw_injection:
+            backend = GuardedBackend(backend, stop_event)
+        return backend
+    
+    def build_click_plan(self, backend):
+        """从界面控件读取当前设置并编译点击计划（只在界面线程调用）"""
         position_mode = self.position_mode_combo.currentIndex()
-        fixed_x = self.x_spin.value()
-        fixed_y = self.y_spin.value()
-        
         positions = []
         if position_mode == 2:  # 多坐标循环
             pos_text = self.position_list.toPlainText()
@@ -1881,247 +6692,233 @@ class MouseClickSimulator(QMainWindow):
                     positions.append((x, y))
             if not positions:
                 QMessageBox.warning(self, "警告", "坐标列表为空，将使用当前位置!")
-                positions = [pyautogui.position()]
-        
-        # 游戏辅助设置
-        combo_key = self.combo_key_check.isChecked()
-        combo_key_type = self.combo_key_combo.currentIndex()
+                positions = [backend.position()]
         
-        recoil_mode = self.recoil_check.isChecked()
+        # 压枪模式
         recoil_pattern = []
-        if recoil_mode:
+        if self.recoil_check.isChecked():
             for line in self.recoil_pattern_edit.toPlainText().split('\n'):
                 if ',' in line:
                     x, y = map(int, line.strip().split(','))
                     recoil_pattern.append((x, y))
         
-        anti_detect = self.anti_detect_check.isChecked()
-        random_offset = self.random_offset_spin.value()
-        
         # 自动化测试设置
-        test_loop = self.test_loop_spin.value()
         verify_result = self.verify_check.isChecked()
         verify_area = list(map(int, self.verify_area_edit.toPlainText().split(','))) if verify_result else None
-        generate_report = self.report_check.isChecked()
-        
-        # 启动点击线程
-        self.click_thread = threading.Thread(
-            target=self.click_loop,
-            args=(
-                button, click_mode, hold_time,
-                interval, random_interval, min_interval, max_interval,
-                click_limit, click_limit_value,
-                position_mode, fixed_x, fixed_y, positions,
-                combo_key, combo_key_type,
-                recoil_mode, recoil_pattern,
-                anti_detect, random_offset,
-                test_loop, verify_result, verify_area, generate_report
-            ),
-            daemon=True
+        
+        # 编译点击计划，调度线程只读取计划中的普通数据
+        return ClickPlan.compile(
+            button=self.button_combo.currentText(),
+            click_mode=self.click_mode_combo.currentIndex(),
+            hold_time=self.hold_time_spin.value() / 1000.0,  # 转换为秒
+            double_click_interval=self.double_click_interval_spin.value() / 1000.0,
+            triple_click_interval=self.triple_click_interval_spin.value() / 1000.0,
+            combo_hold=self.combo_hold_spin.value() / 1000.0,
+            interval=self.interval_spin.value() / 1000.0,
+            random_interval=self.random_interval_check.isChecked(),
+            min_interval=self.min_interval_spin.value() / 1000.0,
+            max_interval=self.max_interval_spin.value() / 1000.0,
+            click_limit=self.click_limit_spin.value() if self.click_limit_check.isChecked() else None,
+            position_mode=position_mode,
+            fixed_position=(self.x_spin.value(), self.y_spin.value()),
+            positions=positions,
+            combo_key=self.combo_key_check.isChecked(),
+            combo_key_type=self.combo_key_combo.currentIndex(),
+            recoil_pattern=recoil_pattern,
+            anti_detect=self.anti_detect_check.isChecked(),
+            random_offset=self.random_offset_spin.value(),
+            jitter_distribution=JITTER_DISTRIBUTION_NAMES[self.jitter_distribution_combo.currentText()],
+            jitter_seed=self.jitter_seed_spin.value() if self.jitter_seed_spin.value() >= 0 else None,
+            test_loop=self.test_loop_spin.value(),
+            test_loop_enabled=self.test_loop_check.isChecked(),
+            verify_area=verify_area,
+            generate_report=self.report_check.isChecked()
+        )
+
+    
+    def add_click_session(self):
+        """以当前设置添加一个并发会话"""
+        self.update_trigger_status()
+        self.session_counter += 1
+        name = f"会话{self.session_counter}"
+        stop_event = threading.Event()
+        backend = self.create_session_backend(stop_event)
+        plan = self.build_click_plan(backend)
+        session = ClickSession(
+            name, plan, backend,
+            trigger_check=self.trigger_engine.is_satisfied,
+            trigger_retry=TriggerEngine.EDGE_FALLBACK_INTERVAL,
+            trigger_state=lambda: self.trigger_engine.state,
+            latency=self.latency_recorder,
+            on_finish=self.on_session_finish,
+            stop_event=stop_event,
+            verifier=self.create_verifier(plan)
         )
-        self.click_thread.start()
+        self.trigger_engine.acquire()
+        self.scheduler.add_session(session)
+        logging.info(f"添加点击会话: {name} (后端: {backend.name})")
+        self.update_session_table()
+    
+    def remove_click_session(self):
+        """移除表格中选中的会话"""
+        rows = sorted({index.row() for index in self.session_table.selectedIndexes()})
+        for row in rows:
+            item = self.session_table.item(row, 0)
+            if item is None:
+                continue
+            if item.text() == MAIN_SESSION_NAME:
+                self.stop_clicking()
+            else:
+                self.scheduler.remove_session(item.text())
+    
+    def update_session_table(self):
+        """刷新并发会话表格（每个会话的速率和迟到统计）"""
+        sessions = self.scheduler.get_sessions()
+        self.session_table.setRowCount(len(sessions))
+        for row, session in enumerate(sessions):
+            plan = session.plan
+            stats = session.stats
+            interval_text = (f"{plan.min_interval * 1000:.0f}-{plan.max_interval * 1000:.0f}ms"
+                             if plan.random_interval else f"{plan.interval * 1000:.0f}ms")
+            p99 = stats.lateness_percentiles((99,))[0]
+            values = [
+                session.name,
+                f"{plan.button} / {interval_text}",
+                str(stats.clicks),
+                f"{stats.achieved_rate():.1f}/{stats.target_rate():.1f} 次/秒",
+                f"{p99:.2f}ms",
+                str(stats.resyncs)
+            ]
+            for column, value in enumerate(values):
+                self.session_table.setItem(row, column, QTableWidgetItem(value))
+    
+    def on_session_finish(self, session):
+        """会话结束回调（注入线程）"""
+        self.trigger_engine.release()
+        self.session_finished.emit(session)
+    
+    def on_session_finished(self, session):
+        """会话结束后的界面处理（界面线程）"""
+        self.update_session_table()
+        if session is not self.main_session:
+            return
+        
+        self.click_count = session.stats.clicks
+        if self.clicking:
+            # 会话因点击次数限制、测试循环完成或安全保护而自行结束
+            self.clicking = False
+            self.status_bar.setText("状态: 已停止")
+            self.start_button.setEnabled(True)
+            self.stop_button.setEnabled(False)
+        
+        # 生成测试报告
+        if session.plan.generate_report and session.plan.test_loop > 1:
+            self.generate_test_report(session.plan.test_loop, session.verifier)
     
     def stop_clicking(self):
         self.clicking = False
+        self.stop_event.set()
+        self.scheduler.remove_session(MAIN_SESSION_NAME)
         self.status_bar.setText("状态: 已停止")
         self.start_button.setEnabled(True)
         self.stop_button.setEnabled(False)
-        
-        if self.click_thread and self.click_thread.is_alive():
-            self.click_thread.join(timeout=1)
     
     def emergency_stop_func(self):
         self.emergency_stop = True
+        self.stop_event.set()
         self.stop_clicking()
+        self.scheduler.stop_all()
         QMessageBox.information(self, "紧急停止", "模拟已紧急停止!")
     
-    def click_loop(
-        self,
-        button, click_mode, hold_time,
-        interval, random_interval, min_interval, max_interval,
-        click_limit, click_limit_value,
-        position_mode, fixed_x, fixed_y, positions,
-        combo_key, combo_key_type,
-        recoil_mode, recoil_pattern,
-        anti_detect, random_offset,
-        test_loop, verify_result, verify_area, generate_report
-    ):
-        button_map = {
-            "左键": "left",
-            "中键": "middle",
-            "右键": "right"
-        }
-        button = button_map.get(button, "left")
-        
-        combo_buttons = []
-        if combo_key:
-            if combo_key_type == 0:
-                combo_buttons = ["left", "right"]
-            elif combo_key_type == 1:
-                combo_buttons = ["left", "middle"]
-            elif combo_key_type == 2:
-                combo_buttons = ["right", "middle"]
-        
-        current_position_index = 0
-        current_recoil_index = 0
-        test_iteration = 0
-        
-        while self.clicking and not self.emergency_stop:
-            # 检查触发器
-            if not self.check_triggers():
-                time.sleep(0.1)
-                continue
-            
-            # 检查点击限制
-            if click_limit and self.click_count >= click_limit_value:
-                logging.info(f"达到点击次数限制: {self.click_count}/{click_limit_value}")
-                self.stop_clicking()
-                break
-            
-            # 获取目标位置
-            if position_mode == 0:  # 当前鼠标位置
-                x, y = pyautogui.position()
-            elif position_mode == 1:  # 固定坐标
-                x, y = fixed_x, fixed_y
-            else:  # 多坐标循环
-                if not positions:
-                    logging.warning("坐标列表为空，停止模拟")
-                    break
-                x, y = positions[current_position_index]
-                current_position_index = (current_position_index + 1) % len(positions)
-            
-            # 应用随机偏移
-            if anti_detect:
-                offset_x = random.randint(-random_offset, random_offset)
-                offset_y = random.randint(-random_offset, random_offset)
-                x += offset_x
-                y += offset_y
-                logging.debug(f"应用随机偏移: ({offset_x}, {offset_y})")
-            
-            # 移动鼠标
-            pyautogui.moveTo(x, y)
-            logging.debug(f"移动到位置: ({x}, {y})")
-            
-            # 执行点击
-            clicks_to_add = 1  # 默认计数1次（长按模式）
-            if click_mode == 0:  # 单次点击
-                if combo_key:
-                    for btn in combo_buttons:
-                        pyautogui.mouseDown(button=btn)
-                    time.sleep(0.05)
-                    for btn in reversed(combo_buttons):
-                        pyautogui.mouseUp(button=btn)
-                    clicks_to_add = len(combo_buttons)  # 组合键点击计数
-                else:
-                    pyautogui.click(button=button)
-                    clicks_to_add = 1
-            elif click_mode == 1:  # 双击
-                pyautogui.doubleClick(button=button)
-                clicks_to_add = 2
-            elif click_mode == 2:  # 三连击
-                pyautogui.click(button=button, clicks=3, interval=0.1)
-                clicks_to_add = 3
-            elif click_mode == 3:  # 长按
-                pyautogui.mouseDown(button=button)
-                time.sleep(hold_time)
-                pyautogui.mouseUp(button=button)
-                clicks_to_add = 1
-            
-            self.click_count += clicks_to_add
-            logging.debug(f"执行点击: 模式={click_mode}, 计数+{clicks_to_add}, 总计数={self.click_count}")
-            
-            # 应用压枪模式
-            if recoil_mode and recoil_pattern:
-                dx, dy = recoil_pattern[current_recoil_index]
-                pyautogui.moveRel(dx, dy)
-                current_recoil_index = (current_recoil_index + 1) % len(recoil_pattern)
-                logging.debug(f"应用压枪模式: 偏移({dx}, {dy})")
-            
-            # 检查自动化测试验证
-            if verify_result and verify_area and len(verify_area) == 4:
-                # 这里应该实现验证逻辑
-                pass
-            
-            # 计算间隔时间
-            if random_interval:
-                current_interval = random.uniform(min_interval, max_interval)
-            else:
-                current_interval = interval
-            
-            logging.debug(f"等待间隔: {current_interval:.3f}秒")
-            
-            # 等待间隔时间
-            start_time = time.time()
-            while time.time() - start_time < current_interval:
-                if not self.clicking or self.emergency_stop:
-                    break
-                time.sleep(0.01)
-            
-            # 检查测试循环
-            test_iteration += 1
-            if test_loop > 0 and self.test_loop_check.isChecked() and test_iteration >= test_loop:
-                logging.info(f"完成测试循环: {test_iteration}/{test_loop}")
-                break
-        
-        # 生成测试报告
-        if generate_report and test_loop > 1:
-            self.generate_test_report(test_loop)
-
+    def check_triggers(self, group=None):
+        """评估触发条件；group 为 TRIGGER_GROUPS 中的一类时只评估这一类（触发器引擎的各个通道）"""
+        return self.sample_triggers(group)[0]
     
-    def check_triggers(self):
-        if not (self.color_trigger_active or self.image_trigger_active or self.timer_trigger_active):
-            return True
-        
-        current_time = QTime.currentTime()
-        
-        # 检查定时触发器
-        if self.timer_trigger_active:
-            start_time = self.start_time_edit.time()
-            end_time = self.end_time_edit.time()
-            
-            if not (start_time <= current_time <= end_time):
-                return False
-        
-        # 检查颜色触发器
-        if self.color_trigger_active:
-            x = self.color_x_spin.value()
-            y = self.color_y_spin.value()
-            tolerance = self.color_tolerance_spin.value()
-            
-            # 获取屏幕颜色
-            screenshot = ImageGrab.grab()
-            pixel_color = screenshot.getpixel((x, y))
-            
-            # 转换为QColor
-            screen_color = QColor(*pixel_color)
-            target_color = self.target_color
-            
-            # 计算颜色差异
-            diff = abs(screen_color.red() - target_color.red()) + \
-                   abs(screen_color.green() - target_color.green()) + \
-                   abs(screen_color.blue() - target_color.blue())
-            
-            if diff > tolerance:
-                return False
-        
-        # 检查图像触发器
-        if self.image_trigger_active:
-            image_path = self.image_path_edit.text()
-            confidence = self.confidence_spin.value()
+    def sample_triggers(self, group=None):
+        """评估触发条件，返回 (是否满足, 所依据画面的采集时刻)"""
+        # 只读取一次快照，本次检查过程中即使界面修改了设置也保持一致
+        config = self.trigger_config
+        if group is not None:
+            config = config.only(group)
+        reads_pixels = config.color_enabled or config.area_enabled or config.signature_enabled
+        if not (config.needs_frame or (reads_pixels and self.capture_service.running)):
+            # 只有颜色类触发器且采集服务未运行时，只读取像素或小区域比整帧采集便宜
+            capture_ns = time.perf_counter_ns()
+            return evaluate_triggers(config), capture_ns
+        
+        # 图像触发器需要整帧，颜色类触发器顺带从同一帧读取像素
+        with self.capture_service.borrow("触发器") as frame:
+            if frame is None:
+                return False, time.perf_counter_ns()
+            return self.evaluate_in_frame(config, frame), frame.timestamp_ns
+    
+    def evaluate_in_frame(self, config, frame):
+        return evaluate_triggers(
+            config,
+            pixel=frame.pixel,
+            area=frame.region,
+            locate=lambda image_path, confidence: self.locate_in_frame(frame, config, image_path, confidence),
+            template_set=lambda config: self.match_template_set(frame, config)
+        )
+    
+    def check_expression(self):
+        """按触发表达式评估（触发器引擎的表达式通道），返回 (是否满足, 所依据画面的采集时刻)
+
+        只有真正需要画面的触发器被评估时才借用一帧，被短路跳过时不截屏；
+        以评估前最新的帧序号作为缓存键，同一帧内的触发器结果直接复用。
+        """
+        config = self.trigger_config
+        expression = config.expression
+        capture_ns = time.perf_counter_ns()
+        if expression is None:
+            return False, capture_ns  # 表达式无效时不放行
+        
+        with contextlib.ExitStack() as stack:
+            borrowed = []
             
-            if not os.path.exists(image_path):
-                return False
+            def check_atom(field):
+                atom_config = config.only_trigger(field)
+                if field in FRAME_FREE_ATOMS or not (atom_config.needs_frame or self.capture_service.running):
+                    return evaluate_triggers(atom_config)
+                if not borrowed:
+                    borrowed.append(stack.enter_context(self.capture_service.borrow("触发表达式")))
+                frame = borrowed[0]
+                return frame is not None and self.evaluate_in_frame(atom_config, frame)
             
-            try:
-                location = pyautogui.locateOnScreen(image_path, confidence=confidence)
-                if not location:
-                    return False
-            except:
-                return False
-        
-        return True
+            frame_key = self.capture_service.current_seq
+            satisfied = expression.evaluate(check_atom, frame_key)
+            if borrowed and borrowed[0] is not None:
+                capture_ns = borrowed[0].timestamp_ns
+            return satisfied, capture_ns
+    
+    def locate_in_frame(self, frame, config, image_path, confidence):
+        """在采集帧中查找图像触发器的模板；搜索区域内像素没变时复用上一次的结果"""
+        template = get_template_cache().get(image_path)
+        key = ("image", image_path, template.mtime_ns, confidence, config.image_region,
+               config.image_locality, config.image_grayscale, config.image_matcher)
+        return self.change_gate.run(key, frame, config.image_region, lambda: self.image_searcher.locate(
+            template, frame.array, confidence,
+            region=config.image_region, locality=config.image_locality, key=image_path,
+            grayscale=config.image_grayscale, match=self.feature_matchers.get(config.image_matcher)
+        ))
+    
+    def match_template_set(self, frame, config):
+        """在采集帧中评估多模板触发集；搜索区域内像素没变时复用上一次的结果"""
+        cache = get_template_cache()
+        versions = tuple(cache.get(path).mtime_ns if os.path.exists(path) else None
+                         for path in config.template_paths)
+        key = ("set", config.template_paths, versions, config.confidence, config.image_region,
+               config.image_grayscale, config.image_matcher, config.template_set_mode)
+        return self.change_gate.run(key, frame, config.image_region, lambda: TemplateSetMatcher.satisfied(
+            self.template_set_matcher.match_all(
+                config.template_paths, frame.array, config.confidence,
+                grayscale=config.image_grayscale, region=config.image_region,
+                matcher=self.feature_matchers.get(config.image_matcher)
+            ),
+            config.template_set_mode
+        ))
     
-    def generate_test_report(self, test_loop):
+    def generate_test_report(self, test_loop, verifier=None):
         report = f"""测试报告 - {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
         
 测试循环次数: {test_loop}
@@ -2134,6 +6931,8 @@ class MouseClickSimulator(QMainWindow):
 - 点击间隔: {self.interval_spin.value()}ms
 - 坐标模式: {self.position_mode_combo.currentText()}
         
+结果验证: {verifier.summary() if verifier is not None else "未启用"}
+        
 备注: 测试完成
 """
         
@@ -2203,12 +7002,17 @@ class MouseClickSimulator(QMainWindow):
         if hasattr(self, 'tray_icon') and self.tray_icon:
             self.tray_icon.hide()
         self.stop_clicking()
+        self.scheduler.stop_all()
         self.stop_remote_control()
         self.save_settings()
         
         if hasattr(self, 'keyboard_listener'):
             self.keyboard_listener.stop()
         
+        self.core.stop()
+        self.capture_service.stop()
+        self.template_set_matcher.close()
+        
 
         event.accept()
 
@@ -2228,6 +7032,9 @@ class QTextEditLogger(logging.Handler):
 
 
 if __name__ == "__main__":
+    if "--benchmark" in sys.argv[1:]:
+        sys.exit(benchmark_main(sys.argv[1:]))
+    
     app = QApplication(sys.argv)
     
     # 设置应用程序图标
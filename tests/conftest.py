@@ -0,0 +1,87 @@
+"""测试公共设置：只测试不需要显示服务的纯逻辑部分"""
+import importlib
+import os
+import sys
+import types
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class _Placeholder:
+    """任意属性访问和调用都返回自身，解包时当作坐标 (0, 0)"""
+
+    def __getattr__(self, name):
+        return self
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+    def __iter__(self):
+        return iter((0, 0))
+
+
+class _PlaceholderModule(types.ModuleType):
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _Placeholder()
+
+
+def _install_placeholders():
+    """pyautogui/pynput/keyboard 在没有显示服务（或没有权限）时导入阶段就会失败。
+
+    测试只使用内存记录后端和假的截屏实现，不注入也不监听真实输入，导入失败时用占位模块代替，
+    让主程序模块可以导入；需要具体行为的测试自己 monkeypatch。
+    """
+    for name in ("pyautogui", "pynput.mouse", "pynput.keyboard", "keyboard"):
+        try:
+            importlib.import_module(name)
+            continue
+        except Exception:
+            pass
+        parts = name.split(".")
+        for i in range(1, len(parts) + 1):
+            module_name = ".".join(parts[:i])
+            if not isinstance(sys.modules.get(module_name), _PlaceholderModule):
+                sys.modules[module_name] = _PlaceholderModule(module_name)
+            if i > 1:
+                setattr(sys.modules[".".join(parts[:i - 1])], parts[i - 1], sys.modules[module_name])
+        if name == "pyautogui":
+            module = sys.modules[name]
+            module.PAUSE = 0.1
+            module.FAILSAFE = True
+            module.ImageNotFoundException = type("ImageNotFoundException", (Exception,), {})
+            module.FailSafeException = type("FailSafeException", (Exception,), {})
+            module.position = lambda: (0, 0)
+            module.size = lambda: (1920, 1080)
+
+
+_install_placeholders()
+
+
+@pytest.fixture(scope="session")
+def mcs():
+    """主程序模块"""
+    import Mouse_Click_Simulator
+    return Mouse_Click_Simulator
+
+
+@pytest.fixture
+def trigger_config(mcs):
+    """返回 make(**字段)：所有触发器关闭的 TriggerConfig，按需覆盖字段"""
+    defaults = dict(
+        color_enabled=False, color_x=0, color_y=0, target_rgb=(0, 0, 0), color_tolerance=0,
+        area_enabled=False, area_region=None, area_rgb=(0, 0, 0), area_tolerance=0, area_mode="any",
+        area_percent=50.0, signature_enabled=False, signature=None, expression_enabled=False, expression=None,
+        image_enabled=False, image_path="", confidence=0.9, image_region=None, image_locality=False,
+        image_grayscale=False, image_matcher="pyramid", template_set_enabled=False, template_paths=(),
+        template_set_mode="any", timer_enabled=False, start_seconds=0, end_seconds=0, schedule=None
+    )
+
+    def make(**fields):
+        return mcs.TriggerConfig(**dict(defaults, **fields))
+
+    return make
@@ -0,0 +1,82 @@
+"""区域颜色触发器：区域解析、屏幕边缘裁剪、容差边界以及任意/全部/比例三种条件"""
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("10,20,30,40", (10, 20, 30, 40)),
+    (" 1, 2 ,3,4 ", (1, 2, 3, 4)),
+    ("-5,-5,10,10", (-5, -5, 10, 10)),
+    ("1,2,3", None),
+    ("1,2,3,4,5", None),
+    ("a,b,c,d", None),
+    ("1.5,2,3,4", None),
+    ("", None),
+    ("1,2,0,5", None),
+    ("1,2,5,-1", None),
+])
+def test_parse_region(mcs, text, expected):
+    assert mcs.parse_region(text) == expected
+
+
+def bgr_area(rgb, shape=(4, 5)):
+    red, green, blue = rgb
+    return np.full(shape + (3,), (blue, green, red), dtype=np.uint8)
+
+
+@pytest.mark.parametrize("area_rgb, target_rgb, tolerance, expected", [
+    ((100, 100, 100), (100, 100, 100), 0, 20),
+    ((100, 100, 100), (103, 100, 100), 3, 20),   # 差异正好等于容差时算符合
+    ((100, 100, 100), (103, 100, 100), 2, 0),
+    ((100, 100, 100), (98, 101, 99), 4, 20),     # 容差比较的是三个通道差值之和
+    ((100, 100, 100), (98, 101, 99), 3, 0),
+    ((0, 0, 0), (255, 255, 255), 765, 20),       # 最大差异 765，不会在 uint8 中溢出
+    ((0, 0, 0), (255, 255, 255), 764, 0),
+])
+def test_count_color_matches_tolerance(mcs, area_rgb, target_rgb, tolerance, expected):
+    assert mcs.count_color_matches(bgr_area(area_rgb), target_rgb, tolerance) == expected
+
+
+def half_matching_area():
+    pixels = bgr_area((0, 0, 0), shape=(4, 4))
+    pixels[:2] = (0, 0, 255)  # 上半部分为纯红
+    return pixels
+
+
+@pytest.mark.parametrize("mode, percent, pixels, expected", [
+    ("any", 50.0, half_matching_area(), True),
+    ("any", 50.0, bgr_area((0, 0, 0)), False),
+    ("all", 50.0, half_matching_area(), False),
+    ("all", 50.0, bgr_area((255, 0, 0)), True),
+    ("ratio", 50.0, half_matching_area(), True),   # 正好达到比例
+    ("ratio", 50.1, half_matching_area(), False),
+    ("ratio", 0.1, bgr_area((0, 0, 0)), False),
+    ("any", 50.0, np.zeros((0, 5, 3), dtype=np.uint8), False),  # 空区域不满足
+])
+def test_area_modes(mcs, trigger_config, mode, percent, pixels, expected):
+    config = trigger_config(area_rgb=(255, 0, 0), area_tolerance=0, area_mode=mode, area_percent=percent)
+    assert mcs.area_color_satisfied(pixels, config) is expected
+
+
+@pytest.mark.parametrize("region, shape", [
+    ((90, 70, 20, 20), (10, 10)),
+    ((-5, -4, 10, 10), (6, 5)),
+    ((0, 0, 100, 80), (80, 100)),
+    ((200, 10, 10, 10), (10, 0)),
+    ((-20, 10, 10, 10), (10, 0)),
+])
+def test_frame_region_is_clipped_at_screen_edge(mcs, region, shape):
+    frame = mcs.CapturedFrame(np.zeros((80, 100, 3), dtype=np.uint8), 1, 0, 0, 0)
+    assert frame.region(*region).shape[:2] == shape
+
+
+def test_area_trigger_at_screen_edge(mcs, trigger_config):
+    array = np.zeros((80, 100, 3), dtype=np.uint8)
+    array[:5, :5] = (0, 0, 255)
+    frame = mcs.CapturedFrame(array, 1, 0, 0, 0)
+    # 区域从屏幕左上角之外开始，裁剪后只剩屏幕内的 5x5 红色像素
+    config = trigger_config(area_enabled=True, area_region=(-5, -5, 10, 10), area_rgb=(255, 0, 0), area_mode="all")
+    assert mcs.evaluate_triggers(config, pixel=frame.pixel, area=frame.region)
+    # 完全在屏幕之外的区域不满足
+    config = config.replace(area_region=(150, 0, 10, 10), area_mode="any")
+    assert not mcs.evaluate_triggers(config, pixel=frame.pixel, area=frame.region)
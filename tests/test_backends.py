@@ -0,0 +1,88 @@
+"""输入后端层：内存记录后端的事件顺序、安全包装的紧急停止和松开按键、按名称创建后端"""
+import threading
+
+import pytest
+
+
+def kinds(backend):
+    return [(event[1], event[4]) for event in backend.events]
+
+
+def test_recording_backend_event_order(mcs):
+    backend = mcs.RecordingBackend(start_position=(10, 20))
+    backend.move_rel(5, -5)
+    backend.click("left", clicks=2)
+    backend.mouse_down("right")
+    backend.mouse_up("right")
+    assert kinds(backend) == [("move", None), ("down", "left"), ("up", "left"), ("down", "left"), ("up", "left"),
+                              ("down", "right"), ("up", "right")]
+    assert backend.position() == (15, 15)
+    assert all(event[2:4] == (15, 15) for event in backend.events)
+    timestamps = [event[0] for event in backend.events]
+    assert timestamps == sorted(timestamps)
+    assert backend.count("down") == 3
+    backend.clear()
+    assert backend.events == []
+
+
+def test_guarded_backend_forwards_and_tracks_pressed(mcs):
+    inner = mcs.RecordingBackend()
+    guarded = mcs.GuardedBackend(inner, threading.Event())
+    assert guarded.name == "recording+guard"
+    assert guarded.corners == set()  # 记录后端没有真实鼠标，不做角落检测
+    guarded.move_to(3, 4)
+    guarded.mouse_down("left")
+    guarded.mouse_down("middle")
+    guarded.mouse_up("left")
+    assert guarded.pressed == {"middle"}
+    assert kinds(inner) == [("move", None), ("down", "left"), ("down", "middle"), ("up", "left")]
+
+
+def test_guarded_backend_stop_blocks_presses_but_releases_all(mcs):
+    inner = mcs.RecordingBackend()
+    stop_event = threading.Event()
+    guarded = mcs.GuardedBackend(inner, stop_event)
+    guarded.mouse_down("left")
+    guarded.mouse_down("right")
+    stop_event.set()
+    with pytest.raises(mcs.InjectionStopped):
+        guarded.mouse_down("middle")
+    with pytest.raises(mcs.InjectionStopped):
+        guarded.move_to(1, 1)
+    guarded.release_all()
+    assert guarded.pressed == set()
+    assert sorted(kinds(inner)[2:]) == [("up", "left"), ("up", "right")]
+
+
+def test_guarded_backend_corner_stop(mcs):
+    class CornerBackend(mcs.RecordingBackend):
+        supports_failsafe = True
+
+    inner = CornerBackend(start_position=(0, 0))
+    stop_event = threading.Event()
+    guarded = mcs.GuardedBackend(inner, stop_event)
+    with pytest.raises(mcs.InjectionStopped, match="屏幕角落"):
+        guarded.move_to(50, 50)
+    assert stop_event.is_set()
+    assert inner.events == []
+
+
+def test_session_stop_releases_held_button(mcs):
+    plan = mcs.ClickPlan.compile(click_mode=3, hold_time=1.0, position_mode=1, fixed_position=(5, 5))
+    stop_event = threading.Event()
+    inner = mcs.RecordingBackend()
+    guarded = mcs.GuardedBackend(inner, stop_event)
+    session = mcs.ClickSession("hold", plan, guarded, stop_event=stop_event)
+    assert session.fire(0) is True  # 按下后等待长按结束
+    assert guarded.pressed == {"left"}
+    stop_event.set()
+    assert session.fire(0) is False
+    assert session.finish_reason == "已停止"
+    assert inner.count("down") == inner.count("up") == 1
+    assert guarded.pressed == set()
+
+
+def test_create_input_backend(mcs):
+    assert isinstance(mcs.create_input_backend("recording"), mcs.RecordingBackend)
+    assert isinstance(mcs.create_input_backend("recording", raw=True), mcs.RecordingBackend)
+    assert type(mcs.create_input_backend("unknown")) is mcs.PyAutoGUIBackend
@@ -0,0 +1,94 @@
+"""变化检测：同一帧或像素未变化时复用上一次的匹配结果"""
+import numpy as np
+
+
+def frame(mcs, array, seq):
+    return mcs.CapturedFrame(array, seq, 0, 0, 0)
+
+
+class Counter:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.calls
+
+
+def test_same_frame_and_unchanged_pixels_are_skipped(mcs):
+    gate = mcs.ChangeGate()
+    compute = Counter()
+    pixels = np.zeros((120, 160, 3), dtype=np.uint8)
+    assert gate.run("k", frame(mcs, pixels, 1), None, compute) == 1
+    assert gate.run("k", frame(mcs, pixels, 1), None, compute) == 1
+    assert gate.run("k", frame(mcs, pixels.copy(), 2), None, compute) == 1
+    assert compute.calls == 1
+    assert gate.skips == 2
+
+    changed = pixels.copy()
+    changed[60:60 + mcs.ChangeGate.SAMPLE_ROW_STEP, 80] = 255
+    assert gate.run("k", frame(mcs, changed, 3), None, compute) == 2
+
+
+def test_only_region_pixels_matter(mcs):
+    gate = mcs.ChangeGate()
+    compute = Counter()
+    region = (10, 10, 30, 20)
+    pixels = np.zeros((120, 160, 3), dtype=np.uint8)
+    gate.run("k", frame(mcs, pixels, 1), region, compute)
+
+    outside = pixels.copy()
+    outside[100, 100] = 255
+    gate.run("k", frame(mcs, outside, 2), region, compute)
+    assert compute.calls == 1
+
+    inside = outside.copy()
+    inside[15, 15] = 255
+    gate.run("k", frame(mcs, inside, 3), region, compute)
+    assert compute.calls == 2
+
+
+def test_keys_are_independent_and_bounded(mcs):
+    gate = mcs.ChangeGate(max_entries=2)
+    compute = Counter()
+    pixels = np.zeros((10, 10, 3), dtype=np.uint8)
+    for key in ("a", "b", "c"):
+        gate.run(key, frame(mcs, pixels, 1), None, compute)
+    assert compute.calls == 3
+    assert list(gate.entries) == ["b", "c"]
+    gate.run("a", frame(mcs, pixels, 1), None, compute)
+    assert compute.calls == 4
+
+
+def test_full_frame_hashes_sampled_rows(mcs):
+    gate = mcs.ChangeGate()
+    compute = Counter()
+    step = mcs.ChangeGate.SAMPLE_ROW_STEP
+    pixels = np.zeros((120, 160, 3), dtype=np.uint8)
+    gate.run("k", frame(mcs, pixels, 1), None, compute)
+
+    # 没有区域时只看采样行：落在两行采样之间的单行变化被忽略
+    thin = pixels.copy()
+    thin[step + 1, :] = 255
+    gate.run("k", frame(mcs, thin, 2), None, compute)
+    assert compute.calls == 1
+
+    # 高度达到采样步长的变化一定会覆盖某个采样行
+    block = pixels.copy()
+    block[step + 1:2 * step + 1, 40:60] = 255
+    gate.run("k", frame(mcs, block, 3), None, compute)
+    assert compute.calls == 2
+
+    # 设置区域时区域内的每一行都参与哈希
+    region = (0, 0, 160, 40)
+    gate.run("r", frame(mcs, pixels, 4), region, compute)
+    gate.run("r", frame(mcs, thin, 5), region, compute)
+    assert compute.calls == 4
+
+
+def test_resolution_change_is_not_skipped(mcs):
+    gate = mcs.ChangeGate()
+    compute = Counter()
+    gate.run("k", frame(mcs, np.zeros((120, 160, 3), dtype=np.uint8), 1), None, compute)
+    gate.run("k", frame(mcs, np.zeros((240, 160, 3), dtype=np.uint8), 2), None, compute)
+    assert compute.calls == 2
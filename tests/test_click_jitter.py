@@ -0,0 +1,32 @@
+"""预生成的随机偏移和随机间隔：固定种子可复现（包括种子 0）"""
+
+
+def test_runner_seeded_offsets_are_reproducible(mcs):
+    def positions(seed):
+        plan = mcs.ClickPlan.compile(position_mode=1, fixed_position=(100, 100), anti_detect=True,
+                                     random_offset=5, jitter_seed=seed)
+        backend = mcs.RecordingBackend()
+        runner = mcs.ClickPlanRunner(plan, backend)
+        try:
+            for _ in range(20):
+                runner.run_cycle()
+        finally:
+            runner.close()
+        return [event[2:4] for event in backend.events if event[1] == "move"]
+
+    first = positions(7)
+    assert first == positions(7)
+    assert all(95 <= x <= 105 and 95 <= y <= 105 for x, y in first)
+
+
+def test_runner_seed_zero_is_reproducible(mcs):
+    def intervals(seed):
+        plan = mcs.ClickPlan.compile(random_interval=True, min_interval=0.05, max_interval=0.2, jitter_seed=seed)
+        runner = mcs.ClickPlanRunner(plan, mcs.RecordingBackend())
+        try:
+            return [runner.next_interval() for _ in range(10)]
+        finally:
+            runner.close()
+
+    assert intervals(0) == intervals(0)
+    assert intervals(0) != intervals(1)
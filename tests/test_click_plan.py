@@ -0,0 +1,23 @@
+"""ClickPlan 编译：界面设置一次性解析成不可变的普通数据"""
+import pytest
+
+
+def test_compile_adds_move_and_recoil(mcs):
+    plan = mcs.ClickPlan.compile(button="右键", click_mode=3, hold_time=0.2, position_mode=1,
+                                 fixed_position=(10, 20), recoil_pattern=[(0, 2), (1, 3)])
+    assert plan.button == "right"
+    assert plan.timeline[0] == (0.0, "move", None)
+    assert plan.timeline[-1] == (0.2, "recoil", None)
+    assert plan.positions == ((10, 20),)
+    assert not plan.follow_cursor
+    assert plan.recoil == ((0, 2), (1, 3))
+
+
+def test_plan_is_immutable(mcs):
+    plan = mcs.ClickPlan.compile(button="中键", interval=0.25, click_limit=10)
+    assert plan.button == "middle"
+    assert plan.click_limit == 10
+    with pytest.raises(AttributeError):
+        plan.button = "left"
+    changed = plan.replace(click_limit=None)
+    assert changed.click_limit is None and plan.click_limit == 10
@@ -0,0 +1,114 @@
+"""ClickScheduler：多会话调度时阻塞的后端不影响其他会话和事件循环"""
+import asyncio
+import sys
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def core(mcs):
+    core = mcs.AsyncCore()
+    yield core
+    core.stop()
+
+
+def make_blocking_backend(mcs, pause):
+    class BlockingBackend(mcs.RecordingBackend):
+        """模拟 pyautogui 的 PAUSE：每次按下/松开都阻塞 pause 秒"""
+
+        def _record(self, kind, button=None):
+            super()._record(kind, button)
+            if kind in ("down", "up"):
+                time.sleep(pause)
+
+    return BlockingBackend()
+
+
+def run_sessions(mcs, scheduler, sessions, duration):
+    finished = threading.Semaphore(0)
+    for session in sessions:
+        session.on_finish = lambda _: finished.release()
+        scheduler.add_session(session)
+    time.sleep(duration)
+    for session in sessions:
+        scheduler.remove_session(session.name)
+    for _ in sessions:
+        assert finished.acquire(timeout=5)
+
+
+def test_blocking_session_does_not_delay_other_session(mcs, core):
+    scheduler = mcs.ClickScheduler(core)
+    slow = mcs.ClickSession("slow", mcs.ClickPlan.compile(interval=0.05, position_mode=1),
+                            make_blocking_backend(mcs, 0.1))
+    fast_backend = mcs.RecordingBackend()
+    fast = mcs.ClickSession("fast", mcs.ClickPlan.compile(interval=0.05, position_mode=1), fast_backend)
+    run_sessions(mcs, scheduler, [slow, fast], 1.0)
+
+    # 慢会话每次点击阻塞 0.2 秒，快会话仍按自己的截止时间点击
+    assert slow.stats.clicks <= 6
+    assert fast.stats.clicks >= 18
+    p50, p99 = fast.stats.lateness_percentiles()
+    assert p99 < 10.0
+    downs = [event[0] for event in fast_backend.events if event[1] == "down"]
+    gaps_ms = [(b - a) / 1e6 for a, b in zip(downs, downs[1:])]
+    assert max(gaps_ms) < 60.0
+
+
+def test_event_loop_stays_responsive_during_blocking_injection(mcs, core):
+    scheduler = mcs.ClickScheduler(core)
+    slow = mcs.ClickSession("slow", mcs.ClickPlan.compile(interval=0.0, position_mode=1),
+                            make_blocking_backend(mcs, 0.1))
+    scheduler.add_session(slow)
+    try:
+        time.sleep(0.05)
+        for _ in range(5):
+            start = time.perf_counter()
+            core.submit(asyncio.sleep(0)).result(timeout=1)
+            assert time.perf_counter() - start < 0.02
+            time.sleep(0.03)
+    finally:
+        scheduler.remove_session(slow.name)
+
+
+def test_remove_session_while_in_flight_finishes_once(mcs, core):
+    scheduler = mcs.ClickScheduler(core)
+    finished = []
+    session = mcs.ClickSession("slow", mcs.ClickPlan.compile(interval=0.5, position_mode=1),
+                               make_blocking_backend(mcs, 0.1), on_finish=finished.append)
+    scheduler.add_session(session)
+    time.sleep(0.05)  # 第一次点击还在阻塞中
+    scheduler.remove_session(session.name)
+    deadline = time.perf_counter() + 2
+    while not finished and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.1)
+    assert finished == [session]
+    assert session.finish_reason == "已停止"
+    assert session.stats.clicks == 1
+    assert scheduler.get_sessions() == []
+
+
+def test_spinning_session_yields_the_gil(mcs, core):
+    # 切换间隔放大到 1 秒：自旋时不主动让出 GIL 的话，其他线程要等到自旋结束才能继续
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1.0)
+    try:
+        scheduler = mcs.ClickScheduler(core, spin_threshold=0.3)
+        session = mcs.ClickSession("spin", mcs.ClickPlan.compile(interval=0.3, position_mode=1),
+                                   mcs.RecordingBackend())
+        scheduler.add_session(session)
+        gaps = []
+        last = time.perf_counter()
+        end = last + 0.5
+        while last < end:
+            time.sleep(0.001)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+        scheduler.remove_session(session.name)
+    finally:
+        sys.setswitchinterval(switch_interval)
+    assert session.stats.clicks >= 2
+    assert max(gaps) < 0.05
@@ -0,0 +1,58 @@
+"""点击模式的事件时间轴：双击、三连击、长按和组合键编译成带时间戳的事件，不在循环里等待"""
+
+
+def test_single_click_timeline(mcs):
+    timeline, clicks = mcs.ClickPlan.compile_timeline("left", 0, 0.1, ())
+    assert timeline == ((0.0, "down", "left"), (0.0, "up", "left"))
+    assert clicks == 1
+
+
+def test_double_and_triple_click_timeline(mcs):
+    timeline, clicks = mcs.ClickPlan.compile_timeline("right", 1, 0.1, (), double_click_interval=0.05)
+    assert clicks == 2
+    assert [offset for offset, kind, _ in timeline if kind == "down"] == [0.0, 0.05]
+    timeline, clicks = mcs.ClickPlan.compile_timeline("left", 2, 0.1, (), triple_click_interval=0.1)
+    assert clicks == 3
+    assert [offset for offset, kind, _ in timeline if kind == "up"] == [0.0, 0.1, 0.2]
+
+
+def test_hold_and_combo_timeline(mcs):
+    timeline, clicks = mcs.ClickPlan.compile_timeline("left", 3, 0.3, ())
+    assert timeline == ((0.0, "down", "left"), (0.3, "up", "left"))
+    assert clicks == 1
+    timeline, clicks = mcs.ClickPlan.compile_timeline("left", 0, 0.3, ("left", "right"), combo_hold=0.05)
+    assert timeline == ((0.0, "down", "left"), (0.0, "down", "right"),
+                        (0.05, "up", "right"), (0.05, "up", "left"))
+    assert clicks == 2
+
+
+def test_runner_merges_zero_gap_down_up_into_click(mcs):
+    plan = mcs.ClickPlan.compile(click_mode=1, double_click_interval=0.05, position_mode=2,
+                                 positions=[(1, 1), (2, 2)])
+    backend = mcs.RecordingBackend()
+    runner = mcs.ClickPlanRunner(plan, backend)
+    try:
+        names = [action.__name__ for _, action, _ in runner.events]
+        assert names == ["aim", "click", "click"]
+        # 第一组事件（移动和第一次点击）执行后返回第二次点击的偏移
+        assert runner.fire_due() == 50_000_000
+        assert runner.fire_due() is None
+        assert [event[1] for event in backend.events] == ["move", "down", "up", "down", "up"]
+        runner.run_cycle()
+        assert backend.events[-1][2:4] == (2, 2)  # 多坐标循环前进到下一个坐标
+    finally:
+        runner.close()
+
+
+def test_runner_release_all_after_stop_mid_hold(mcs):
+    plan = mcs.ClickPlan.compile(click_mode=3, hold_time=1.0, position_mode=1, fixed_position=(5, 5))
+    backend = mcs.RecordingBackend()
+    runner = mcs.ClickPlanRunner(plan, backend)
+    try:
+        assert runner.fire_due() == 1_000_000_000
+        assert runner.pressed == {"left"}
+        runner.release_all()
+        assert runner.pressed == set()
+        assert backend.count("up") == 1
+    finally:
+        runner.close()
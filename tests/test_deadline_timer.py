@@ -0,0 +1,33 @@
+"""DeadlineTimer：按绝对截止时间推进、落后太多时重新对齐、等待与停止"""
+import threading
+import time
+
+
+def test_deadline_timer_advances_without_drift(mcs):
+    timer = mcs.DeadlineTimer()
+    start_ns = timer.deadline_ns
+    for _ in range(5):
+        timer.advance(0.01)
+    assert timer.deadline_ns == start_ns + 5 * 10_000_000
+    assert timer.resyncs == 0
+
+
+def test_deadline_timer_resyncs_when_far_behind(mcs):
+    timer = mcs.DeadlineTimer()
+    timer.deadline_ns -= 1_000_000_000
+    timer.advance(0.01)
+    assert timer.resyncs == 1
+    assert timer.deadline_ns >= time.perf_counter_ns() - 10_000_000
+
+
+def test_deadline_timer_wait(mcs):
+    timer = mcs.DeadlineTimer()
+    timer.advance(0.02)
+    lateness_ns = timer.wait(threading.Event())
+    assert lateness_ns is not None and lateness_ns >= 0
+    assert time.perf_counter_ns() >= timer.deadline_ns
+
+    stop_event = threading.Event()
+    stop_event.set()
+    timer.advance(10.0)
+    assert timer.wait(stop_event) is None
@@ -0,0 +1,78 @@
+"""特征点匹配：缩放、旋转后的目标仍能找到，得分为反投影回模板后的相关系数；缺少的检测器在基准测试中报告"""
+import logging
+
+import cv2
+import pytest
+
+SIZE = 96
+
+
+@pytest.fixture
+def template(mcs, tmp_path):
+    path = str(tmp_path / "widget.png")
+    cv2.imencode(".png", mcs.synthetic_widget(SIZE, seed=1))[1].tofile(path)
+    return mcs.TemplateCache().get(path)
+
+
+def make_matcher(mcs, detector):
+    if not mcs.feature_detector_available(detector):
+        pytest.skip(f"当前 OpenCV 不提供 {detector.upper()}")
+    return mcs.FeatureMatcher(detector)
+
+
+@pytest.mark.parametrize("detector", ["orb", "akaze", "sift"])
+@pytest.mark.parametrize("scale, angle", [(1.0, 0), (0.8, 0), (1.3, 0), (1.2, 10)])
+def test_finds_scaled_and_rotated_target(mcs, template, detector, scale, angle):
+    matcher = make_matcher(mcs, detector)
+    frame = mcs.synthetic_screen(640, 360, seed=4)
+    center_x, center_y = mcs.place_transformed(frame, mcs.synthetic_widget(SIZE, seed=1), 250, 120, scale, angle)
+    box, score = matcher.best_match(template, frame, 0.8)
+    assert box is not None
+    x, y, width, height = box
+    assert abs(x + width / 2 - center_x) <= 4 and abs(y + height / 2 - center_y) <= 4
+    # 匹配区域按单应矩阵反投影回模板坐标后与模板几乎一致
+    assert score >= 0.8
+    assert matcher.inliers >= matcher.min_inliers
+    assert matcher.match(template, frame, 0.8) == box
+    assert matcher.found == 2
+
+
+def test_pyramid_matcher_misses_scaled_target(mcs, template):
+    # 对照：模板匹配不适应缩放，这正是特征点匹配的用途
+    frame = mcs.synthetic_screen(640, 360, seed=4)
+    mcs.place_transformed(frame, mcs.synthetic_widget(SIZE, seed=1), 250, 120, 1.3, 0)
+    assert mcs.PyramidMatcher().match(template, frame, 0.8) is None
+
+
+@pytest.mark.parametrize("detector", ["orb", "akaze", "sift"])
+def test_absent_target_is_not_matched(mcs, template, detector):
+    matcher = make_matcher(mcs, detector)
+    frame = mcs.synthetic_screen(640, 360, seed=4)
+    frame[100:100 + SIZE, 250:250 + SIZE] = mcs.synthetic_widget(SIZE, seed=7)
+    assert matcher.match(template, frame, 0.8) is None
+    assert matcher.found == 0
+
+
+def test_template_features_are_cached(mcs, template):
+    matcher = make_matcher(mcs, "orb")
+    assert matcher.template_features(template) is matcher.template_features(template)
+
+
+def test_unavailable_detector_raises(mcs, monkeypatch):
+    monkeypatch.setattr(mcs, "feature_detector_available", lambda name: False)
+    with pytest.raises(RuntimeError, match="ORB"):
+        mcs.FeatureMatcher("orb")
+
+
+def test_benchmark_reports_unavailable_detector(mcs, monkeypatch, caplog):
+    monkeypatch.setattr(mcs, "feature_detector_available", lambda name: name == "orb")
+    with caplog.at_level(logging.WARNING):
+        results = mcs.benchmark_feature_matching(frame_size=(640, 360), template_size=64,
+                                                 transforms=((1.0, 0),), repeats=1)
+    assert set(results) == {"x1.r0.full", "x1.r0.roi"}
+    for entry in results.values():
+        assert "orb_p50_ms" in entry and "pyramid_p50_ms" in entry
+        for name in ("akaze", "sift"):
+            assert name.upper() in entry[f"{name}_error"]
+            assert f"{name}_p50_ms" not in entry
+    assert "AKAZE" in caplog.text and "SIFT" in caplog.text
@@ -0,0 +1,106 @@
+"""采集服务的帧序号、借用和环形缓冲区（使用不访问屏幕的假截屏实现）"""
+import threading
+import time
+
+import numpy as np
+
+
+class CountingGrabber:
+    """每帧把全部像素写成帧计数（取低 8 位）"""
+    name = "fake"
+
+    def __init__(self, shape=(48, 64, 3)):
+        self.shape = shape
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def grab_into(self, out):
+        with self.lock:
+            self.count += 1
+            value = self.count % 256
+        if out is None or out.shape != self.shape:
+            out = np.empty(self.shape, dtype=np.uint8)
+        out.fill(value)
+        return out
+
+    def close(self):
+        pass
+
+
+def make_service(mcs, **kwargs):
+    return mcs.FrameCaptureService(grabber=CountingGrabber(), **kwargs)
+
+
+def test_borrow_returns_increasing_seq(mcs):
+    service = make_service(mcs, fps=200)
+    try:
+        with service.borrow("test") as first:
+            assert first is not None and first.seq >= 1
+            first_seq = first.seq
+            assert not first.array.flags.writeable
+        with service.borrow("test", after_seq=first_seq) as second:
+            assert second is not None and second.seq > first_seq
+        assert "test" in service.consumer_lag_ms
+    finally:
+        service.stop()
+
+
+def test_borrowed_frame_is_not_overwritten(mcs):
+    service = make_service(mcs, fps=200, ring_size=3)
+    try:
+        with service.borrow("test") as frame:
+            value = int(frame.array[0, 0, 0])
+            seq = frame.seq
+            # 等待采集线程再写入几帧，借出的槽位必须保持不变
+            for _ in range(5):
+                with service.borrow("other", after_seq=seq) as newer:
+                    assert newer is not None
+                    assert newer.slot != frame.slot
+                    seq = newer.seq
+            assert (frame.array == value).all()
+        assert sum(service.borrowed) == 0
+    finally:
+        service.stop()
+
+
+def test_first_fill_keeps_borrowed_slot(mcs):
+    service = make_service(mcs, fps=200, ring_size=3)
+    try:
+        # 借用第一帧时其他槽位还没有分配缓冲区，后续首次写入不能使这次借用失效
+        with service.borrow("test") as frame:
+            generation = frame.generation
+            with service.borrow("other", after_seq=frame.seq + 2) as newer:
+                assert newer is not None
+            assert service.generation == generation
+            assert service.borrowed[frame.slot] == 1
+    finally:
+        service.stop()
+
+
+def test_borrow_after_idle_restart_waits_for_new_frame(mcs):
+    service = make_service(mcs, fps=50, idle_timeout=0.05)
+    try:
+        with service.borrow("test") as frame:
+            old_seq = frame.seq
+            old_value = int(frame.array[0, 0, 0])
+        deadline = time.perf_counter() + 2
+        while service.running and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        assert not service.running
+        assert service.current_seq is None
+        # 空闲停止期间画面已经变化：重启后借到的必须是新采集的一帧
+        service.grabber.count += 10
+        with service.borrow("test") as frame:
+            assert frame is not None
+            assert frame.seq > old_seq
+            assert int(frame.array[0, 0, 0]) > old_value + 10
+    finally:
+        service.stop()
+
+
+def test_stop_ends_thread(mcs):
+    service = make_service(mcs, fps=100)
+    with service.borrow("test") as frame:
+        assert frame is not None
+    service.stop()
+    assert not service.running
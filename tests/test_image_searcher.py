@@ -0,0 +1,83 @@
+"""图像搜索的区域限制（ROI）和位置预测：命中、未命中回退到完整搜索、坐标换算回整帧"""
+import cv2
+import pytest
+
+SIZE = 48
+
+
+@pytest.fixture
+def template(mcs, tmp_path):
+    path = str(tmp_path / "widget.png")
+    cv2.imencode(".png", mcs.synthetic_widget(SIZE, seed=1))[1].tofile(path)
+    return mcs.TemplateCache().get(path)
+
+
+def scene(mcs, x, y):
+    frame = mcs.synthetic_screen(640, 360, seed=5)
+    frame[y:y + SIZE, x:x + SIZE] = mcs.synthetic_widget(SIZE, seed=1)
+    return frame
+
+
+class SpyMatcher:
+    """记录每次实际搜索的画面尺寸，匹配交给 PyramidMatcher"""
+
+    def __init__(self, mcs):
+        self.inner = mcs.PyramidMatcher()
+        self.shapes = []
+
+    def __call__(self, template, haystack, confidence, grayscale=False):
+        self.shapes.append(haystack.shape[:2])
+        return self.inner(template, haystack, confidence, grayscale)
+
+
+@pytest.mark.parametrize("region, expected, searched", [
+    (None, (300, 200, SIZE, SIZE), (360, 640)),
+    ((250, 150, 200, 150), (300, 200, SIZE, SIZE), (150, 200)),
+    ((0, 0, 200, 150), None, (150, 200)),
+    # 超出屏幕的区域裁剪到画面边缘
+    ((500, 100, 400, 400), None, (260, 140)),
+    ((280, 180, 1000, 1000), (300, 200, SIZE, SIZE), (180, 360)),
+])
+def test_region_search(mcs, template, region, expected, searched):
+    spy = SpyMatcher(mcs)
+    searcher = mcs.ImageSearcher(spy)
+    assert searcher.locate(template, scene(mcs, 300, 200), 0.9, region=region) == expected
+    assert spy.shapes == [searched]
+
+
+def test_locality_hit_searches_only_the_window(mcs, template):
+    spy = SpyMatcher(mcs)
+    searcher = mcs.ImageSearcher(spy, margin=32)
+    assert searcher.locate(template, scene(mcs, 300, 200), 0.9, locality=True, key="a") == (300, 200, SIZE, SIZE)
+    # 目标小幅移动，仍在上次位置周围的窗口内
+    assert searcher.locate(template, scene(mcs, 320, 190), 0.9, locality=True, key="a") == (320, 190, SIZE, SIZE)
+    assert (searcher.hits, searcher.misses, searcher.full_searches) == (1, 0, 1)
+    assert spy.shapes[1] == (SIZE + 64, SIZE + 64)
+
+
+def test_locality_miss_falls_back_to_full_search(mcs, template):
+    spy = SpyMatcher(mcs)
+    searcher = mcs.ImageSearcher(spy, margin=32)
+    searcher.locate(template, scene(mcs, 300, 200), 0.9, locality=True, key="a")
+    assert searcher.locate(template, scene(mcs, 20, 30), 0.9, locality=True, key="a") == (20, 30, SIZE, SIZE)
+    assert (searcher.hits, searcher.misses, searcher.full_searches) == (0, 1, 2)
+    assert spy.shapes == [(360, 640), (SIZE + 64, SIZE + 64), (360, 640)]
+    assert searcher.last_box == (20, 30, SIZE, SIZE)
+
+
+def test_locality_window_stays_inside_region(mcs, template):
+    spy = SpyMatcher(mcs)
+    searcher = mcs.ImageSearcher(spy, margin=32)
+    region = (280, 180, 100, 100)
+    searcher.locate(template, scene(mcs, 300, 200), 0.9, region=region, locality=True, key="a")
+    assert searcher.locate(template, scene(mcs, 300, 200), 0.9, region=region, locality=True, key="a") == \
+        (300, 200, SIZE, SIZE)
+    assert spy.shapes[1] == (100, 100)
+
+
+def test_new_key_discards_last_position(mcs, template):
+    spy = SpyMatcher(mcs)
+    searcher = mcs.ImageSearcher(spy)
+    searcher.locate(template, scene(mcs, 300, 200), 0.9, locality=True, key="a")
+    searcher.locate(template, scene(mcs, 300, 200), 0.9, locality=True, key="b")
+    assert (searcher.hits, searcher.misses, searcher.full_searches) == (0, 0, 2)
@@ -0,0 +1,71 @@
+"""原始注入后端：平台层函数的检测、回退和实时鼠标位置（使用假的 pyautogui 模块）"""
+import types
+
+
+class FakePlatform:
+    def __init__(self):
+        self.x, self.y = 100, 100
+        self.calls = []
+
+    def _position(self):
+        return self.x, self.y
+
+    def _moveTo(self, x, y):
+        self.x, self.y = x, y
+        self.calls.append(("move", x, y))
+
+    def _mouseDown(self, x, y, button):
+        self.calls.append(("down", x, y, button))
+
+    def _mouseUp(self, x, y, button):
+        self.calls.append(("up", x, y, button))
+
+
+def fake_pyautogui(platform):
+    calls = []
+    module = types.SimpleNamespace(
+        platformModule=platform,
+        __version__="test",
+        moveTo=lambda x, y, _pause=True: calls.append(("moveTo", x, y, _pause)),
+        mouseDown=lambda button, _pause=True: calls.append(("mouseDown", button, _pause)),
+        mouseUp=lambda button, _pause=True: calls.append(("mouseUp", button, _pause)),
+        position=lambda: (7, 8),
+    )
+    return module, calls
+
+
+def test_uses_platform_layer_and_live_position(mcs, monkeypatch):
+    platform = FakePlatform()
+    module, public_calls = fake_pyautogui(platform)
+    monkeypatch.setattr(mcs, "pyautogui", module)
+    backend = mcs.RawPyAutoGUIBackend()
+    backend.move_to(10, 20)
+    platform.x, platform.y = 300, 400  # 用户在两次调用之间移动了鼠标
+    backend.move_rel(5, -5)
+    backend.mouse_down("left")
+    backend.mouse_up("left")
+    assert platform.calls == [("move", 10, 20), ("move", 305, 395),
+                              ("down", 305, 395, "left"), ("up", 305, 395, "left")]
+    assert public_calls == []
+
+
+def test_falls_back_to_public_api_when_platform_layer_missing(mcs, monkeypatch):
+    module, public_calls = fake_pyautogui(types.SimpleNamespace(_moveTo=lambda x, y: None))
+    monkeypatch.setattr(mcs, "pyautogui", module)
+    backend = mcs.RawPyAutoGUIBackend()
+    assert backend.platform is None
+    backend.move_rel(1, 2)
+    backend.mouse_down("right")
+    backend.mouse_up("right")
+    assert public_calls == [("moveTo", 8, 10, False), ("mouseDown", "right", False), ("mouseUp", "right", False)]
+
+
+def test_falls_back_when_platform_signature_changes(mcs, monkeypatch):
+    platform = FakePlatform()
+    platform._mouseDown = lambda x, y: None  # 新版本改了参数
+    module, public_calls = fake_pyautogui(platform)
+    monkeypatch.setattr(mcs, "pyautogui", module)
+    backend = mcs.RawPyAutoGUIBackend()
+    backend.mouse_down("left")
+    assert backend.platform is None
+    assert public_calls == [("mouseDown", "left", False)]
@@ -0,0 +1,58 @@
+"""触发点击延迟统计：各阶段分位数和直方图、空记录、环形缓冲区覆盖最旧样本"""
+import pytest
+
+MS = 1_000_000
+
+
+def record(mcs, recorder, capture_ms, changed_ms, decision_ms, injected_ms):
+    state = mcs.TriggerState(satisfied=True, timestamp_ns=changed_ms * MS, changed_ns=changed_ms * MS,
+                             capture_ns=capture_ms * MS, edges=1)
+    recorder.record(state, decision_ms * MS, injected_ms * MS)
+
+
+def test_report_percentiles_and_histogram(mcs):
+    recorder = mcs.LatencyRecorder()
+    for i in range(1, 101):
+        # 采集→匹配 i 毫秒，匹配→决策 0，决策→注入固定 2 毫秒
+        record(mcs, recorder, 1000, 1000 + i, 1000 + i, 1002 + i)
+    report = recorder.report()
+    assert list(report) == ["采集→匹配", "匹配→决策", "决策→注入", "总计"]
+    match = report["采集→匹配"]
+    assert match["count"] == 100
+    assert match["p50_ms"] == pytest.approx(50.5)
+    assert match["p99_ms"] == pytest.approx(99.01)
+    assert match["max_ms"] == pytest.approx(100.0)
+    assert match["histogram"] == {
+        "<1ms": 0, "1-2ms": 1, "2-5ms": 3, "5-10ms": 5, "10-20ms": 10, "20-50ms": 30, "50-100ms": 50,
+        "100-200ms": 1, "200-500ms": 0, "≥500ms": 0
+    }
+    assert report["匹配→决策"]["max_ms"] == 0.0
+    assert report["决策→注入"]["p50_ms"] == report["决策→注入"]["p99_ms"] == pytest.approx(2.0)
+    assert report["总计"]["max_ms"] == pytest.approx(102.0)
+    assert sum(report["总计"]["histogram"].values()) == 100
+
+
+def test_empty_recorder(mcs):
+    recorder = mcs.LatencyRecorder()
+    assert recorder.report() == {}
+    assert all(len(values) == 0 for values in recorder.stage_ms().values())
+    record(mcs, recorder, 0, 1, 2, 3)
+    assert recorder.report()["总计"]["count"] == 1
+    recorder.clear()
+    assert recorder.report() == {}
+
+
+def test_ring_buffer_keeps_latest_samples(mcs):
+    recorder = mcs.LatencyRecorder(max_samples=3)
+    for i in range(1, 6):
+        record(mcs, recorder, 0, i, i, i)
+    assert len(recorder.samples) == 3
+    assert list(recorder.stage_ms()["采集→匹配"]) == [3.0, 4.0, 5.0]
+    report = recorder.report()["采集→匹配"]
+    assert report["count"] == 3
+    assert report["max_ms"] == 5.0
+
+
+def test_negative_durations_fall_into_first_bin(mcs):
+    # 采集时刻可能来自其他线程的时钟读数，略晚于状态翻转时直方图按 0 计
+    assert list(mcs.LatencyRecorder.histogram([-0.5, 0.5, 1.5])[:2]) == [2, 1]
@@ -0,0 +1,76 @@
+"""宏录制与回放：监听线程的事件投递到事件循环，回放时按录制的间隔执行"""
+import threading
+import time
+import types
+
+import pytest
+
+
+@pytest.fixture
+def core(mcs):
+    core = mcs.AsyncCore()
+    yield core
+    core.stop()
+
+
+class FakeListener:
+    """代替 pynput.mouse.Listener：start 后由测试在另一个线程里调用回调"""
+
+    def __init__(self, on_move, on_click):
+        self.on_move = on_move
+        self.on_click = on_click
+        self.started = self.stopped = False
+
+    def start(self):
+        self.started = True
+
+    def stop(self):
+        self.stopped = True
+
+
+def test_recorder_collects_listener_events(mcs, core):
+    listeners = []
+
+    def create_listener(**callbacks):
+        listeners.append(FakeListener(**callbacks))
+        return listeners[-1]
+
+    recorder = mcs.MacroRecorder(core, create_listener)
+    recorder.start()
+    listener = listeners[0]
+    assert listener.started
+
+    def user():
+        listener.on_move(10, 20)
+        listener.on_move(10, 20)  # 位置没变的移动不录制
+        time.sleep(0.05)
+        listener.on_move(30, 40)
+        listener.on_click(30, 40, types.SimpleNamespace(name="left"), True)
+        listener.on_click(30, 40, types.SimpleNamespace(name="left"), False)
+        listener.on_click(30, 40, types.SimpleNamespace(name="x1"), True)
+
+    thread = threading.Thread(target=user)
+    thread.start()
+    thread.join()
+    actions = recorder.stop()
+    assert listener.stopped
+    assert [(action['type'], action.get('button')) for action in actions] == [
+        ("move", None), ("move", None), ("click", "left")]
+    assert actions[2]['x'] == 30 and actions[2]['y'] == 40
+    # time 是到下一个动作的等待时间，最后一个动作为 0
+    assert actions[0]['time'] >= 0.045
+    assert actions[-1]['time'] == 0.0
+
+    # 停止后迟到的事件不再录制
+    listener.on_move(1, 1)
+    time.sleep(0.02)
+    assert len(recorder.actions) == 3
+
+
+def test_playback_moves_before_click(mcs, core):
+    actions = [{'type': 'move', 'x': 1, 'y': 2, 'time': 0.01},
+               {'type': 'click', 'button': 'right', 'x': 5, 'y': 6, 'time': 0.0}]
+    backend = mcs.RecordingBackend()
+    core.submit(mcs.play_macro_actions(actions, backend)).result(timeout=2)
+    assert [(event[1], event[2], event[3], event[4]) for event in backend.events] == [
+        ("move", 1, 2, None), ("move", 5, 6, None), ("down", 5, 6, "right"), ("up", 5, 6, "right")]
@@ -0,0 +1,74 @@
+"""多点像素签名：文本解析（含格式错误）、容差边界、外接矩形超出屏幕"""
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize("text, points", [
+    ("10,20,#FF0000", ((10, 20, (255, 0, 0), 10),)),
+    ("10,20,#ff8000,0", ((10, 20, (255, 128, 0), 0),)),
+    (" 1 , 2 , #000000 , 30 ", ((1, 2, (0, 0, 0), 30),)),
+    ("# 注释\n\n5,5,#010203,1\n   \n6,7,#FFFFFF", ((5, 5, (1, 2, 3), 1), (6, 7, (255, 255, 255), 10))),
+])
+def test_parse(mcs, text, points):
+    assert mcs.PixelSignature.parse(text).points == points
+
+
+@pytest.mark.parametrize("text", ["", "\n  \n", "# 只有注释"])
+def test_parse_empty_returns_none(mcs, text):
+    assert mcs.PixelSignature.parse(text) is None
+
+
+@pytest.mark.parametrize("text, message", [
+    ("10,20", "第 1 行格式应为"),
+    ("10,20,#FF0000,5,9", "第 1 行格式应为"),
+    ("# 注释\n10,20,#GG0000", "第 2 行颜色无效"),
+    ("10,20,不是颜色,5", "第 1 行颜色无效"),
+    ("x,20,#FF0000", "invalid literal"),
+    ("10,20,#FF0000,1.5", "invalid literal"),
+])
+def test_parse_errors(mcs, text, message):
+    with pytest.raises(ValueError, match=message):
+        mcs.PixelSignature.parse(text)
+
+
+def signature_area(mcs, text, fill):
+    signature = mcs.PixelSignature.parse(text)
+    width, height = signature.bbox[2:]
+    pixels = np.full((height, width, 3), fill[::-1], dtype=np.uint8)
+    return signature, pixels
+
+
+@pytest.mark.parametrize("tolerance, fill, expected", [
+    (0, (100, 100, 100), True),
+    (0, (101, 100, 100), False),
+    (6, (102, 102, 98), True),    # 三通道差值之和正好等于容差
+    (5, (102, 102, 98), False),
+    (765, (255, 255, 255), True),
+])
+def test_tolerance_boundary(mcs, tolerance, fill, expected):
+    text = f"3,4,#646464,{tolerance}\n5,6,#646464,{tolerance}"
+    signature, pixels = signature_area(mcs, text, fill)
+    assert signature.bbox == (3, 4, 3, 3)
+    assert signature.matches(pixels) is expected
+
+
+def test_every_point_must_match(mcs):
+    signature, pixels = signature_area(mcs, "0,0,#FF0000,0\n2,1,#00FF00,0", (255, 0, 0))
+    assert not signature.matches(pixels)
+    pixels[1, 2] = (0, 255, 0)
+    assert signature.matches(pixels)
+    assert list(signature.distances(pixels)) == [0, 0]
+
+
+def test_bbox_outside_screen_does_not_match(mcs):
+    signature, pixels = signature_area(mcs, "0,0,#000000\n9,9,#000000", (0, 0, 0))
+    # 屏幕边缘裁剪后读取到的区域比外接矩形小
+    assert not signature.matches(pixels[:9])
+    assert not signature.matches(pixels[:, :5])
+    assert signature.matches(pixels)
+
+
+def test_to_text_round_trip(mcs):
+    signature = mcs.PixelSignature.parse("# 注释\n1,2,#0a0B0c\n3,4,#FFFFFF,0")
+    assert signature.to_text() == "1,2,#0A0B0C,10\n3,4,#FFFFFF,0"
+    assert mcs.PixelSignature.parse(signature.to_text()).points == signature.points
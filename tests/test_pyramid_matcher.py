@@ -0,0 +1,67 @@
+"""由粗到细的金字塔模板匹配：结果与原尺寸匹配一致，阈值和边界情况"""
+import cv2
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def scene(mcs, tmp_path):
+    frame = mcs.synthetic_screen(640, 360, seed=3)
+    boxes = [(40, 30), (300, 200), (500, 90)]
+    paths = []
+    for i, (x, y) in enumerate(boxes):
+        path = str(tmp_path / f"template_{i}.png")
+        cv2.imencode(".png", frame[y:y + 48, x:x + 48])[1].tofile(path)
+        paths.append(path)
+    return frame, boxes, paths
+
+
+@pytest.mark.parametrize("grayscale", [False, True])
+def test_matches_full_resolution_search(mcs, scene, grayscale):
+    frame, boxes, paths = scene
+    matcher = mcs.PyramidMatcher()
+    haystack = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if grayscale else frame
+    for (x, y), path in zip(boxes, paths):
+        template = mcs.TemplateCache().get(path)
+        box, score = matcher.best_match(template, frame, 0.9, grayscale)
+        assert box == (x, y, 48, 48)
+        # 得分与原尺寸 TM_CCOEFF_NORMED 相同，置信度含义不变
+        needle = template.gray if grayscale else template.color
+        full = cv2.matchTemplate(haystack, needle, cv2.TM_CCOEFF_NORMED)
+        assert score == pytest.approx(float(full.max()), abs=1e-4)
+        assert matcher(template, frame, 0.9, grayscale) == box
+
+
+@pytest.mark.parametrize("grayscale", [False, True])
+def test_prepared_pyramid_gives_same_result(mcs, scene, grayscale):
+    frame, boxes, paths = scene
+    matcher = mcs.PyramidMatcher()
+    pyramid = matcher.prepare(frame, grayscale)
+    assert [level.shape[0] for level in pyramid] == [360, 180, 90, 45]
+    for (x, y), path in zip(boxes, paths):
+        template = mcs.TemplateCache().get(path)
+        shared = matcher.best_match(template, frame, 0.9, grayscale, pyramid)
+        assert shared == matcher.best_match(template, frame, 0.9, grayscale)
+        assert shared[0] == (x, y, 48, 48)
+
+
+def test_below_threshold_returns_none(mcs, scene):
+    frame, _, paths = scene
+    template = mcs.TemplateCache().get(paths[0])
+    matcher = mcs.PyramidMatcher()
+    other = mcs.synthetic_screen(640, 360, seed=11)
+    box, score = matcher.best_match(template, other, 0.99)
+    assert score < 0.99
+    assert matcher(template, other, 0.99) is None
+
+
+def test_small_haystacks(mcs, scene):
+    frame, boxes, paths = scene
+    template = mcs.TemplateCache().get(paths[1])
+    matcher = mcs.PyramidMatcher()
+    # 比模板还小的画面直接返回未找到
+    assert matcher.best_match(template, frame[:40, :40], 0.9) == (None, 0.0)
+    # 只比模板稍大时不能缩小，退回原尺寸匹配
+    x, y = boxes[1]
+    view = np.ascontiguousarray(frame[y - 4:y + 52, x - 4:x + 52])
+    assert matcher.best_match(template, view, 0.9)[0] == (4, 4, 48, 48)
@@ -0,0 +1,56 @@
+"""模板缓存的 LRU 淘汰和文件变化后的失效"""
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+
+def write_png(path, value, size=40):
+    image = np.full((size, size, 3), value, dtype=np.uint8)
+    cv2.imencode(".png", image)[1].tofile(str(path))
+    return str(path)
+
+
+def test_hit_and_lru_eviction(mcs, tmp_path):
+    cache = mcs.TemplateCache(max_entries=2)
+    a, b, c = (write_png(tmp_path / f"{name}.png", i * 50) for i, name in enumerate("abc"))
+    cache.get(a)
+    cache.get(b)
+    assert cache.get(a) is cache.get(a)
+    cache.get(c)  # 淘汰最久未使用的 b
+    assert list(cache.entries) == [a, c]
+    assert cache.evictions == 1
+    cache.get(b)
+    assert cache.misses == 4
+    assert list(cache.entries) == [c, b]
+
+
+def test_entry_contents(mcs, tmp_path):
+    entry = mcs.TemplateCache(pyramid_levels=4).get(write_png(tmp_path / "t.png", 90, size=128))
+    assert entry.color.shape == (128, 128, 3)
+    assert entry.gray.shape == (128, 128)
+    assert [level.shape[0] for level in entry.gray_pyramid] == [128, 64, 32, 16]
+    assert not entry.color.flags.writeable
+
+
+def test_changed_file_is_reloaded(mcs, tmp_path):
+    cache = mcs.TemplateCache()
+    path = write_png(tmp_path / "t.png", 10)
+    first = cache.get(path)
+    write_png(path, 200, size=48)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, first.mtime_ns + 1_000_000_000))
+    second = cache.get(path)
+    assert second is not first
+    assert second.color.shape == (48, 48, 3)
+
+
+def test_missing_or_invalid_file(mcs, tmp_path):
+    cache = mcs.TemplateCache()
+    with pytest.raises(OSError):
+        cache.get(str(tmp_path / "missing.png"))
+    bad = tmp_path / "bad.png"
+    bad.write_bytes(b"not an image")
+    with pytest.raises(ValueError):
+        cache.get(str(bad))
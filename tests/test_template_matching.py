@@ -0,0 +1,58 @@
+"""多模板触发集：同一帧上并行匹配多个模板，画面金字塔每帧只构建一次"""
+import cv2
+import pytest
+
+
+@pytest.fixture
+def scene(mcs, tmp_path):
+    frame = mcs.synthetic_screen(640, 360, seed=3)
+    boxes = [(40, 30), (300, 200), (500, 90)]
+    paths = []
+    for i, (x, y) in enumerate(boxes):
+        path = str(tmp_path / f"template_{i}.png")
+        cv2.imencode(".png", frame[y:y + 48, x:x + 48])[1].tofile(path)
+        paths.append(path)
+    return frame, boxes, paths
+
+
+class CountingMatcher:
+    """记录 prepare 的调用次数，其余交给 PyramidMatcher"""
+
+    def __init__(self, mcs):
+        self.inner = mcs.PyramidMatcher()
+        self.prepared = 0
+
+    def prepare(self, haystack, grayscale=False):
+        self.prepared += 1
+        return self.inner.prepare(haystack, grayscale)
+
+    def best_match(self, *args):
+        return self.inner.best_match(*args)
+
+
+def test_template_set_prepares_once_per_frame(mcs, scene):
+    frame, boxes, paths = scene
+    matcher = CountingMatcher(mcs)
+    template_set = mcs.TemplateSetMatcher(max_workers=2)
+    try:
+        results = template_set.match_all(paths, frame, 0.9, matcher=matcher)
+        assert matcher.prepared == 1
+        assert all(result.matched for result in results)
+        assert [result.box[:2] for result in results] == boxes
+        # 限定区域时匹配框换算回整帧坐标
+        results = template_set.match_all(paths[1:2], frame, 0.9, region=(250, 150, 200, 150), matcher=matcher)
+        assert matcher.prepared == 2
+        assert results[0].box[:2] == boxes[1]
+    finally:
+        template_set.close()
+
+
+def test_template_set_reports_unusable_region(mcs, scene):
+    frame, _, paths = scene
+    template_set = mcs.TemplateSetMatcher(max_workers=1)
+    try:
+        results = template_set.match_all(paths, frame[:0], 0.9, grayscale=True)
+        assert len(results) == len(paths)
+        assert all(not result.matched and result.error for result in results)
+    finally:
+        template_set.close()
@@ -0,0 +1,173 @@
+"""事件驱动触发器引擎：锁存状态、首次评估前不放行、监听者唤醒、多通道合并和等待会话的立即唤醒"""
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def core(mcs):
+    core = mcs.AsyncCore()
+    yield core
+    core.stop()
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.perf_counter() + timeout
+    while not predicate():
+        if time.perf_counter() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+class FakeCheck:
+    """结果由测试控制的 check，记录调用次数，可以用 gate 阻塞评估"""
+
+    def __init__(self, result=True, capture_ns=None):
+        self.result = result
+        self.capture_ns = capture_ns
+        self.calls = 0
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __call__(self):
+        self.gate.wait()
+        self.calls += 1
+        if self.capture_ns is not None:
+            return self.result, self.capture_ns
+        return self.result
+
+
+def make_session(mcs, engine, backend, retry=None):
+    return mcs.ClickSession(
+        "trigger", mcs.ClickPlan.compile(interval=0.01, position_mode=1), backend,
+        trigger_check=engine.is_satisfied,
+        trigger_retry=mcs.TriggerEngine.EDGE_FALLBACK_INTERVAL if retry is None else retry
+    )
+
+
+def test_no_clicks_before_first_evaluation(mcs, core):
+    check = FakeCheck(True)
+    check.gate.clear()
+    engine = mcs.TriggerEngine(core)
+    engine.add_channel("pixel", "颜色", check, lambda: True, 0.01)
+    scheduler = mcs.ClickScheduler(core)
+    engine.add_listener(scheduler.wake_waiting)
+    backend = mcs.RecordingBackend()
+    engine.acquire()
+    scheduler.add_session(make_session(mcs, engine, backend, retry=0.01))
+    try:
+        time.sleep(0.1)
+        # 引擎初始状态是"满足"，但启用的通道在第一次评估完成前锁存为不满足
+        assert not engine.is_satisfied()
+        assert backend.count("down") == 0
+        check.gate.set()
+        assert wait_until(lambda: backend.count("down") > 0)
+    finally:
+        check.gate.set()
+        scheduler.stop_all()
+        engine.release()
+
+
+def test_state_is_latched_between_evaluations(mcs, core):
+    check = FakeCheck(False, capture_ns=123)
+    engine = mcs.TriggerEngine(core)
+    channel = engine.add_channel("pixel", "颜色", check, lambda: True, 60.0)
+    states = []
+    engine.add_listener(states.append)
+    engine.acquire()
+    try:
+        assert wait_until(lambda: channel.evaluations == 1)
+        assert [state.satisfied for state in states] == [False]
+        # 检查间隔很长：结果改变后在下一次评估之前保持锁存的旧值
+        check.result = True
+        time.sleep(0.05)
+        assert not engine.is_satisfied() and check.calls == 1
+        engine.notify_changed()
+        assert wait_until(engine.is_satisfied)
+        assert channel.evaluations == 2
+        assert engine.state.capture_ns == 123  # 边沿记录所依据画面的采集时刻
+        # 结果不变的评估只刷新时间戳，不产生边沿也不调用监听者
+        timestamp_ns = engine.state.timestamp_ns
+        engine.notify_changed()
+        assert wait_until(lambda: channel.evaluations == 3)
+        assert engine.state.edges == 2 and channel.state.edges == 1
+        assert engine.state.timestamp_ns > timestamp_ns
+        check.result = False
+        engine.notify_changed()
+        assert wait_until(lambda: not engine.is_satisfied())
+        assert [state.satisfied for state in states] == [False, True, False]
+        assert [state.edges for state in states] == [1, 2, 3]
+        assert engine.wait_for(False, timeout=0)
+        assert not engine.wait_for(True, timeout=0.01)
+    finally:
+        engine.release()
+
+
+def test_check_errors_count_as_unsatisfied(mcs, core):
+    def check():
+        raise RuntimeError("截图失败")
+
+    engine = mcs.TriggerEngine(core)
+    channel = engine.add_channel("image", "图像", check, lambda: True, 60.0)
+    engine.acquire()
+    try:
+        assert wait_until(lambda: channel.evaluations == 1)
+        assert not engine.is_satisfied()
+    finally:
+        engine.release()
+
+
+def test_channels_combine_per_group(mcs, core):
+    pixel = FakeCheck(True)
+    image = FakeCheck(False)
+    image_enabled = threading.Event()
+    engine = mcs.TriggerEngine(core)
+    pixel_channel = engine.add_channel("pixel", "颜色", pixel, lambda: True, 0.01)
+    image_channel = engine.add_channel("image", "图像", image, image_enabled.is_set, 0.01)
+    engine.acquire()
+    try:
+        # 未启用的通道不评估，按满足处理
+        assert wait_until(engine.is_satisfied)
+        time.sleep(0.05)
+        assert image.calls == 0 and image_channel.evaluations == 0
+        assert pixel_channel.evaluations >= 2  # 按自己的间隔周期评估
+        image_enabled.set()
+        engine.notify_changed()
+        assert wait_until(lambda: not engine.is_satisfied())
+        assert pixel_channel.state.satisfied and not image_channel.state.satisfied
+        image.result = True
+        assert wait_until(engine.is_satisfied)
+        engine.set_interval("image", 60.0)
+        calls = image.calls
+        time.sleep(0.1)
+        assert image.calls <= calls + 1
+    finally:
+        engine.release()
+    # 所有会话释放后通道任务退出
+    assert wait_until(lambda: pixel_channel.task is None and image_channel.task is None)
+
+
+def test_listener_wakes_waiting_session(mcs, core):
+    check = FakeCheck(False)
+    engine = mcs.TriggerEngine(core)
+    engine.add_channel("pixel", "颜色", check, lambda: True, 60.0)
+    scheduler = mcs.ClickScheduler(core)
+    engine.add_listener(scheduler.wake_waiting)
+    backend = mcs.RecordingBackend()
+    session = make_session(mcs, engine, backend)
+    engine.acquire()
+    scheduler.add_session(session)
+    try:
+        assert wait_until(lambda: session.waiting_trigger)
+        check.result = True
+        start = time.perf_counter()
+        engine.notify_changed()
+        assert wait_until(lambda: backend.count("down") > 0)
+        # 兜底重试间隔为 1 秒，监听者在边沿上直接调度会话
+        assert time.perf_counter() - start < 0.5
+        assert not session.waiting_trigger
+    finally:
+        scheduler.stop_all()
+        engine.release()
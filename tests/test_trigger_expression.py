@@ -0,0 +1,124 @@
+"""触发表达式的解析、求值、短路和帧内缓存"""
+import pytest
+
+
+def evaluate(expression, values, now_ns=0, frame_key=None):
+    return expression.evaluate(lambda field: values[field], frame_key=frame_key, now_ns=now_ns)
+
+
+@pytest.mark.parametrize("text, values, expected", [
+    ("timer and color", {"timer_enabled": True, "color_enabled": True}, True),
+    ("timer and color", {"timer_enabled": True, "color_enabled": False}, False),
+    ("timer or color", {"timer_enabled": False, "color_enabled": True}, True),
+    ("not image", {"image_enabled": False}, True),
+    ("timer && (color || !image)", {"timer_enabled": True, "color_enabled": False, "image_enabled": False}, True),
+    ("定时 与 (颜色 或 非 图像)", {"timer_enabled": True, "color_enabled": False, "image_enabled": True}, False),
+    # and 的优先级高于 or
+    ("color or timer and image", {"color_enabled": True, "timer_enabled": False, "image_enabled": False}, True),
+])
+def test_evaluate(mcs, text, values, expected):
+    assert evaluate(mcs.TriggerExpression(text), values) is expected
+
+
+@pytest.mark.parametrize("text, message", [
+    ("", "表达式为空"),
+    ("colour", "未知的触发器或函数"),
+    ("(timer and color", "缺少"),
+    ("timer and", "不完整"),
+    ("timer color", "多余内容"),
+    ("hold(color)", "缺少"),
+    ("hold(color, x)", "未知的触发器或函数"),
+])
+def test_parse_errors(mcs, text, message):
+    with pytest.raises(ValueError, match=message):
+        mcs.TriggerExpression(text)
+
+
+@pytest.mark.parametrize("text, values, expected", [
+    ("颜色与图像", {"color_enabled": True, "image_enabled": False}, False),
+    ("非颜色", {"color_enabled": False}, True),
+    ("定时与(颜色或非图像)", {"timer_enabled": True, "color_enabled": False, "image_enabled": False}, True),
+    ("模板集或非区域", {"template_set_enabled": False, "area_enabled": True}, False),
+    ("非保持(颜色,100)", {"color_enabled": True}, True),  # 刚开始保持时间还不够
+    ("color与image", {"color_enabled": True, "image_enabled": True}, True),
+])
+def test_unspaced_chinese_operators(mcs, text, values, expected):
+    assert evaluate(mcs.TriggerExpression(text), values) is expected
+
+
+def test_unspaced_chinese_tokens(mcs):
+    assert mcs.TriggerExpression.tokenize("非颜色与上升沿(图像)") == [
+        ("op", "!"), ("atom", "颜色"), ("op", "&&"), ("func", "rising"),
+        ("op", "("), ("atom", "图像"), ("op", ")"),
+    ]
+    with pytest.raises(ValueError, match="未知的触发器或函数: 红色"):
+        mcs.TriggerExpression("颜色与红色")
+
+
+def test_short_circuit_skips_expensive_atom(mcs):
+    calls = []
+
+    def check(field):
+        calls.append(field)
+        return field != "timer_enabled"
+
+    expression = mcs.TriggerExpression("image and timer")
+    assert expression.evaluate(check, now_ns=0) is False
+    assert calls == ["timer_enabled"]  # 定时触发器更便宜，先评估，结果确定后跳过图像匹配
+    assert expression.short_circuits == 1
+
+
+def test_frame_memo_reuses_results_within_one_frame(mcs):
+    calls = []
+
+    def check(field):
+        calls.append(field)
+        return True
+
+    expression = mcs.TriggerExpression("image and timer")
+    expression.evaluate(check, frame_key=1, now_ns=0)
+    expression.evaluate(check, frame_key=1, now_ns=1)
+    assert calls.count("image_enabled") == 1
+    assert calls.count("timer_enabled") == 2  # 定时触发器与画面无关，不按帧缓存
+    expression.evaluate(check, frame_key=2, now_ns=2)
+    assert calls.count("image_enabled") == 2
+
+
+def test_hold(mcs):
+    expression = mcs.TriggerExpression("hold(color, 100)")
+    values = {"color_enabled": True}
+    assert evaluate(expression, values, now_ns=0) is False
+    assert evaluate(expression, values, now_ns=50_000_000) is False
+    assert evaluate(expression, values, now_ns=100_000_000) is True
+    values["color_enabled"] = False
+    assert evaluate(expression, values, now_ns=110_000_000) is False
+    values["color_enabled"] = True
+    assert evaluate(expression, values, now_ns=120_000_000) is False
+
+
+def test_debounce(mcs):
+    expression = mcs.TriggerExpression("debounce(color, 50)")
+    values = {"color_enabled": True}
+    assert evaluate(expression, values, now_ns=0) is False
+    values["color_enabled"] = False
+    assert evaluate(expression, values, now_ns=10_000_000) is False
+    values["color_enabled"] = True
+    assert evaluate(expression, values, now_ns=20_000_000) is False
+    assert evaluate(expression, values, now_ns=70_000_000) is True
+
+
+def test_rising_and_falling_edges(mcs):
+    rising = mcs.TriggerExpression("rising(color)")
+    falling = mcs.TriggerExpression("下降沿(颜色)")
+    samples = [False, True, True, False]
+    assert [evaluate(rising, {"color_enabled": v}) for v in samples] == [False, True, False, False]
+    assert [evaluate(falling, {"color_enabled": v}) for v in samples] == [False, False, False, True]
+
+
+def test_stateful_child_is_never_short_circuited(mcs):
+    expression = mcs.TriggerExpression("timer and rising(color)")
+    values = {"timer_enabled": False, "color_enabled": False}
+    evaluate(expression, values)
+    values.update(timer_enabled=True, color_enabled=True)
+    # 前一次虽然定时不满足，边沿检测仍然采样了颜色，所以这里能看到上升沿
+    assert evaluate(expression, values) is True
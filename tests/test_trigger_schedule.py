@@ -0,0 +1,84 @@
+"""定时计划的解析和开始/结束时刻表（2026-10-19 是星期一）"""
+from datetime import datetime
+
+import pytest
+
+
+def ts(*args):
+    return datetime(*args).timestamp()
+
+
+def transition(schedule, *args):
+    moment, becomes_active = schedule.next_transition(ts(*args))
+    return datetime.fromtimestamp(moment), becomes_active
+
+
+def test_weekday_window(mcs):
+    schedule = mcs.TriggerSchedule.parse("周一-周五 09:00-12:00")
+    assert not schedule.is_active(ts(2026, 10, 19, 8, 59, 59))
+    assert schedule.is_active(ts(2026, 10, 19, 9, 0, 0))
+    assert not schedule.is_active(ts(2026, 10, 19, 12, 0, 0))
+    assert not schedule.is_active(ts(2026, 10, 24, 10, 0, 0))  # 星期六
+    assert transition(schedule, 2026, 10, 19, 13, 0) == (datetime(2026, 10, 20, 9, 0), True)
+
+
+def test_transitions_after_table_was_built_on_an_earlier_day(mcs):
+    schedule = mcs.TriggerSchedule.parse("周一-周五 09:00-12:00")
+    assert schedule.is_active(ts(2026, 10, 19, 9, 30))
+    # 星期五查询下周一的开始时刻，不能受星期一计算的区间表范围限制
+    assert transition(schedule, 2026, 10, 23, 13, 0) == (datetime(2026, 10, 26, 9, 0), True)
+    assert schedule.is_active(ts(2026, 10, 19, 9, 30))
+
+
+def test_window_crossing_midnight(mcs):
+    schedule = mcs.TriggerSchedule.parse("22:00-02:00")
+    assert schedule.is_active(ts(2026, 10, 19, 23, 0))
+    assert schedule.is_active(ts(2026, 10, 20, 1, 59, 59))
+    assert not schedule.is_active(ts(2026, 10, 20, 2, 0))
+    assert transition(schedule, 2026, 10, 19, 23, 0) == (datetime(2026, 10, 20, 2, 0), False)
+
+
+def test_overlapping_rules_are_merged(mcs):
+    schedule = mcs.TriggerSchedule.parse("09:00-11:00\n10:00-12:00\n# 注释\n")
+    assert transition(schedule, 2026, 10, 19, 9, 30) == (datetime(2026, 10, 19, 12, 0), False)
+
+
+def test_cron_rule(mcs):
+    schedule = mcs.TriggerSchedule.parse("cron */15 13 * * 6 5m")
+    assert transition(schedule, 2026, 10, 24, 9, 30) == (datetime(2026, 10, 24, 13, 0), True)
+    assert schedule.is_active(ts(2026, 10, 24, 13, 15))
+    assert not schedule.is_active(ts(2026, 10, 24, 13, 20))
+    assert transition(schedule, 2026, 10, 24, 13, 20) == (datetime(2026, 10, 24, 13, 30), True)
+
+
+def test_cron_day_of_month_or_weekday(mcs):
+    # 日和星期都有限制时满足其一即可：每月 1 日或每个星期日
+    schedule = mcs.TriggerSchedule.parse("cron 0 12 1 * 0")
+    assert schedule.is_active(ts(2026, 11, 1, 12, 0, 30))   # 星期日，同时也是 1 日
+    assert schedule.is_active(ts(2026, 10, 25, 12, 0, 30))  # 星期日
+    assert not schedule.is_active(ts(2026, 10, 26, 12, 0, 30))
+
+
+def test_daily_keeps_inclusive_end_and_empty_when_reversed(mcs):
+    schedule = mcs.TriggerSchedule.daily(3600, 7200)
+    assert schedule.is_active(ts(2026, 10, 19, 2, 0, 0))
+    assert not schedule.is_active(ts(2026, 10, 19, 2, 0, 1))
+    assert mcs.TriggerSchedule.daily(0, 86399).is_active(ts(2026, 10, 19, 23, 59, 59, 500000))
+    reversed_schedule = mcs.TriggerSchedule.daily(7200, 3600)
+    assert not reversed_schedule.is_active(ts(2026, 10, 19, 1, 30))
+    assert reversed_schedule.next_transition(ts(2026, 10, 19, 1, 30))[1] is None
+
+
+def test_table_is_rebuilt_past_horizon(mcs):
+    schedule = mcs.TriggerSchedule.parse("09:00-10:00")
+    assert schedule.is_active(ts(2026, 10, 19, 9, 30))
+    assert schedule.is_active(ts(2027, 1, 4, 9, 30))
+    assert schedule.seconds_until_change(ts(2027, 1, 4, 9, 30)) == pytest.approx(1800)
+
+
+@pytest.mark.parametrize("text", [
+    "", "25:00-26:00", "mon 09:00", "cron * * *", "cron 61 * * * *", "xyz 09:00-10:00", "09:00-09:00",
+])
+def test_parse_errors(mcs, text):
+    with pytest.raises(ValueError):
+        mcs.TriggerSchedule.parse(text)